@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+
+"""
+####################
+#                  #
+#  photMCM (batch) #
+#  version 1.1     #
+#                  #
+####################
+
+Purpose:
+    Script to derive parameterisations for photolysis reactions in MCMv4.0 for many TUV
+    output files and all altitude levels in each file in a single process.
+
+Instructions:
+    Run script with command:
+
+        python batchMCM.py <input files or glob patterns> [options]
+
+    Every altitude block ('values at z = ...') in each input file is fitted.
+    Output files (<scen>.dat, <scen>.par, <scen>.pdf) are written for each block,
+    where scen is the input file name without the ending '.txt' for files with a single
+    altitude block and '<file>_z<altitude>km' for files with several altitude blocks.
+    The results of all files and altitudes are collected in a combined table
+    <output>.tab indexed by scenario, altitude and reaction number.
+    Binary output (see iofcn) is written to <scen>.npy for each block and <output>.npy
+    for all blocks. Output files are written to temporary files <file>.tmp and replace
+    previous outputs, when all results are written (outputs of failed runs are removed).
+
+    Options:
+        -o/--output F:  name of the combined result table (default: batchMCM)
+        -j/--jobs N:    number of workers for the curve fitting (default: 1, 0 for all cpus)
+        --pool TYPE:    type of worker pool, 'process' (default) or 'thread'
+        --solver S:     'leastsq' (default) or 'batch'
+        --init I:       initial guess of the fits, 'fixed' (default), 'loglin' or 'grid'
+        --no-cache:     fit all reactions instead of using the cache <scen>.cache (the cache is
+                        used by default)
+        --cache-size N: maximum number of fit results in each cache (default: 10000)
+        --robust:       retry fits without convergence with the alternative initial guess
+                        and reduced sza windows (85, 80 deg.), status codes of all fits
+                        are given on screen, in the binary output and the run report,
+                        reduced sza cut-offs in an additional column of <scen>.dat
+        --loss L:       loss function, 'linear' (default), 'huber' or 'soft_l1' to
+                        down-weight outliers (e.g. noisy high-sza tails, solver 'leastsq')
+        --weight W:     weighting of the residuals, 'abs' (default), 'rel' (relative residuals,
+                        weights 1/j), 'cos' (weights cos(sza)) or file with sza in deg. and
+                        weights in two columns (user weights); RMSE and R^2 of the weighted
+                        residuals are added to <output>.dat for weighted fits
+        --bootstrap N:  derive 95% confidence intervals of the parameters from N bootstrap
+                        resamples of the residuals of each fit (of the data points for
+                        weighted fits, refitted with the batched solver, in parallel with -j),
+                        added to <output>.dat and the binary output (default: 0, no bootstrap,
+                        loss function 'linear' only)
+        --seed S:       seed of the bootstrap (default: 0), intervals are reproducible
+                        for the same seed independent of the number of workers
+        --plots MODE:   'tex' (default), 'fast' or 'none'
+        --no-plots:     fitting only, same as '--plots none' (matplotlib is not loaded)
+        --mmap:         read TUV file memory-mapped with matrices parsed in chunks
+                        (lower peak memory for very large files)
+        --csv:          write all results of each block additionally to <scen>.csv
+                        (comma separated, columns of the binary output)
+        --pipeline:     pipelined run: the next files are parsed in a reader thread while
+                        the current scenario is fitted, output is buffered and written by
+                        a writer thread (same output in the same order)
+        --depth N:      maximum number of files parsed ahead and of scenarios waiting
+                        for the writer (default: 2)
+        --profile:      profile the run with cProfile, statistics are saved to <output>.prof
+
+    Timings of each stage (summed over all files and altitudes, parsing and saving
+    overlap with fitting for pipelined runs) and reaction,
+    numbers of function evaluations and peak memory are saved in the run report
+    <output>.run.json.
+    Worker pools are created once and shared between all files and altitudes.
+    Files without TUV matrices are skipped.
+
+Variables:
+    args:           command line arguments
+    files:          list of input files
+    pool,ppool:     worker pools for curve fitting and plotting
+    ftab:           buffered combined result table (replaced at the end of the run)
+    ifile:          current input file
+    rxn:            matrix with available photoreactions and indices
+    alt:            list with altitudes of all blocks in the input file
+    mats:           list with matrices with sza-dependent j values from TUV for each altitude
+    z,data:         current altitude and matrix
+    om:             list of maximum order of magnitudes for l-parameters in MCM parameterisation
+    scen:           scenario name for output files
+    kinds:          output files of each scenario and altitude
+    sink:           result sinks of all output files of a scenario and altitude (see sinkfcn)
+    load,save,drop: functions parsing a TUV file, saving and discarding the output of a scenario
+    blocks:         generator with file names and parsed TUV data (or parse errors)
+    res:            parsed TUV data of current file (or parse error)
+    writer:         writer thread for pipelined runs (None: output written directly)
+    out:            reaction indices and Results of all fits
+    rec,recs:       structured arrays with results of current block and all blocks
+    nscen:          number of processed scenarios and altitudes
+    rep:            run report with timings and statistics of the run
+    weight,wlabel:  weighting of residuals (scheme or user weights) and its label
+
+Dependencies:
+    uses:           sys,os,glob,argparse,numpy,datfcn,parfcn.mkpool,pltfcn.scatdat,
+                    pltfcn.ptab,iofcn,repfcn,pipefcn,sinkfcn
+
+This script may be used, redistributed and/or altered for non-commercial purposes
+under the GNU COMMON USER licence.
+"""
+
+
+# Load system functions
+import sys
+reload(sys)
+sys.setdefaultencoding('UTF8') # output of UNICODE characters
+import os
+import glob
+import argparse
+import numpy as np
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),"py.fcn"))
+
+#load own functions
+from datfcn import parseall, mmapall, readweights, xydat, plotdat
+from parfcn import mkpool
+from pltfcn import scatdat, ptab
+from iofcn import parrec, parcat, savepar
+from repfcn import newrep, stage, wreport, profiled
+from pipefcn import readahead, Writer
+from sinkfcn import AtomicFile, mksinks
+
+
+# Read command line arguments
+parser = argparse.ArgumentParser(description="Derive MCM parameterisations of photolysis processes "
+                                 "from several TUV output files and altitudes.")
+parser.add_argument('ifiles',nargs='+',help="TUV output files or glob patterns")
+parser.add_argument('-o','--output',default='batchMCM',help="name of combined result table")
+parser.add_argument('-j','--jobs',type=int,default=1,help="number of workers for curve fitting (0: all cpus)")
+parser.add_argument('--pool',choices=['process','thread'],default='process',help="type of worker pool")
+parser.add_argument('--solver',choices=['leastsq','batch'],default='leastsq',help="curve fitting method")
+parser.add_argument('--init',choices=['fixed','loglin','grid'],default='fixed',help="initial guess for curve fitting")
+parser.add_argument('--no-cache',dest='cache',action='store_false',
+                    help="do not use cached fit results (by default, results are cached in <scen>.cache)")
+parser.add_argument('--cache-size',type=int,default=10000,help="maximum number of cached fit results")
+parser.add_argument('--robust',action='store_true',
+                    help="retry fits without convergence with alternative initial guess and reduced sza window")
+parser.add_argument('--loss',choices=['linear','huber','soft_l1'],default='linear',
+                    help="loss function of the fits (robust losses down-weight outliers)")
+parser.add_argument('--weight',default='abs',
+                    help="weighting of residuals: abs, rel (1/j), cos or file with sza/deg. and weights")
+parser.add_argument('--bootstrap',type=int,default=0,metavar='N',
+                    help="number of bootstrap resamples for confidence intervals (0: none)")
+parser.add_argument('--seed',type=int,default=0,help="seed of the bootstrap")
+parser.add_argument('--plots',choices=['none','fast','tex'],default='tex',help="plot mode")
+parser.add_argument('--no-plots',dest='plots',action='store_const',const='none',
+                    help="fitting only, same as --plots none (matplotlib is not loaded)")
+parser.add_argument('--mmap',action='store_true',help="read TUV files memory-mapped (large files)")
+parser.add_argument('--csv',action='store_true',help="write all results additionally to <scen>.csv")
+parser.add_argument('--pipeline',action='store_true',
+                    help="parse next files and write output in separate threads while fitting")
+parser.add_argument('--depth',type=int,default=2,help="number of files parsed/written ahead (--pipeline)")
+parser.add_argument('--profile',action='store_true',help="profile the run with cProfile (<output>.prof)")
+args = parser.parse_args()
+if (args.bootstrap > 0 and args.loss != 'linear'):
+    parser.error("--bootstrap requires --loss linear")
+if (args.solver == 'batch' and args.loss != 'linear'):
+    parser.error("--loss %s requires --solver leastsq" % args.loss)
+if (args.weight in ['abs','rel','cos']):
+    weight, wlabel = args.weight, args.weight
+else:
+    weight, wlabel = readweights(args.weight), "user (%s)" % args.weight
+
+# collect input files
+files = []
+for pattern in args.ifiles:
+    match = sorted(glob.glob(pattern))
+    if (len(match) == 0):
+        sys.exit("No TUV output file found for '%s'." % pattern)
+    files += [f for f in match if f not in files]
+
+# shared worker pools
+pool = mkpool(args.jobs,args.pool)
+if (args.plots == 'none'):
+    ppool = None
+elif (args.pool == 'process'):
+    ppool = pool
+else:
+    ppool = mkpool(args.jobs,'process')
+
+# combined result table
+ftab = AtomicFile("%s.tab" % args.output)
+ftab.write("scenario\tz / km\trxn\tl / s-1\tdl / s-1\tm\tdm\tn\tdn\tRMSE / s-1\tR^2\tReaction\n")
+
+nscen = 0
+recs = []
+kinds = ['dat','par','npy'] + ['csv']*args.csv
+rep = newrep(args.output,files,vars(args))
+
+def load(ifile):
+    # parse TUV file (errors are returned to skip the file)
+    try:
+        with stage(rep,'parse'):
+            if (args.mmap):
+                return mmapall(ifile)
+            else:
+                return parseall(ifile)
+    except ValueError as err:
+        return err
+
+def save(scen,z,rxn,out,sink):
+    # write output of a scenario and altitude
+    with stage(rep,'save'):
+        sink.close()
+        ptab(ftab,scen,z,rxn,out)
+    recs.append(parrec(scen,z,rxn,out))
+
+def drop(scen,z,rxn,out,sink):
+    # discard output of a scenario and altitude not saved after errors
+    sink.abort()
+
+with profiled("%s.prof" % args.output if args.profile else None):
+    # files are parsed ahead and output is written in separate threads for pipelined runs
+    if (args.pipeline):
+        blocks = readahead(files,load,args.depth)
+        writer = Writer(args.depth,drop)
+    else:
+        blocks = ((ifile,load(ifile)) for ifile in files)
+        writer = None
+    try:
+        for ifile, res in blocks:
+            if (isinstance(res,ValueError)):
+                print "\n\n%s\nSkipping file." % res
+                continue
+            rxn, alt, mats = res
+            for z, data in zip(alt,mats):
+                if (ifile[-4:]=='.txt'):
+                    scen = ifile[:-4]
+                else:
+                    scen = ifile
+                if (len(mats) > 1):
+                    scen = "%s_z%.3fkm" % (scen,z)
+
+                # info on screen
+                print "\n\nScenario %s (z = %.3f km)\n" % (scen,z)
+                print "Working on:\n"
+
+                # result sinks of all output files and curve fitting
+                sink = mksinks(scen,z,wlabel,args.bootstrap,args.robust,kinds)
+                with stage(rep,'scatdat'):
+                    rxn, data, om = scatdat(rxn,data)
+                if (args.cache):
+                    cache = "%s.cache" % scen
+                else:
+                    cache = None
+                try:
+                    out, pages = xydat(data,rxn,90.,om,sink,scen,args.jobs,args.pool,args.solver,
+                                       args.init,cache,args.cache_size,pool,rep,args.loss,args.robust,
+                                       weight,args.bootstrap,args.seed)
+                except:
+                    sink.abort()
+                    raise
+                if (writer is not None):
+                    writer.put(save,scen,z,rxn,out,sink)
+                else:
+                    save(scen,z,rxn,out,sink)
+
+                # plots (outputs are kept after plot errors)
+                plotdat(scen,pages,args.plots,args.jobs,ppool,rep)
+                nscen += 1
+        if (writer is not None):
+            writer.close()
+        ftab.commit()
+    except:
+        # queued outputs are discarded and the incomplete table is removed after
+        # errors, once the writer is stopped
+        if (writer is not None):
+            writer.abort()
+        ftab.abort()
+        raise
+    finally:
+        for p in set([pool,ppool]):
+            if (p is not None):
+                p.close()
+                p.join()
+
+
+# binary output of all results
+with AtomicFile("%s.npy" % args.output) as f:
+    savepar(f,parcat(recs))
+wreport("%s.run.json" % args.output,rep)
+
+
+# info screen
+print "\n\nDone.\n"
+print "Parameters of %i scenarios/altitudes are provided in \'<scenario>.dat\' and \'<scenario>.par\'." % nscen
+print "Combined results of all scenarios and altitudes are provided in \'%s.tab\'" % args.output
+print "and in binary format in \'%s.npy\' (see iofcn.loadpar)." % args.output
+print "Timings and statistics of the run are provided in \'%s.run.json\'." % args.output
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+"""
+####################
+#                  #
+#  photMCM (bench) #
+#  version 1.1     #
+#                  #
+####################
+
+Purpose:
+    Benchmarks of the photMCM scripts.
+
+Instructions:
+    Run script with command:
+
+        python benchMCM.py <benchmark> [options]
+
+    Benchmarks:
+        startup:        wall time from interpreter start to the first fit for the
+                        current module layout (lazy imports) and with matplotlib
+                        loaded before fitting (eager imports, previous versions)
+        suite:          timed benchmarks of parsing, data selection, fitting (serial,
+                        parallel, batched), statistics and plotting
+        synth:          only write the synthetic TUV file (see --synth)
+        eval:           throughput of the evaluation of fitted parameterisations for
+                        many sza values (naive loop, evaluator, lookup table)
+        init:           quality and runtime of the initial guesses of the fits
+                        (fixed, loglin, grid search)
+
+    Options:
+        -i/--ifile F:   TUV output file (default: MCM4.txt in the script folder)
+        -n/--repeat N:  number of repetitions (default: 5)
+        -j/--jobs N:    number of workers for parallel benchmarks (default: 4)
+        --nplot N:      number of plotted reactions in the suite (default: 20)
+        --nsza N:       number of sza values in eval (default: 100000)
+        -o/--json F:    save results of the suite with environment information
+                        (git commit, versions) to a json file
+        --synth F:      use a synthetic TUV file F (written before benchmarks) with:
+        --nrxn N:           number of reactions (default: 200)
+        --dsza X:           resolution of sza grid in deg. (default: 0.5)
+        --noise X:          relative noise of j values (default: 0)
+        --nzero N:          number of columns with only zeros (default: 0)
+        --nz N:             number of altitudes (default: 1)
+        --seed N:           seed of the random number generator (default: 0)
+
+Variables:
+    args:           command line arguments
+    variant:        variant of the benchmark
+    t:              wall times of all repetitions
+    res:            timings of all benchmarks of the suite
+
+Dependencies:
+    uses:           sys,os,argparse,json,numpy,benchfcn
+
+This script may be used, redistributed and/or altered for non-commercial purposes
+under the GNU COMMON USER licence.
+"""
+
+
+# Load system functions
+import sys
+import os
+import argparse
+import json
+import numpy as np
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),"py.fcn"))
+
+#load own functions
+from benchfcn import *
+
+
+# Read command line arguments
+parser = argparse.ArgumentParser(description="Benchmarks of the photMCM scripts.")
+parser.add_argument('bench',choices=['startup','suite','synth','eval','init'],help="benchmark")
+parser.add_argument('-i','--ifile',default=os.path.join(os.path.dirname(os.path.abspath(__file__)),"MCM4.txt"),
+                    help="TUV output file")
+parser.add_argument('-n','--repeat',type=int,default=5,help="number of repetitions")
+parser.add_argument('-j','--jobs',type=int,default=4,help="number of workers for parallel benchmarks")
+parser.add_argument('--nplot',type=int,default=20,help="number of plotted reactions")
+parser.add_argument('--nsza',type=int,default=100000,help="number of sza values in eval")
+parser.add_argument('-o','--json',default=None,help="json file for results of the suite")
+parser.add_argument('--synth',default=None,help="synthetic TUV file used instead of --ifile")
+parser.add_argument('--nrxn',type=int,default=200,help="number of synthetic reactions")
+parser.add_argument('--dsza',type=float,default=0.5,help="resolution of synthetic sza grid in deg.")
+parser.add_argument('--noise',type=float,default=0.,help="relative noise of synthetic j values")
+parser.add_argument('--nzero',type=int,default=0,help="number of synthetic columns with only zeros")
+parser.add_argument('--nz',type=int,default=1,help="number of synthetic altitudes")
+parser.add_argument('--seed',type=int,default=0,help="seed of the random number generator")
+args = parser.parse_args()
+
+if (args.synth):
+    synth(args.synth,args.nrxn,args.dsza,args.noise,args.nzero,
+          [0.5*(k+1) for k in range(args.nz)],args.seed)
+    args.ifile = args.synth
+    print "Synthetic TUV file '%s' with %i reactions, %i sza values and %i altitudes written.\n" \
+        % (args.synth,args.nrxn,int(round(90./args.dsza))+1,args.nz)
+elif (args.bench == 'synth'):
+    parser.error("synth requires a file name (--synth F)")
+
+if (args.bench == 'startup'):
+    print "Wall time to first fit (%i repetitions):\n" % args.repeat
+    for variant in ['eager','lazy']:
+        t = tstartup(args.ifile,variant,args.repeat)
+        print "%-8s min %.3f s   median %.3f s" % (variant,np.min(t),np.median(t))
+
+elif (args.bench == 'suite'):
+    print "Benchmark suite for '%s' (%i repetitions, %i workers):\n" % (args.ifile,args.repeat,args.jobs)
+    res = suite(args.ifile,args.repeat,args.jobs,args.nplot)
+    for b in sorted(res):
+        print "%-14s min %8.3f s   median %8.3f s" % (b,res[b]['min'],res[b]['median'])
+    if (args.json):
+        with open(args.json,'w') as f:
+            json.dump({'info': benchinfo(), 'ifile': os.path.abspath(args.ifile),
+                       'options': vars(args), 'results': res},f,indent=2,sort_keys=True)
+        print "\nResults saved to '%s'." % args.json
+
+elif (args.bench == 'eval'):
+    print "Evaluation of parameterisations for '%s' at %i sza values (%i repetitions):\n" \
+        % (args.ifile,args.nsza,args.repeat)
+    res = teval(args.ifile,args.nsza,args.repeat)
+    for b in ['loop','evaluator','lookup']:
+        print "%-10s min %8.4f s   median %8.4f s   %.3g j values/s" \
+            % (b,res[b]['min'],res[b]['median'],args.nsza*res['nrxn']/res[b]['min'])
+    print "\nmaximum relative deviation from loop: evaluator %.1e, lookup table %.1e" \
+        % (res['dev_evaluator'],res['dev_lookup'])
+
+elif (args.bench == 'init'):
+    print "Initial guesses for '%s' (%i repetitions):\n" % (args.ifile,args.repeat)
+    res = tinit(args.ifile,args.repeat)
+    for i in ['fixed','loglin','grid']:
+        print "%-7s min %8.3f s   %5i function evaluations   %3i not converged   " \
+              "%3i poor local minima   median RMSE/best %.4f" \
+            % (i,res[i]['min'],res[i]['nfev'],res[i]['nbad'],res[i]['npoor'],res[i]['rmse_rel'])
@@ -14,7 +14,7 @@ Purpose:
 Instructions:
     Run script with command:
 
-        python photMCM <input file> <output>
+        python photMCM <input file> <output> [options]
 
     where input file is the name of the file from the TUV5.2.1 model runs and
     output is the name for the files with the optimized parameters (<output>.dat)
@@ -24,6 +24,60 @@ Instructions:
     ends with '.txt. Otherwise, output will be set to 'photMCM'. User input is required
     for blank input file during the application of the script.
 
+    Options:
+        -j/--jobs N:    number of workers for the curve fitting (default: 1, 0 for all cpus)
+        --pool TYPE:    type of worker pool, 'process' (default) or 'thread'
+        --solver S:     'leastsq' (default) for individual fits of each reaction,
+                        'batch' to fit all reactions at once with a vectorised solver
+        --init I:       initial guess of the fits, 'fixed' (default), 'loglin'
+                        (linear least square fit of ln(j)) or 'grid' (global search on a
+                        coarse grid of m, n for all reactions at once)
+        --no-cache:     fit all reactions instead of reusing results of unchanged reactions
+                        from the cache <output>.cache (the cache is used by default)
+        --cache-size N: maximum number of fit results in the cache (default: 10000)
+        --robust:       retry fits without convergence with the alternative initial guess
+                        and reduced sza windows (85, 80 deg.), status codes of all fits
+                        are given on screen, in the binary output and the run report,
+                        reduced sza cut-offs in an additional column of <scen>.dat
+        --loss L:       loss function, 'linear' (default), 'huber' or 'soft_l1' to
+                        down-weight outliers (e.g. noisy high-sza tails, solver 'leastsq')
+        --weight W:     weighting of the residuals, 'abs' (default), 'rel' (relative residuals,
+                        weights 1/j), 'cos' (weights cos(sza)) or file with sza in deg. and
+                        weights in two columns (user weights); RMSE and R^2 of the weighted
+                        residuals are added to <output>.dat for weighted fits
+        --bootstrap N:  derive 95% confidence intervals of the parameters from N bootstrap
+                        resamples of the residuals of each fit (of the data points for
+                        weighted fits, refitted with the batched solver, in parallel with -j),
+                        added to <output>.dat and the binary output (default: 0, no bootstrap,
+                        loss function 'linear' only)
+        --seed S:       seed of the bootstrap (default: 0), intervals are reproducible
+                        for the same seed independent of the number of workers
+        --plots MODE:   'tex' (default) for plots with LaTeX labels, 'fast' for plots with
+                        matplotlib mathtext labels, 'none' to skip plots
+        --no-plots:     fitting only, same as '--plots none' (matplotlib is not loaded)
+        --mmap:         read TUV file memory-mapped with matrices parsed in chunks
+                        (lower peak memory for very large files)
+        --csv:          write all results additionally to <output>.csv (comma separated,
+                        columns of the binary output)
+        --profile:      profile the run with cProfile, statistics are saved to <output>.prof
+                        (e.g. python -m pstats <output>.prof)
+        --sweep CO [CO ...]:
+                        sweep mode: fit all reactions for each sza cut-off in deg. (e.g.
+                        --sweep 80 85 88 90) in one pass over the parsed data with warm starts
+                        from the neighbouring cut-off; parameters, RMSE, R^2 and status of each
+                        reaction and cut-off and the recommended cut-off of each reaction are
+                        written to <output>.sweep (no further output files or plots, no cache;
+                        --robust, --bootstrap, --no-cache, --cache-size, --csv and --plots are
+                        not supported)
+        --sweep-tol T:  tolerance of R^2 for the recommended cut-off, the largest cut-off
+                        with a converged fit and R^2 within T of the best R^2 (default: 0.001)
+
+    Output files are written to temporary files <file>.tmp and replace previous outputs,
+    when all results are written (outputs of failed runs are removed).
+    Timings of each stage (parsing, data preparation, fitting, output, plotting) and
+    reaction, numbers of function evaluations and peak memory are saved in the
+    run report <output>.run.json.
+
     To make script run on a different maschine, copy script, the folder 'py.fcn/v1.1' with the modules
     datfcn, pltfcn, and fitfcn and change folder path of sys.path on l. 78 in the main script.
 
@@ -34,19 +88,27 @@ Input data:
 
 
 Variables:
+    args:           command line arguments
     ifile:          identifier for input file with TUV photlysis data
                     (read from command line or from user input)
     spath           path of the modules with system user added
-    fout,fpar:      file identifiers for output temporary files
+    sink:           result sinks of all output files (.dat, .par, .npy and optionally .csv)
     rxn:            matrix with available photoreactions and indices
+    z:              altitude of the matrix with j values
     data:           matrix with sza-dependent j values from TUV
+    out:            reaction indices and Results of all fits
     om:             list of maximum order of magnitudes for l-parameters in MCM parameterisation
     scen:           scenario name for output files (from command line or photMCM)
+    cache:          file name of cache with fit results
+    weight,wlabel:  weighting of residuals (scheme or user weights) and its label
+    rep:            run report with timings and statistics of the run
+    cos,ifit,res:   cut-offs, indices of fitted reactions and Results of the sweep
+    best:           recommended cut-off of each reaction
     str:            string for rename ps file with plots to scenario name
-    now:            variable for present time
 
 Dependencies:
-    uses:           sys,os,datetime,datfcn,pltfcn.scatdat
+    uses:           sys,os,argparse,datfcn,pltfcn.scatdat,pltfcn.psweep,
+                    sinkfcn.mksinks,sinkfcn.AtomicFile,repfcn,sweepfcn
 
 for help, see also:
     http://docs.scipy.org/doc/scipy-0.14.0/reference/generated/scipy.optimize.curve_fit.html
@@ -77,65 +139,154 @@ import sys
 reload(sys)  # Reload does the trick!
 sys.setdefaultencoding('UTF8') # output of UNICODE characters
 import os
+import argparse
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),"py.fcn"))
 sys.path.insert(0,os.path.expanduser("~/Google Drive/Applications/data/photMCM/py.fcn/v1.1"))
-from datetime import datetime as dt
 
 #load own functions
 from datfcn import *
-from pltfcn import scatdat
-
+from pltfcn import scatdat, psweep
+from sinkfcn import mksinks, AtomicFile
+from repfcn import newrep, stage, wreport, profiled
+from sweepfcn import sweep, recommend
+
+
+# Read command line arguments
+parser = argparse.ArgumentParser(description="Derive MCM parameterisations of photolysis processes from TUV output.")
+parser.add_argument('ifile',nargs='?',help="TUV output file")
+parser.add_argument('scen',nargs='?',help="scenario name for output files")
+parser.add_argument('-j','--jobs',type=int,default=1,help="number of workers for curve fitting (0: all cpus)")
+parser.add_argument('--pool',choices=['process','thread'],default='process',help="type of worker pool")
+parser.add_argument('--solver',choices=['leastsq','batch'],default='leastsq',help="curve fitting method")
+parser.add_argument('--init',choices=['fixed','loglin','grid'],default='fixed',help="initial guess for curve fitting")
+parser.add_argument('--no-cache',dest='cache',action='store_false',
+                    help="do not use cached fit results (by default, results are cached in <scen>.cache)")
+parser.add_argument('--cache-size',type=int,default=10000,help="maximum number of cached fit results")
+parser.add_argument('--robust',action='store_true',
+                    help="retry fits without convergence with alternative initial guess and reduced sza window")
+parser.add_argument('--loss',choices=['linear','huber','soft_l1'],default='linear',
+                    help="loss function of the fits (robust losses down-weight outliers)")
+parser.add_argument('--weight',default='abs',
+                    help="weighting of residuals: abs, rel (1/j), cos or file with sza/deg. and weights")
+parser.add_argument('--bootstrap',type=int,default=0,metavar='N',
+                    help="number of bootstrap resamples for confidence intervals (0: none)")
+parser.add_argument('--seed',type=int,default=0,help="seed of the bootstrap")
+parser.add_argument('--plots',choices=['none','fast','tex'],default='tex',help="plot mode")
+parser.add_argument('--no-plots',dest='plots',action='store_const',const='none',
+                    help="fitting only, same as --plots none (matplotlib is not loaded)")
+parser.add_argument('--mmap',action='store_true',help="read TUV files memory-mapped (large files)")
+parser.add_argument('--csv',action='store_true',help="write all results additionally to <output>.csv")
+parser.add_argument('--profile',action='store_true',help="profile the run with cProfile (<output>.prof)")
+parser.add_argument('--sweep',type=float,nargs='+',metavar='CO',
+                    help="fit all reactions for each sza cut-off in deg. (<output>.sweep, not with "
+                         "--robust, --bootstrap, --no-cache, --cache-size, --csv or --plots)")
+parser.add_argument('--sweep-tol',type=float,default=1.e-3,
+                    help="tolerance of R^2 for the recommended cut-off of the sweep")
+args = parser.parse_args()
+if (args.bootstrap > 0 and args.loss != 'linear'):
+    parser.error("--bootstrap requires --loss linear")
+if (args.solver == 'batch' and args.loss != 'linear'):
+    parser.error("--loss %s requires --solver leastsq" % args.loss)
+if (args.sweep):
+    # options of the fits and output files, which are not used in sweep mode
+    unused = [opt for opt, dest in [('--robust','robust'),('--bootstrap','bootstrap'),
+                                    ('--no-cache','cache'),('--cache-size','cache_size'),
+                                    ('--csv','csv'),('--plots/--no-plots','plots')]
+              if getattr(args,dest) != parser.get_default(dest)]
+    if (len(unused) > 0):
+        parser.error("%s not supported with --sweep" % ", ".join(unused))
+if (args.weight in ['abs','rel','cos']):
+    weight, wlabel = args.weight, args.weight
+else:
+    weight, wlabel = readweights(args.weight), "user (%s)" % args.weight
 
 # Load TUV data
-try:
-    ifile = sys.argv[1]
-except:
+ifile = args.ifile
+if (ifile is None):
     ifile = raw_input("Enter file with TUV data: ")
-# retrival of fitting data
-rxn, data = load(ifile)
-data = trans(data)
 
 # Initialise output
 # text file with optimised parameters and statistical data:
-try:
-    scen = sys.argv[2]
-except:
+scen = args.scen
+if (scen is None):
     if (ifile[-4:]=='.txt'):
         scen = ifile[:-4]
     else:
         scen = 'photMCM'
-
-now = dt.now()
-fout = open("%s.dat" % scen,'w+')
-fout.write("Parameters and statistical data for parameterisation of photolysis processes in MCMv4.0.\n")
-fout.write("j / s-1 = l%s(cos(x))^m%sexp(-n%ssec(x))\n\n" % (u"\u00B7",u"\u00B7",u"\u00B7"))
-fout.write("created %s.%s.%s, %s:%s\n\n\n" % (now.day,now.month,now.year,now.hour,now.minute))
-fout.write("               P a r a m e t e r s        \t\t\t  S t a t i s t i c s\n")
-fout.write("    l / s-1     \t      m      \t      n      \t RMSE / s-1 \t   R^2  \tReaction\n")
-
-
-# plot file for further gnuplot processing:
-fpar = open("%s.par" % scen,'w+')
-# write data for scatter plots in gnuplot input file
-rxn, data, om = scatdat(rxn,data)
-
-# info on screen
-print "Done loading data.\nStart calculating parameterisations.\n\n"
-print "Working on:\n"
-
-# loop over photoreactions and curve fitting
-xydat(data,rxn,90.,om,fout,fpar,scen)
-
-# close all open files
-fout.close()
-fpar.close()
+rep = newrep(scen,[ifile],vars(args))
+
+with profiled("%s.prof" % scen if args.profile else None):
+    # retrival of fitting data
+    with stage(rep,'parse'):
+        if (args.mmap):
+            rxn, z, data = mmapall(ifile,nblock=1)
+        else:
+            rxn, z, data = parseall(ifile,1)
+        data = data[0]
+
+    # write data for scatter plots in gnuplot input file
+    with stage(rep,'scatdat'):
+        rxn, data, om = scatdat(rxn,data)
+
+    if (args.sweep):
+        # fits of all reactions for each sza cut-off
+        print "Done loading data.\nStart sweep over sza cut-offs %s deg.\n\n" \
+            % ", ".join("%g" % co for co in sorted(set(args.sweep),reverse=True))
+        cos, ifit, res = sweep(data,args.sweep,args.jobs,args.pool,args.solver,args.init,
+                               loss=args.loss,weight=weight,rep=rep)
+        best = recommend(cos,res,args.sweep_tol)
+        with stage(rep,'write'):
+            with AtomicFile("%s.sweep" % scen) as fsw:
+                psweep(fsw,rxn,ifit,cos,res,best,args.sweep_tol,wlabel)
+    else:
+        # result sinks: text file with optimised parameters and statistical data,
+        # parameter file for further gnuplot processing and binary output of all results
+        sink = mksinks(scen,z[0],wlabel,args.bootstrap,args.robust,['dat','par','npy'] + ['csv']*args.csv)
+
+        # info on screen
+        print "Done loading data.\nStart calculating parameterisations.\n\n"
+        print "Working on:\n"
+
+        # loop over photoreactions and curve fitting
+        if (args.cache):
+            cache = "%s.cache" % scen
+        else:
+            cache = None
+        try:
+            out, pages = xydat(data,rxn,90.,om,sink,scen,args.jobs,args.pool,args.solver,args.init,
+                               cache,args.cache_size,rep=rep,loss=args.loss,retry=args.robust,
+                               weight=weight,nboot=args.bootstrap,seed=args.seed)
+        except:
+            sink.abort()
+            raise
+
+        # replace all output files at once
+        with stage(rep,'save'):
+            sink.close()
+
+        # plots of TUV data and fitted functions (outputs are kept after plot errors)
+        plotdat(scen,pages,args.plots,args.jobs,rep=rep)
+
+# run report
+wreport("%s.run.json" % scen,rep)
 
 
 # info screen
 print "\n\nDone.\n"
-print "See file \'%s.dat\' for optimised parameters" % scen
-print "of parmaterisation for photolysis in MCMv4.0 and statistical data."
-print "Plots of TUV calculated data and least square fits are provided in \'%s.ps\'" % scen
-print "Matrix with parameters is provided in \'%s.par\' for further processing." % scen
+if (args.sweep):
+    print "See file \'%s.sweep\' for parameters and statistical data of all sza cut-offs" % scen
+    print "and the recommended cut-off of each reaction."
+else:
+    print "See file \'%s.dat\' for optimised parameters" % scen
+    print "of parmaterisation for photolysis in MCMv4.0 and statistical data."
+    print "Plots of TUV calculated data and least square fits are provided in \'%s.ps\'" % scen
+    print "Matrix with parameters is provided in \'%s.par\' for further processing." % scen
+    print "All results are provided in binary format in \'%s.npy\' (see iofcn.loadpar)." % scen
+    if (args.csv):
+        print "All results are provided as comma separated values in \'%s.csv\'." % scen
+print "Timings and statistics of the run are provided in \'%s.run.json\'." % scen
+if (args.profile):
+    print "Profile of the run is provided in \'%s.prof\'." % scen
 
 
 
@@ -0,0 +1,441 @@
+"""
+Module benchfcn
+===============
+version 1.1
+-------------
+
+List of function focused on benchmarks of the photMCM scripts.
+contains:
+    - synth
+    - tstartup
+    - timed
+    - suite
+    - teval
+    - tinit
+    - benchinfo
+"""
+
+import sys
+import numpy as np
+
+# code executed in a new interpreter up to the first fit,
+# 'eager' loads matplotlib and the pdf backend before fitting as in previous versions
+startup = {'lazy':   "",
+           'eager':  "import matplotlib as mpl\n"
+                     "from matplotlib.backends.backend_pdf import PdfPages\n"}
+firstfit = """
+import sys
+sys.path.insert(0,%r)
+%s
+from datfcn import *
+from pltfcn import scatdat
+from fitfcn import fitRxn
+rxn, data = parse(%r)
+rxn, data, om = scatdat(rxn,data)
+xdata, ydata = select_fit_window(data,90.)
+y = np.flatnonzero(ydata.sum(axis=0) != 0.)[0]
+fitRxn((xdata,ydata[:,y],'fixed'))
+"""
+#______________________________________________________________________________________________
+
+def synth(file,nrxn=200,dsza=0.5,noise=0.,nzero=0,z=[0.5],seed=0):
+    """
+    Function synth
+    ==============
+
+    Purpose:
+        Write a synthetic TUV output file (version 5.2 format) with j values of the
+        MCM parameterisation j = l*(cos(x))^m*exp(-n*sec(x)) for random parameters
+        with optional relative gaussian noise and columns with only zeros.
+
+    Variables:
+    I/O:
+        file:       name of output file
+        nrxn:       number of photoreactions
+        dsza:       resolution of the sza grid in deg. (0 to 90 deg.)
+        noise:      relative standard deviation of the noise
+        nzero:      number of columns with only zeros
+        z:          list with altitudes in km (one matrix for each altitude)
+        seed:       seed of the random number generator
+        p:          matrix with parameters l, m, n of each reaction (rows)
+
+    internal:
+        rng:        random number generator
+        sza:        sza grid in deg.
+        c:          cos(sza)
+        j:          matrix with sza and j values
+        izero:      indices of columns with only zeros
+        fout:       variable for opening output file
+
+    Dependencies:
+        uses:           numpy
+        called from:    benchMCM (main)
+    """
+
+    rng = np.random.RandomState(seed)
+    sza = np.linspace(0.,90.,int(round(90./dsza))+1)
+    c = np.cos(np.deg2rad(sza))
+    p = np.column_stack([10**rng.uniform(-9.,-3.,nrxn),rng.uniform(0.1,2.5,nrxn),
+                         rng.uniform(0.05,1.2,nrxn)])
+    izero = rng.choice(nrxn,min(nzero,nrxn),replace=False)
+
+    with open(file,'w') as fout:
+        fout.write("Photolysis rate coefficients, s-1\n")
+        for i in range(nrxn):
+            fout.write("%4i = %-50s\n" % (i+1,"SYN%i + hv -> products %i" % (i+1,i+1)))
+        for k, alt in enumerate(z):
+            with np.errstate(over='ignore',divide='ignore'):
+                j = p[:,0]*np.exp(np.outer(np.log(c),p[:,1]) - np.outer(1./c,p[:,2]))*(0.99**k)
+            if (noise > 0.):
+                j = j*(1. + noise*rng.randn(*j.shape))
+            j = np.clip(np.nan_to_num(j),0.,None)
+            j[:,izero] = 0.
+            fout.write("values at z = %10.3f km\n" % alt)
+            fout.write("Columns: sza, photo-reactions\n")
+            fout.write(" sza, deg." + "".join(["%11i" % (i+1) for i in range(nrxn)]) + "\n")
+            for x in range(len(sza)):
+                fout.write("%10.4f" % sza[x] + "".join(["%11.3E" % v for v in j[x]]) + "\n")
+            fout.write("-"*60 + "\n")
+    return p
+#______________________________________________________________________________________________
+
+def tstartup(file,variant='lazy',repeat=5):
+    """
+    Function tstartup
+    =================
+
+    Purpose:
+        Measure wall time from the start of a new python interpreter to the first
+        finished fit (parsing, data selection and fit of the first reaction).
+
+    Variables:
+    I/O:
+        file:       name of input file with TUV data
+        variant:    'lazy' (current module layout) or 'eager' (matplotlib loaded before
+                    the first fit as in previous versions)
+        repeat:     number of repetitions
+        t:          list with wall times in s of each repetition
+
+    internal:
+        code:       python code executed in the new interpreter
+        path:       folder with the photMCM modules
+        t0:         start time
+
+    Dependencies:
+        uses:           os, subprocess, time, startup, firstfit
+        called from:    benchMCM (main)
+    """
+    import os
+    import subprocess
+    import time
+
+    path = os.path.dirname(os.path.abspath(__file__))
+    code = firstfit % (path,startup[variant],os.path.abspath(file))
+    t = []
+    for i in range(repeat):
+        t0 = time.time()
+        subprocess.check_call([sys.executable,'-c',code])
+        t.append(time.time() - t0)
+    return t
+#______________________________________________________________________________________________
+
+def timed(fcn,args=(),repeat=5):
+    """
+    Function timed
+    ==============
+
+    Purpose:
+        Measure wall times of repeated function calls.
+
+    Variables:
+    I/O:
+        fcn:        function
+        args:       tuple with function arguments
+        repeat:     number of repetitions
+        t:          dictionary with list of wall times in s ('times') and
+                    minimum and median wall time ('min', 'median')
+        res:        return value of last function call
+
+    internal:
+        t0:         start time
+
+    Dependencies:
+        uses:           time, numpy
+        called from:    suite
+    """
+    import time
+
+    times = []
+    for i in range(repeat):
+        t0 = time.time()
+        res = fcn(*args)
+        times.append(time.time() - t0)
+    t = {'times': times, 'min': float(np.min(times)), 'median': float(np.median(times))}
+    return t, res
+#______________________________________________________________________________________________
+
+def suite(file,repeat=3,jobs=4,nplot=20):
+    """
+    Function suite
+    ==============
+
+    Purpose:
+        Timed, repeatable benchmarks of the hot paths of photMCM:
+            - parse:        previous parser (ReadBetween/trans), datfcn.parse and
+                            memory-mapped reader datfcn.mmapall
+            - scatdat:      previous scatdat (loops over reactions and data matrix, in place)
+                            and vectorised pltfcn.scatdat
+            - select:       selection of fit data (datfcn.select_fit_window)
+            - fit:          serial and parallel leastsq fits (data handed to the workers in a
+                            memory-mapped block and pickled per reaction), batched fits,
+                            serial fits with shared fit context (fitfcn.mkcontext)
+            - stat:         statistical data of all fits (fitfcn.fitStat) from sza data
+                            and with shared fit context
+            - bootstrap:    bootstrap confidence intervals of all fits with 200 resamples
+                            (serial and parallel, parfcn.bootAll)
+            - plot:         rendering of nplot pages (serial and parallel, mathtext)
+
+    Variables:
+    I/O:
+        file:       name of input file with TUV data
+        repeat:     number of repetitions of each benchmark
+        jobs:       number of workers for parallel benchmarks
+        nplot:      number of reactions in the plot benchmarks
+        res:        dictionary with timings of each benchmark (see timed)
+
+    internal:
+        legacy:     previous parser with string matrices
+        legacy_scat:previous scatdat (applied to a copy of the data)
+        rxn,data:   photoreactions and TUV data
+        om:         orders of magnitude of j values (see pltfcn.scatdat)
+        ifit:       indices of reactions with non-zero j values
+        xdata,yfit: x-,y-data of all reactions with non-zero j values
+        ctx:        fit context of xdata
+        fits:       Results of serial fits
+        infos:      infodicts of leastsq fits for fitStat
+        pages:      arguments for plots
+        tmp:        temporary folder for plots
+
+    Dependencies:
+        uses:           os, shutil, tempfile, timed, datfcn, fitfcn, parfcn, pltfcn
+        called from:    benchMCM (main)
+    """
+    import os
+    import shutil
+    import tempfile
+    from datfcn import ReadBetween, trans, parse, mmapall, select_fit_window, order
+    from fitfcn import fitTUV, fitStat, fitBatch, mkcontext
+    from parfcn import fitAll, bootAll
+    from pltfcn import scatdat, plotall
+
+    def legacy(file):
+        head = ReadBetween(file,"Photolysis rate coefficients, s-1","values at z =      0.500 km"," = ")
+        mat = ReadBetween(file,"sza, deg.","------------------------------------------------------------","")
+        return head, trans(mat)
+
+    def legacy_scat(rxn,data):
+        data = data.copy()
+        om = []
+        for y in range(len(rxn)):
+            o1, o2 = order(data[0][y+1])
+            om = np.append(om,o2)
+        om = np.insert(om,0,1.)
+        for x in range(len(data)):
+            for y in range(len(rxn)+1):
+                if (y == 0):
+                    data[x][0] = np.deg2rad(data[x][0])
+        return rxn, data, om
+
+    res = {}
+    res['parse_legacy'], out = timed(legacy,(file,),repeat)
+    res['parse_mmap'], out = timed(mmapall,(file,None,1),repeat)
+    res['parse'], out = timed(parse,(file,),repeat)
+    res['scatdat_legacy'], ref = timed(legacy_scat,out,repeat)
+    res['scatdat'], out = timed(scatdat,out,repeat)
+    if (not all(np.array_equal(a,b) for a,b in zip(ref[1:],out[1:]))):
+        raise ValueError("Vectorised scatdat differs from previous version.")
+    rxn, data, om = out
+    res['select'], out = timed(select_fit_window,(data,90.),repeat)
+    xdata, ydata = out
+    ifit = np.flatnonzero(ydata.sum(axis=0) != 0.)
+    yfit = [ydata[:,y] for y in ifit]
+
+    res['fit_serial'], fits = timed(fitAll,(xdata,yfit,1),repeat)
+    ctx = mkcontext(data[:,0],90.)
+    res['fit_context'], out = timed(fitAll,(ctx,yfit,1),repeat)
+    res['fit_parallel'], out = timed(fitAll,(xdata,yfit,jobs,'process'),repeat)
+    res['fit_pickled'], out = timed(lambda: fitAll(xdata,yfit,jobs,'process',share=False),(),repeat)
+    res['fit_batch'], out = timed(fitBatch,(xdata,np.column_stack(yfit)),repeat)
+    infos = [fitTUV(xdata,y)[-1] for y in yfit]
+    res['stat'], out = timed(lambda: [fitStat(xdata,y,r.p,r.cov,i) for y,r,i in zip(yfit,fits,infos)],(),repeat)
+    res['stat_context'], out = timed(lambda: [fitStat(ctx,y,r.p,r.cov,i) for y,r,i in zip(yfit,fits,infos)],(),repeat)
+    res['boot_serial'], out = timed(bootAll,(ctx,yfit,fits,200,range(len(yfit)),1),repeat)
+    res['boot_parallel'], out = timed(bootAll,(ctx,yfit,fits,200,range(len(yfit)),jobs),repeat)
+
+    pages = [(rxn[y][1],xdata,ydata[:,y],r.p,om[y+1]) for y,r in zip(ifit,fits)][:nplot]
+    tmp = tempfile.mkdtemp()
+    try:
+        scen = os.path.join(tmp,'bench')
+        # workers are forked before the parent renders any figure
+        res['plot_parallel'], out = timed(plotall,(scen,pages,'fast',jobs),repeat)
+        res['plot_serial'], out = timed(plotall,(scen,pages,'fast',1),repeat)
+    finally:
+        shutil.rmtree(tmp)
+    return res
+#______________________________________________________________________________________________
+
+def teval(file,nsza=100000,repeat=5,dlut=0.1):
+    """
+    Function teval
+    ==============
+
+    Purpose:
+        Throughput of the evaluation of fitted parameterisations of all reactions
+        in a TUV file for nsza random sza values:
+            - loop:         naive loop over reactions with fitfcn.phot
+            - evaluator:    batched evaluation with evalfcn.Evaluator
+            - lookup:       linear interpolation in a lookup table (resolution dlut)
+
+    Variables:
+    I/O:
+        file:       name of input file with TUV data
+        nsza:       number of sza values
+        repeat:     number of repetitions
+        dlut:       resolution of lookup table in deg.
+        res:        dictionary with timings of each variant (see timed), number of
+                    reactions and maximum deviations of evaluator and lookup table
+                    from the loop relative to the maximum j value
+
+    internal:
+        fits:       Results of batched fits of all reactions
+        ev:         evaluator
+        sza:        random sza values in deg. (0 to 100 deg.)
+        jref:       j values of naive loop
+
+    Dependencies:
+        uses:           numpy, timed, datfcn, fitfcn, pltfcn.scatdat, evalfcn
+        called from:    benchMCM (main)
+    """
+    from datfcn import parse, select_fit_window
+    from fitfcn import phot, fitBatch
+    from pltfcn import scatdat
+    from evalfcn import Evaluator
+
+    def loop(sza):
+        x = np.deg2rad(sza)
+        j = np.empty((len(sza),len(ev)))
+        for k in range(len(ev)):
+            j[:,k] = np.where(x < np.pi/2.,phot((ev.l[k],ev.m[k],ev.n[k]),x),0.)
+        return j
+
+    rxn, data, om = scatdat(*parse(file))
+    xdata, ydata = select_fit_window(data,90.)
+    ifit = np.flatnonzero(ydata.sum(axis=0) != 0.)
+    fits = fitBatch(xdata,ydata[:,ifit])
+    ev = Evaluator.fromout(rxn,list(zip(ifit,fits)))
+    ev.mklut(np.arange(0.,90.+dlut/2.,dlut))
+    sza = np.random.RandomState(0).uniform(0.,100.,nsza)
+
+    res = {'nrxn': len(ev)}
+    with np.errstate(all='ignore'):
+        res['loop'], jref = timed(loop,(sza,),repeat)
+    res['evaluator'], j = timed(ev,(sza,),repeat)
+    res['lookup'], jlut = timed(ev.lookup,(sza,),repeat)
+    res['dev_evaluator'] = float(np.abs(j - jref).max()/np.abs(jref).max())
+    res['dev_lookup'] = float(np.abs(jlut - jref).max()/np.abs(jref).max())
+    return res
+#______________________________________________________________________________________________
+
+def tinit(file,repeat=3,tol=0.01):
+    """
+    Function tinit
+    ==============
+
+    Purpose:
+        Quality and runtime of the initial guesses 'fixed', 'loglin' and 'grid'
+        (see fitfcn.guess) for serial leastsq fits of all reactions in a TUV file.
+        Fits with an RMSE more than tol above the smallest RMSE of all initial guesses
+        of the reaction are counted as poor local minima.
+
+    Variables:
+    I/O:
+        file:       name of input file with TUV data
+        repeat:     number of repetitions
+        tol:        relative tolerance of RMSE for poor local minima
+        res:        dictionary with timings (see timed), number of fits without convergence,
+                    number of poor local minima, total number of function evaluations
+                    and median RMSE relative to the best RMSE for each initial guess
+
+    internal:
+        ctx:        fit context
+        yfit:       j values of all reactions with non-zero j values
+        fits:       Results of all fits for each initial guess
+        rmse:       RMSE of all fits (rows: initial guesses)
+        best:       smallest RMSE of each reaction
+
+    Dependencies:
+        uses:           numpy, timed, datfcn, fitfcn.mkcontext, parfcn.fitAll, pltfcn.scatdat
+        called from:    benchMCM (main)
+    """
+    from datfcn import parse, select_fit_window
+    from fitfcn import mkcontext
+    from parfcn import fitAll
+    from pltfcn import scatdat
+
+    rxn, data, om = scatdat(*parse(file))
+    xdata, ydata = select_fit_window(data,90.)
+    ctx = mkcontext(data[:,0],90.)
+    yfit = [ydata[:,y] for y in np.flatnonzero(ydata.sum(axis=0) != 0.)]
+
+    inits = ['fixed','loglin','grid']
+    res, fits = {}, {}
+    with np.errstate(all='ignore'):
+        for i in inits:
+            res[i], fits[i] = timed(fitAll,(ctx,yfit,1,'process','leastsq',i),repeat)
+    rmse = np.array([[r.rmse if r.status == 0 else np.inf for r in fits[i]] for i in inits])
+    best = rmse.min(0)
+    for k, i in enumerate(inits):
+        res[i]['nbad'] = sum(r.status != 0 for r in fits[i])
+        res[i]['npoor'] = int(np.sum(rmse[k] > (1.+tol)*best))
+        res[i]['nfev'] = sum(int(r.nfev) for r in fits[i])
+        res[i]['rmse_rel'] = float(np.median(rmse[k]/best))
+    return res
+#______________________________________________________________________________________________
+
+def benchinfo():
+    """
+    Function benchinfo
+    ==================
+
+    Purpose:
+        Collect information on the benchmark environment (git commit, versions,
+        date) to compare benchmark results across commits.
+
+    Variables:
+    I/O:
+        info:       dictionary with environment information
+
+    internal:
+        path:       folder with the photMCM modules
+
+    Dependencies:
+        uses:           os, subprocess, platform, datetime, numpy, scipy
+        called from:    benchMCM (main)
+    """
+    import os
+    import subprocess
+    import platform
+    import scipy
+    from datetime import datetime as dt
+
+    path = os.path.dirname(os.path.abspath(__file__))
+    info = {'date': dt.now().isoformat(), 'python': platform.python_version(),
+            'numpy': np.__version__, 'scipy': scipy.__version__,
+            'machine': platform.machine(), 'ncpu': os.sysconf('SC_NPROCESSORS_ONLN')}
+    try:
+        info['commit'] = subprocess.check_output(['git','rev-parse','HEAD'],cwd=path,
+                                                 stderr=subprocess.STDOUT).strip()
+    except (OSError, subprocess.CalledProcessError):
+        info['commit'] = None
+    return info
+#______________________________________________________________________________________________
@@ -0,0 +1,199 @@
+"""
+Module cachefcn
+===============
+version 1.1
+-------------
+
+List of function focused on the persistent cache of fit results.
+Results are stored in an SQLite data base keyed by a hash of the fit data
+and fit options and evicted in least-recently-used order. Alternatively,
+results of the previous run of a scenario are kept in memory (MemCache).
+contains:
+    - MemCache
+    - opencache
+    - cachekey
+    - getcache
+    - putcache
+"""
+
+import sys
+import numpy as np
+
+# version of the cached fit results, part of all cache keys: increase with changes of
+# the fit functions or of Result, cached results of previous versions are not used
+cacheversion = 2
+#______________________________________________________________________________________________
+
+class MemCache(dict):
+    """
+    Class MemCache
+    ==============
+
+    Purpose:
+        In-memory cache with the fit results of the previous run of a scenario
+        (used by long-running processes, see watchMCM). Can be passed to the
+        cache functions instead of a file name. After each run, only the results
+        of the reactions of this run are kept.
+
+    Variables:
+        keep:       keys of the current run
+    """
+
+    def __init__(self):
+        dict.__init__(self)
+        self.keep = set()
+
+    def __str__(self):
+        return "in memory"
+
+    def close(self):
+        return None
+#______________________________________________________________________________________________
+
+def opencache(file):
+    """
+    Function opencache
+    ==================
+
+    Purpose:
+        Open (or create) the SQLite data base with cached fit results.
+        In-memory caches are returned unchanged.
+
+    Variables:
+    I/O:
+        file:   file name of the cache (or MemCache)
+        db:     connection to the data base (or MemCache)
+
+    Dependencies:
+        uses:           sqlite3
+        called from:    datfcn.xydat
+    """
+    import sqlite3
+
+    if (isinstance(file,MemCache)):
+        return file
+    db = sqlite3.connect(file)
+    db.execute("CREATE TABLE IF NOT EXISTS fits (key TEXT PRIMARY KEY, result BLOB, used INTEGER)")
+    db.execute("CREATE INDEX IF NOT EXISTS lru ON fits (used)")
+    db.commit()
+    return db
+#______________________________________________________________________________________________
+
+def cachekey(xdata,ydata,co,opts,w=None):
+    """
+    Function cachekey
+    =================
+
+    Purpose:
+        Derive a key for the cache from the content of the x and y data of a
+        reaction, the cut-off, further fit options, weights of the residuals and
+        the version of the cached results (cacheversion).
+
+    Variables:
+    I/O:
+        xdata,ydata:    x-,y-data for curve fit (sza and j values)
+        co:             threshold (cut-off parameter for sza) in deg.
+        opts:           tuple with further options affecting the fit result
+        w:              weights of each data point (None: absolute residuals)
+        key:            hexadecimal SHA-1 hash
+
+    internal:
+        h:              hash object
+
+    Dependencies:
+        uses:           hashlib, numpy, cacheversion, fitfcn.Result
+        called from:    datfcn.xydat
+    """
+    import hashlib
+    from fitfcn import Result
+
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(xdata,dtype=float).tostring())
+    h.update(np.ascontiguousarray(ydata,dtype=float).tostring())
+    if (w is not None):
+        h.update(np.ascontiguousarray(w,dtype=float).tostring())
+    h.update(repr((cacheversion,float(co),tuple(opts),Result._fields)).encode('utf-8'))
+    return h.hexdigest()
+#______________________________________________________________________________________________
+
+def getcache(db,keys):
+    """
+    Function getcache
+    =================
+
+    Purpose:
+        Retrieve cached fit results and mark them as recently used.
+
+    Variables:
+    I/O:
+        db:     connection to the data base (or MemCache)
+        keys:   list of keys
+        hits:   dictionary with keys and Results found in the cache
+
+    internal:
+        now:    counter for least-recently-used order
+        row:    row of data base
+
+    Dependencies:
+        uses:           cPickle
+        called from:    datfcn.xydat
+    """
+    import cPickle as pickle
+
+    if (isinstance(db,MemCache)):
+        db.keep = set(keys)
+        return dict((k,db[k]) for k in keys if k in db)
+    hits = {}
+    now = db.execute("SELECT COALESCE(MAX(used),0)+1 FROM fits").fetchone()[0]
+    for k in keys:
+        row = db.execute("SELECT result FROM fits WHERE key=?",(k,)).fetchone()
+        if (row is not None):
+            hits[k] = pickle.loads(str(row[0]))
+    if (hits):
+        db.executemany("UPDATE fits SET used=? WHERE key=?",[(now,k) for k in hits])
+        db.commit()
+    return hits
+#______________________________________________________________________________________________
+
+def putcache(db,items,maxsize=10000):
+    """
+    Function putcache
+    =================
+
+    Purpose:
+        Store fit results in the cache and evict least recently used entries
+        exceeding the maximum size. In-memory caches keep only the results of
+        the current run (see getcache).
+
+    Variables:
+    I/O:
+        db:         connection to the data base (or MemCache)
+        items:      list of tuples with keys and Results
+        maxsize:    maximum number of entries in cache
+
+    internal:
+        now:        counter for least-recently-used order
+        n:          number of entries in cache
+
+    Dependencies:
+        uses:           cPickle, sqlite3
+        called from:    datfcn.xydat
+    """
+    import cPickle as pickle
+    import sqlite3
+
+    if (isinstance(db,MemCache)):
+        db.update(items)
+        for k in set(db) - db.keep:
+            del db[k]
+        return None
+    now = db.execute("SELECT COALESCE(MAX(used),0)+1 FROM fits").fetchone()[0]
+    db.executemany("INSERT OR REPLACE INTO fits VALUES (?,?,?)",
+                   [(k,sqlite3.Binary(pickle.dumps(r,2)),now) for k,r in items])
+    n = db.execute("SELECT COUNT(*) FROM fits").fetchone()[0]
+    if (n > maxsize):
+        db.execute("DELETE FROM fits WHERE key IN (SELECT key FROM fits ORDER BY used LIMIT ?)",
+                   (n-maxsize,))
+    db.commit()
+    return None
+#______________________________________________________________________________________________
@@ -6,16 +6,264 @@ version 1.1
 
 List of function focused on data processing.
 contains:
+    - parseall
+    - mmapall
+    - parse
     - load
     - trans
     - ReadBetween
     - order
+    - readweights
+    - select_fit_window
     - xydat
+    - plotdat
 """
 
 import sys
+import numpy as np
 #______________________________________________________________________________________________
 
+def parseall(file,nblock=None):
+    """
+    Function parseall
+    =================
+
+    Purpose:
+        Read TUV output in a single pass and return the list of photoreactions
+        and the matrices with sza in 0-column and j-values in following columns
+        for every altitude block ('values at z = ...' followed by a matrix starting
+        with 'sza, deg.' and ending with a dashed line) as contiguous float arrays
+        without intermediate string matrices.
+
+    Variables:
+    I/O:
+        file:   name of input file with TUV data
+        nblock: maximum number of altitude blocks read (None: all blocks)
+        rxn:    indices and strings with photoreactions
+        z:      list with altitudes in km of each block
+        mats:   list with numpy arrays of shape (n_sza, n_rxn+1) with TUV ouput of each
+                block, first column sza in deg., following columns j values in s-1
+
+    internal:
+        state:  current block in input file (0: before header, 1: header with
+                photoreactions, 2: before matrix, 3: matrix)
+        ncol:   number of columns in matrix (from column header)
+        rows:   lines with j values of the current matrix
+        fin:    variable for opening input file
+        line:   lines read in from input file
+
+    Dependencies:
+        uses:           numpy
+        called from:    datfcn.parse, batchMCM (main)
+    """
+
+    def block(rows,ncol):
+        # convert lines of a matrix to a float array
+        data = np.fromstring(''.join(rows),sep=' ')
+        if (ncol == 0 or data.size % ncol != 0):
+            raise ValueError("Incomplete matrix with j values in TUV file %s." % file)
+        return data.reshape(-1,ncol)
+
+    state = 0
+    ncol = 0
+    rxn = []
+    z = []
+    mats = []
+    with open(file,'r') as fin:
+        for line in fin:
+            if (state == 3):
+                if (line.startswith("------")):
+                    mats.append(block(rows,ncol))
+                    state = 2
+                    if (nblock is not None and len(mats) >= nblock):
+                        break
+                else:
+                    rows.append(line)
+            elif (state == 2):
+                if ("values at z =" in line):
+                    z.append(float(line.split("=")[1].split()[0]))
+                elif ("sza, deg." in line):
+                    ncol = len(line.split()) - 1
+                    rows = []
+                    state = 3
+            elif (state == 1):
+                if ("values at z =" in line):
+                    z.append(float(line.split("=")[1].split()[0]))
+                    state = 2
+                elif (" = " in line):
+                    head = line.split(" = ")
+                    rxn.append([int(head[0]),head[1].replace('\n', ' ').strip()])
+            elif ("Photolysis rate coefficients, s-1" in line):
+                state = 1
+
+    if (len(mats) == 0):
+        raise ValueError("No matrix with j values found in TUV file %s." % file)
+    z = z[:len(mats)]
+    return rxn, z, mats
+#______________________________________________________________________________________________
+
+
+def mmapall(file,cols=None,nblock=None,chunk=2**22):
+    """
+    Function mmapall
+    ================
+
+    Purpose:
+        Read TUV output from a memory-mapped file. Offsets of the header and the
+        matrices of each altitude block are found by byte searches, numeric blocks
+        are parsed in chunks of lines directly into preallocated float arrays.
+        Optionally, only selected reaction columns are loaded, so peak memory stays
+        close to the size of the final arrays. Returns the same output as parseall.
+
+    Variables:
+    I/O:
+        file:   name of input file with TUV data
+        cols:   list with numbers of photoreactions (columns in TUV matrix, starting at 1)
+                to be loaded (None: all reactions)
+        nblock: maximum number of altitude blocks read (None: all blocks)
+        chunk:  size of chunks in bytes parsed at once
+        rxn:    indices and strings with (selected) photoreactions
+        z:      list with altitudes in km of each block
+        mats:   list with numpy arrays of shape (n_sza, n_cols+1) with TUV ouput of each
+                block, first column sza in deg., following columns j values in s-1
+
+    internal:
+        mm:         memory-mapped file
+        pos:        current offset in file
+        start,end:  offsets of the first line and the end of a matrix
+        ncol:       number of columns in matrix (from column header)
+        icol:       indices of loaded columns in matrix (None: all columns)
+        nrow:       number of lines in matrix
+        a,b:        offsets of current chunk
+        data:       float array of current chunk
+        fin:        variable for opening input file
+
+    Dependencies:
+        uses:           mmap, numpy
+        called from:    photMCM (main), batchMCM (main), benchfcn.suite
+    """
+    import mmap
+
+    def line(pos):
+        # line starting at offset pos and offset of next line
+        eol = mm.find(b"\n",pos)
+        if (eol < 0):
+            eol = len(mm)
+        text = mm[pos:eol]
+        if (not isinstance(text,str)):
+            text = text.decode('latin-1')
+        return text, eol+1
+
+    def block(start,end,ncol):
+        # parse matrix between offsets start and end in chunks of lines
+        nrow = 0
+        bounds = []
+        a = start
+        while (a < end):
+            b = mm.rfind(b"\n",a,min(a+chunk,end))
+            if (b < 0 or a+chunk >= end):
+                b = end
+            else:
+                b += 1
+            bounds.append((a,b))
+            nrow += mm[a:b].count(b"\n")
+            a = b
+        if (icol is None):
+            mat = np.empty((nrow,ncol))
+        else:
+            mat = np.empty((nrow,len(icol)))
+        i = 0
+        for a, b in bounds:
+            data = np.fromstring(mm[a:b],sep=' ')
+            if (data.size % ncol != 0):
+                raise ValueError("Incomplete matrix with j values in TUV file %s." % file)
+            data = data.reshape(-1,ncol)
+            if (icol is not None):
+                data = data[:,icol]
+            mat[i:i+len(data)] = data
+            i += len(data)
+        return mat[:i]
+
+    rxn = []
+    z = []
+    mats = []
+    with open(file,'rb') as fin:
+        mm = mmap.mmap(fin.fileno(),0,access=mmap.ACCESS_READ)
+        try:
+            # header with photoreactions
+            pos = mm.find(b"Photolysis rate coefficients, s-1")
+            if (pos < 0):
+                raise ValueError("No matrix with j values found in TUV file %s." % file)
+            end = mm.find(b"values at z =",pos)
+            head, pos = line(pos)
+            while (pos < end or (end < 0 and pos < len(mm))):
+                head, pos = line(pos)
+                if (" = " in head):
+                    head = head.split(" = ")
+                    rxn.append([int(head[0]),head[1].strip()])
+
+            # column selection
+            icol = None
+            if (cols is not None):
+                cols = list(cols)
+                if (any(c < 1 or c > len(rxn) for c in cols)):
+                    raise ValueError("Unknown reaction in selected columns %s." % cols)
+                icol = [0] + cols
+                rxn = [rxn[c-1] for c in cols]
+
+            # matrices of all altitude blocks
+            pos = end
+            while (pos >= 0 and (nblock is None or len(mats) < nblock)):
+                head, pos = line(pos)
+                zi = float(head.split("=")[1].split()[0])
+                pos = mm.find(b"sza, deg.",pos)
+                if (pos < 0):
+                    break
+                head, start = line(pos)
+                ncol = len(head.split()) - 1
+                end = mm.find(b"\n------",start)
+                if (end < 0):
+                    raise ValueError("Incomplete matrix with j values in TUV file %s." % file)
+                mats.append(block(start,end+1,ncol))
+                z.append(zi)
+                pos = mm.find(b"values at z =",end)
+        finally:
+            mm.close()
+
+    if (len(mats) == 0):
+        raise ValueError("No matrix with j values found in TUV file %s." % file)
+    return rxn, z, mats
+#______________________________________________________________________________________________
+
+
+def parse(file):
+    """
+    Function parse
+    ==============
+
+    Purpose:
+        Read TUV output in a single pass and return the list of photoreactions
+        and the matrix with sza in 0-column and j-values in following columns
+        of the first altitude block as contiguous float array.
+
+    Variables:
+    I/O:
+        file:   name of input file with TUV data
+        rxn:    indices and strings with photoreactions
+        data:   numpy array of shape (n_sza, n_rxn+1) with TUV ouput, first column
+                sza in deg., following columns j values in s-1
+
+    Dependencies:
+        uses:           parseall
+        called from:    photMCM (main), datfcn.load
+    """
+
+    rxn, z, mats = parseall(file,1)
+    data = mats[0]
+    return rxn, data
+#______________________________________________________________________________________________
+
+
 def load(file):
     """
     Function load
@@ -23,6 +271,7 @@ def load(file):
         
     Purpose:
         Derive matrix with sza in 0-column and j-values in folliwing columns.
+        Thin wrapper around function parse for the previous API.
     
     Variables:
     I/O:
@@ -31,19 +280,12 @@ def load(file):
         mat:    matrix with TUV ouput, first column sza in deg.,
                 following columns j values in s-1
     
-    internal:
-        s:      counter
-    
     Dependencies:
-        uses:           function ReadBetween
+        uses:           function parse
         called from:    photMCM (main)
     """
-    
-    head = ReadBetween(file,"Photolysis rate coefficients, s-1","values at z =      0.500 km"," = ")
-    mat  = ReadBetween(file,"sza, deg.","------------------------------------------------------------","")
-    for s in range(len(head)):
-        head[s][0] = int(head[s][0])
-        head[s][1] = head[s][1].replace('\n', ' ').strip()
+
+    head, mat = parse(file)
     return head, mat
 #______________________________________________________________________________________________
 
@@ -54,26 +296,19 @@ def trans(raw):
     ==============
     Purpose:
         Transform matrix with TUV data from strings to floats.
+        Matrices already returned as float arrays by parse/load are passed through.
         
     Variables:
     I/O:
-        raw:    input matrix with strings
-        data:   output matrix with floats
-        
-    internal:
-        i, j:   indices (for matrix)
+        raw:    input matrix with strings or floats
+        data:   output matrix with floats (numpy array)
     
     Dependencies:
+        uses:           numpy
         called from:    photMCM (main)
-
-
-    to generate list of tuples instead of matrix use:
-    idx = [0,1]
-    for j in range(len(raw[0])):
-    data.append( (raw[idx[0]][j], raw[idx[1]][j]) )
     """
 
-    data = [[float(raw[i][j]) for j in range(len(raw[0]))] for i in range(len(raw))]
+    data = np.asarray(raw,dtype=float)
     return data
 #______________________________________________________________________________________________
 
@@ -103,7 +338,7 @@ def ReadBetween(file,start,end,colsep):
             
         
     Dependencies:
-        called from:    datfcn.load
+        called from:    general purpose (superseded by datfcn.parse for TUV files)
     """
 
     started = False
@@ -131,19 +366,26 @@ def order(val):
     Purpose:
         Determine the order of magnitude of a given value (val).
         Return the order as number and a factor 10^(order).
+        For arrays, orders and factors of all elements are returned as arrays.
         
     Variables:
     I/O:
-        val:    input value (any number)
+        val:    input value (any number or array)
         ord:    order of magnitude
                 (negative integers for values < 0, 0 for 0, positvie values for values > 0)
         mult:   factor 10^(order)
         
     Dependencies:
         uses:           numpy
-        called from:    fitfcn.fitTUV, fitfcn.fitStat, pltfcn.scatdat
+        called from:    fitfcn.fitTUV, fitfcn.fitStat, fitfcn.fitBatch, pltfcn.scatdat
     """
-    import numpy as np
+    if (np.ndim(val) > 0):
+        val = np.asarray(val,dtype=float)
+        ord = np.zeros(val.shape)
+        nz = val != 0
+        ord[nz] = np.floor(np.log10(np.abs(val[nz])))
+        mult = 10.**ord
+        return ord, mult
     if (val != 0):
         ord  = np.floor(np.log10(np.abs(val)))
     else:
@@ -152,70 +394,278 @@ def order(val):
     return ord, mult
 #______________________________________________________________________________________________
 
-def xydat(data,rxn,co,om,fout,fpar,scen):
+def readweights(file):
+    """
+    Function readweights
+    ====================
+
+    Purpose:
+        Read user-supplied weights of the residuals from a text file with sza in deg.
+        in the first and weights in the second column (lines starting with # are ignored).
+        Weights are interpolated to the sza of the TUV data in xydat.
+
+    Variables:
+    I/O:
+        file:   name of file with weights
+        weight: tuple with arrays of sza in deg. (ascending) and weights
+
+    internal:
+        sza,w:  sza and weights
+        i:      indices of ascending sza
+
+    Dependencies:
+        uses:           numpy
+        called from:    photMCM (main), batchMCM (main)
+    """
+
+    sza, w = np.loadtxt(file,usecols=(0,1),unpack=True,ndmin=2)
+    i = np.argsort(sza)
+    weight = (sza[i],w[i])
+    return weight
+#______________________________________________________________________________________________
+
+def select_fit_window(data,cutoff):
+    """
+    Function select_fit_window
+    ==========================
+
+    Purpose:
+        Select data for curve fitting below the sza cut-off with a single boolean
+        mask over the whole data matrix. For sorted sza (contiguous selection),
+        the returned arrays are views of data without copies.
+
+    Variables:
+    I/O:
+        data:       matrix with TUV data (sza in rad in column 0, j values in following columns)
+        cutoff:     threshold (cut-off parameter for sza) in deg.
+        xdata:      sza grid for curve fitting
+        ydata:      2-D block with j values for curve fitting (reactions in columns)
+
+    internal:
+        mask:       mask of rows with sza below the cut-off
+        idx:        indices of selected rows
+        block:      selected rows of data
+
+    Dependencies:
+        uses:           numpy
+        called from:    datfcn.xydat
+    """
+
+    data = np.asarray(data,dtype=float)
+    mask = data[:,0] < np.deg2rad(cutoff)
+    idx = np.flatnonzero(mask)
+    if (idx.size > 0 and idx[-1] - idx[0] + 1 == idx.size):
+        block = data[idx[0]:idx[-1]+1]
+    else:
+        block = data[mask]
+    xdata = block[:,0]
+    ydata = block[:,1:]
+    return xdata, ydata
+#______________________________________________________________________________________________
+
+def xydat(data,rxn,co,om,sink,scen,jobs=1,kind='process',method='leastsq',init='fixed',
+          cache=None,maxcache=10000,pool=None,rep=None,loss='linear',retry=False,weight='abs',
+          nboot=0,seed=0):
     """
     Function xydat
     ==============
     
     Purpose:
         Retrieve x and y data for curve fitting (threshold can be introduced to cut off values).
+        Fit all photoreactions (in parallel for more than one job) and emit the results
+        to the result sink in the order of the reactions. Fits without convergence are reported with
+        their status code. Optionally, bootstrap confidence intervals of the parameters
+        are derived for each fit. Results of reactions with unchanged data are
+        taken from the cache, if a cache file is given. Plots are rendered
+        by the caller in a separate stage after the outputs are saved (see plotdat).
+        Timings of each stage and reaction are added to the run report, if given.
         
     Variables:
     I/O:
         co:             threshold (cut-off parameter for sza) for TUV input data in deg.
         data:           matrix with TUV data
         rxn:            header of TUV matrix (used to determine size of matrix and print progress)
-        fout,fpar:      identifiers for output files
+        sink:           result sink receiving the record (rxn, reaction index, Result) of
+                        each fit (see sinkfcn, e.g. sinkfcn.mksinks), closed by the caller
         om:             matrix with all orders of magnitudes for parameter l of fitting curve
         scen:           scenario name
+        jobs:           number of workers for curve fitting (1: serial, 0: number of cpus)
+        kind:           type of worker pool ('process' or 'thread')
+        method:         solver for curve fitting ('leastsq' or 'batch')
+        init:           initial guess for curve fitting ('fixed', 'loglin' or 'grid')
+        cache:          file name of the cache with fit results (None: no cache)
+                        or cachefcn.MemCache with results of the previous run
+        maxcache:       maximum number of cached fit results
+        pool:           existing worker pool shared between calls for curve fitting
+                        (None: pool is created from jobs and kind)
+        rep:            run report (see repfcn, None: no report)
+        loss:           loss function ('linear', 'huber' or 'soft_l1', see fitfcn.fitTUV)
+        retry:          switch for retries of fits without convergence (see fitfcn.fitRobust)
+        weight:         weighting of residuals ('abs', 'rel', 'cos' or tuple with arrays of
+                        sza in deg. and user weights interpolated to the sza of the data,
+                        see fitfcn.weights)
+        nboot:          number of bootstrap resamples for confidence intervals (0: none,
+                        see fitfcn.bootRxn, loss function 'linear' only)
+        seed:           seed of the bootstrap (combined with the index of each reaction)
+        out:            list with reaction indices and Results of all fits
+        pages:          arguments for plots of all fitted reactions (see plotdat)
         
     internal:
-        x,y:            counters/indices
+        y:              counter/index
         xdata:          data of independent variable (sza) for curve fitting
+        ctx:            fit context with cos, ln cos and sec of xdata shared by all fits
+                        (see fitfcn.mkcontext)
+        yblock:         data of dependent variable (j values) for all reactions
         ydata:          data of dependent variable (j values) for curve fitting
+        yfit:           list of ydata (column views) for all reactions with non-zero j values
+        wblock,wfit:    weights of all reactions and list of weights of fitted reactions
+                        (None for absolute residuals)
+        ifit:           indices of reactions with non-zero j values
+        res:            y data and Results of all fits by reaction index
+        db:             connection to the cache data base
+        keys:           cache keys of all reactions with non-zero j values
+        opts:           fit options in the cache keys
+        hits:           cached Results by key
+        new:            indices (in yfit) of reactions to be fitted
+        r:              Result of current fit
+        nbad:           number of fits with status code other than 0
+        cis:            bootstrap confidence intervals of new fits
     
     Dependencies:
-        uses:           numpy, matplotlib/PdfPages, fitfcn.fitTUV, fitfcn.fitStat, pltfcn.pfit
-        called from:    photMCM (main)
+        uses:           numpy, select_fit_window, fitfcn.mkcontext, parfcn.fitAll, parfcn.bootAll,
+                        cachefcn, repfcn.stage, repfcn.rxnrep
+        called from:    photMCM (main), batchMCM (main), watchMCM (main)
     """
     # import functions
-    import numpy as np
-    from fitfcn import *
-    from pltfcn import *
-    import matplotlib as mpl
-    from matplotlib.backends.backend_pdf import PdfPages
-    
-    #set output for plotting
-    mpl.rc('text', usetex = True)
-#    mpl.rc('font',**{'family':'sans-serif','sans-serif':['Helvetica']})
-    mpl.rcParams.update({'figure.autolayout': True})
-    xdata = []
-    
-    # declare x data for fit (sza)
-    for x in range(len(data)):
-        if (data[x][0] < np.deg2rad(co)):
-            xdata = np.append(xdata,data[x][0])
+    from parfcn import fitAll, bootAll
+    from repfcn import stage, rxnrep
+    from fitfcn import fitstatus, weights, mkcontext
+
+    if (nboot > 0 and loss != 'linear'):
+        raise ValueError("Bootstrap requires loss function 'linear', not '%s'." % loss)
 
-    pp  = PdfPages('%s.pdf' % scen) # define output
+    # declare x and y data for fit (sza and j values)
+    with stage(rep,'select'):
+        xdata, yblock = select_fit_window(data,co)
+        ctx = mkcontext(data[:,0],co)
+
+        # collect y data of all photoreactions, skip columns with only zeros
+        ifit = np.flatnonzero(yblock.sum(axis=0) != 0.)
+        yfit = [yblock[:,y] for y in ifit]
+
+        # weights of residuals
+        if (isinstance(weight,str)):
+            wblock = weights(ctx,yblock,weight)
+        else:
+            wblock = weights(ctx,yblock,np.interp(np.rad2deg(xdata),*weight))
+        if (wblock is None):
+            wfit = [None]*len(yfit)
+        else:
+            wfit = [wblock[:,y] for y in ifit]
+
+    # retrieve unchanged reactions from cache
+    hits = {}
+    opts = (method,init,loss,retry)
+    if (nboot > 0):
+        opts = opts + (nboot,seed)
+    if (cache is not None):
+        from cachefcn import opencache, cachekey, getcache, putcache
+        with stage(rep,'cache'):
+            db = opencache(cache)
+            keys = [cachekey(xdata,ydata,co,opts,w) for ydata,w in zip(yfit,wfit)]
+            hits = getcache(db,keys)
+        new = [i for i in range(len(yfit)) if keys[i] not in hits]
+    else:
+        new = range(len(yfit))
+
+    # least square curve fitting and calculation of statistical data:
+    with stage(rep,'fit'):
+        fits = fitAll(ctx,[yfit[i] for i in new],jobs,kind,method,init,pool,loss,retry,
+                      None if wblock is None else [wfit[i] for i in new])
+    if (nboot > 0):
+        with stage(rep,'bootstrap'):
+            cis = bootAll(ctx,[yfit[i] for i in new],fits,nboot,[[seed,ifit[i]] for i in new],
+                          jobs,kind,pool,None if wblock is None else [wfit[i] for i in new],
+                          retry=retry)
+            fits = [r._replace(ci=c) for r,c in zip(fits,cis)]
+    if (cache is not None):
+        with stage(rep,'cache'):
+            putcache(db,[(keys[i],r) for i,r in zip(new,fits)],maxcache)
+            db.close()
+        print "%i of %i fits taken from cache %s.\n" % (len(yfit)-len(new),len(yfit),cache)
+        fits = dict(zip(new,fits))
+        res = [fits[i] if i in fits else hits[keys[i]] for i in range(len(yfit))]
+    else:
+        res = fits
+    res = dict(zip(ifit,zip(yfit,res)))
 
     # loop over photoreactions
-    for y in range(len(rxn)):
-        print rxn[y][1] # progress output to screen
-        ydata = []
-    
-        for x in range(len(data)):
-            if (data[x][0] < np.deg2rad(co)):
-                ydata = np.append(ydata,data[x][y+1]) # define current y-data
-        if (ydata.sum() == 0.): #skip columns with only zeros
-            print "Column contains only zeros.\nSkipping data processing."
-            continue
-        # least square curve fitting:
-        p,l,ol,m,n,cov,infodict = fitTUV(xdata,ydata)
-        # calculation of statistical data:
-        rsquared,ss_tot,rmse,el,em,en = fitStat(xdata,ydata,p,cov,infodict)
-        # printing output:
-        pfit(fout,fpar,pp,rxn,xdata,ydata,y,p,om,l,m,n,ol,el,em,en,rsquared,ss_tot,rmse,scen)
-    pp.close()
-    return None
+    pages = []
+    out = []
+    nbad = 0
+    with stage(rep,'write'):
+        for y in range(len(rxn)):
+            print rxn[y][1] # progress output to screen
+            if (y not in res): #skip columns with only zeros
+                print "Column contains only zeros.\nSkipping data processing."
+                continue
+            ydata, r = res[y]
+            if (r.status != 0):
+                nbad += 1
+                if (np.isfinite(r.co)):
+                    print "Fit status %i: %s (sza < %.1f deg.)." % (r.status,fitstatus[r.status],r.co)
+                else:
+                    print "Fit status %i: %s." % (r.status,fitstatus[r.status])
+            # output of the fit to all result sinks:
+            sink.write(rxn,y,r)
+            pages.append((rxn[y][1],xdata,ydata,r.p,om[y+1]))
+            out.append((y,r))
+    if (rep is not None):
+        rxnrep(rep,scen,rxn,out,set(np.delete(ifit,new)))
+    print "\n%i fits with %i iterations and %i function evaluations in total." \
+        % (len(res),sum(r.niter for y,r in res.values()),sum(r.nfev for y,r in res.values()))
+    if (nbad > 0):
+        print "%i fits with status code other than 0 (see fitfcn.fitstatus)." % nbad
+
+    return out, pages
+
+#______________________________________________________________________________________________
+
+def plotdat(scen,pages,plots='tex',jobs=1,pool=None,rep=None):
+    """
+    Function plotdat
+    ================
+
+    Purpose:
+        Plotting stage after the outputs of the fits are saved: plots of the TUV data
+        and the fitted functions of all reactions (see pltfcn.plotall). Plot errors
+        (e.g. LaTeX not available for plot mode 'tex') are reported on screen and
+        do not affect the saved outputs, the previous plots are kept.
+
+    Variables:
+    I/O:
+        scen:           scenario name
+        pages:          arguments for plots of all fitted reactions (see xydat)
+        plots:          plot mode ('none', 'fast' or 'tex', see pltfcn.plotall)
+        jobs:           number of workers for rendering (1: serial, 0: number of cpus)
+        pool:           existing pool of processes for rendering (None: pool is created
+                        from jobs)
+        rep:            run report (see repfcn, None: no report)
+        ok:             switch for successfully rendered plots
+
+    Dependencies:
+        uses:           pltfcn.plotall, repfcn.stage
+        called from:    photMCM (main), batchMCM (main), watchMCM (main)
+    """
+    from pltfcn import plotall
+    from repfcn import stage
+
+    try:
+        with stage(rep,'plot'):
+            plotall(scen,pages,plots,jobs,pool)
+    except Exception as err:
+        print "\n%s\nPlots of %s not saved." % (err,scen)
+        return False
+    return True
 
 #______________________________________________________________________________________________
\ No newline at end of file
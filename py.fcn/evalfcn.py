@@ -0,0 +1,156 @@
+"""
+Module evalfcn
+==============
+version 1.1
+-------------
+
+List of function focused on the evaluation of fitted MCM parameterisations
+j = l*(cos(x))^m*exp(-n*sec(x)) for many reactions and solar zenith angles.
+contains:
+    - Evaluator
+    - readpar
+"""
+
+import sys
+import numpy as np
+#______________________________________________________________________________________________
+
+class Evaluator(object):
+    """
+    Class Evaluator
+    ===============
+
+    Purpose:
+        Evaluate the MCM parameterisations of all fitted reactions for arrays of
+        solar zenith angles in one batched numpy call. cos(x) and sec(x) are derived
+        once per call, j values for x >= 90 deg. are 0. Optionally, j values are
+        interpolated linearly in a lookup table for a fixed sza grid.
+
+        ev = Evaluator.fromrec(iofcn.loadpar("<scen>.npy"))
+        j = ev(sza)                     # shape sza.shape + (number of reactions,)
+        ev.mklut(np.arange(0.,90.1,0.5))
+        j = ev.lookup(sza)
+
+    Variables:
+        rxn:        numbers of photoreactions
+        label:      labels of photoreactions
+        l,m,n:      arrays with parameters of all reactions
+        grid:       sza grid of lookup table in deg. (None: no lookup table)
+        table:      j values on sza grid, shape (len(grid), number of reactions)
+
+    Dependencies:
+        uses:           numpy, iofcn (fromrec), readpar (frompar)
+        called from:    models, benchfcn.teval
+    """
+
+    def __init__(self,rxn,l,m,n,label=None):
+        self.rxn = np.asarray(rxn,dtype=int)
+        self.l = np.asarray(l,dtype=float)
+        self.m = np.asarray(m,dtype=float)
+        self.n = np.asarray(n,dtype=float)
+        if (label is None):
+            label = ["j%i" % r for r in self.rxn]
+        self.label = list(label)
+        self.grid = None
+        self.table = None
+
+    @classmethod
+    def fromrec(cls,rec):
+        # evaluator from structured array with fit results (see iofcn.parrec)
+        return cls(rec['rxn'],rec['l'],rec['m'],rec['n'],list(rec['label']))
+
+    @classmethod
+    def fromout(cls,rxn,out):
+        # evaluator from reaction indices and Results of all fits (see datfcn.xydat)
+        return cls([rxn[y][0] for y, r in out],[r.p[0] for y, r in out],
+                   [r.m for y, r in out],[r.n for y, r in out],[rxn[y][1] for y, r in out])
+
+    @classmethod
+    def frompar(cls,file):
+        # evaluator from parameter file <scen>.par
+        rxn, l, m, n = readpar(file)
+        return cls(rxn,l,m,n)
+
+    def __len__(self):
+        return len(self.rxn)
+
+    def __call__(self,sza,deg=True):
+        """
+        j values of all reactions for an array of sza (in deg. or, if deg is False,
+        in rad.) with shape sza.shape + (number of reactions,).
+        """
+        x = np.asarray(sza,dtype=float)
+        if (deg):
+            day = x.ravel() < 90.
+            x = np.deg2rad(x)
+        else:
+            day = x.ravel() < np.pi/2.
+        c = np.cos(x).ravel()
+        j = np.zeros((c.size,len(self.rxn)))
+        lnc = np.log(c[day])
+        sec = 1./c[day]
+        j[day] = self.l*np.exp(np.outer(lnc,self.m) - np.outer(sec,self.n))
+        return j.reshape(x.shape + (len(self.rxn),))
+
+    def mklut(self,grid):
+        """
+        Lookup table with j values of all reactions on a fixed sza grid in deg.
+        (at least 2 strictly ascending points, values beyond the grid are taken from
+        the nearest grid point).
+        """
+        grid = np.asarray(grid,dtype=float)
+        if (grid.ndim != 1 or grid.size < 2 or np.any(np.diff(grid) <= 0.)):
+            raise ValueError("Lookup table requires a grid of at least 2 strictly ascending sza.")
+        self.grid = grid
+        self.table = self(self.grid)
+        return self
+
+    def lookup(self,sza):
+        """
+        j values of all reactions for an array of sza in deg. interpolated linearly
+        in the lookup table (see mklut).
+        """
+        if (self.grid is None):
+            raise ValueError("No lookup table, call mklut first.")
+        x = np.clip(np.asarray(sza,dtype=float),self.grid[0],self.grid[-1])
+        i = np.clip(np.searchsorted(self.grid,x.ravel()) - 1,0,len(self.grid) - 2)
+        f = ((x.ravel() - self.grid[i])/(self.grid[i+1] - self.grid[i]))[:,None]
+        j = (1. - f)*self.table[i] + f*self.table[i+1]
+        return j.reshape(x.shape + (len(self.rxn),))
+#______________________________________________________________________________________________
+
+def readpar(file):
+    """
+    Function readpar
+    ================
+
+    Purpose:
+        Read parameter file <scen>.par with lines 'j<rxn> l m n'.
+
+    Variables:
+    I/O:
+        file:       name of parameter file
+        rxn:        numbers of photoreactions
+        l,m,n:      arrays with parameters of all reactions
+
+    internal:
+        fin:        variable for opening input file
+        line:       lines read in from input file
+
+    Dependencies:
+        uses:           numpy
+        called from:    Evaluator.frompar
+    """
+
+    rxn, l, m, n = [], [], [], []
+    with open(file,'r') as fin:
+        for line in fin:
+            line = line.split()
+            if (len(line) < 4 or not line[0].startswith('j')):
+                continue
+            rxn.append(int(line[0][1:]))
+            l.append(float(line[1]))
+            m.append(float(line[2]))
+            n.append(float(line[3]))
+    return np.array(rxn), np.array(l), np.array(m), np.array(n)
+#______________________________________________________________________________________________
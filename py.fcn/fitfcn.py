@@ -6,13 +6,127 @@ version 1.1
 
 List of function focused on the parameterisation and curve fitting.
 contains:
+    - Context
+    - mkcontext
+    - subcontext
+    - trig
     - phot
     - residuals
+    - jacobian
+    - weights
+    - guess
     - fitTUV
     - fitStat
+    - fitRobust
+    - fitRxn
+    - fitBatch
+    - bootRxn
 """
 
 import sys
+import time
+import collections
+import numpy as np
+from datfcn import order
+
+# parameters of the MCM parameterisation and collected results of a single fit
+Param = collections.namedtuple('Param','l m n')
+Result = collections.namedtuple('Result','p l ol m n cov rsquared ss_tot rmse el em en niter nfev tfit tstat '
+                                          'status co wrsquared wrmse ci')
+# bootstrap confidence intervals (ci) are only derived on request (see bootRxn)
+Result.__new__.__defaults__ = (None,)
+# status codes of fits
+fitstatus = {0: "converged",
+             1: "converged with alternative initial guess",
+             2: "converged with reduced sza window",
+             3: "not converged",
+             4: "failed"}
+# coarse grid of parameters m, n for the initial guess 'grid' (see guess)
+mgrid = np.linspace(0.,4.,41)
+ngrid = np.linspace(0.,2.,41)
+# fit context with sza, cos(sza), ln(cos(sza)), sec(sza) in the fit window
+Context = collections.namedtuple('Context','x c lnc sec')
+#______________________________________________________________________________________________
+
+def mkcontext(sza,co=90.):
+    """
+    Function mkcontext
+    ==================
+
+    Purpose:
+        Fit context of a scenario with the trigonometric functions of all sza in the
+        fit window, derived once and shared by all fits of the scenario. The context
+        may be passed instead of the sza data to all fit and statistics functions.
+
+    Variables:
+    I/O:
+        sza:        all sza values of the scenario in rad.
+        co:         sza cut-off of the fit window in deg.
+        ctx:        Context with sza (x), cos(x) (c), ln(cos(x)) (lnc), sec(x) (sec)
+                    in the fit window
+
+    internal:
+        x,c:        sza and cos(sza) in the fit window
+
+    Dependencies:
+        uses:           numpy, Context
+        called from:    datfcn.xydat, subcontext
+    """
+
+    sza = np.asarray(sza,dtype=float)
+    x = sza[sza < np.deg2rad(co)]
+    c = np.cos(x)
+    ctx = Context(x,c,np.log(c),1./c)
+    return ctx
+#______________________________________________________________________________________________
+
+def subcontext(ctx,mask):
+    """
+    Function subcontext
+    ===================
+
+    Purpose:
+        Fit context of a reduced fit window sliced from an existing context
+        (without recomputing the trigonometric functions).
+
+    Variables:
+    I/O:
+        ctx:        Context of the full fit window
+        mask:       mask of the reduced fit window in ctx.x
+        sub:        Context of the reduced fit window
+
+    Dependencies:
+        uses:           Context
+        called from:    fitfcn.fitRobust
+    """
+
+    sub = Context(ctx.x[mask],ctx.c[mask],ctx.lnc[mask],ctx.sec[mask])
+    return sub
+#______________________________________________________________________________________________
+
+def trig(xdata):
+    """
+    Function trig
+    =============
+
+    Purpose:
+        sza, cos(x), ln(cos(x)) and sec(x) from a fit context or derived from sza data.
+
+    Variables:
+    I/O:
+        xdata:      Context or sza data (x < 90 deg.)
+        x,c,lnc,sec:sza, cos(x), ln(cos(x)), sec(x)
+
+    Dependencies:
+        uses:           numpy, Context
+        called from:    fitfcn.weights, fitfcn.guess, fitfcn.jacobian, fitfcn.fitBatch
+    """
+
+    if (isinstance(xdata,Context)):
+        return xdata.x, xdata.c, xdata.lnc, xdata.sec
+    x = np.asarray(xdata,dtype=float)
+    c = np.cos(x)
+    return x, c, np.log(c), 1./c
 #______________________________________________________________________________________________
 
 def phot(p,x):
@@ -27,7 +141,8 @@ def phot(p,x):
         Variables:
         I/O:
             p(l,m,n):   array of parameter l (in s-1), m, n
-            x:          sza (independent variable) in parameterisation
+            x:          sza (independent variable) in parameterisation or Context
+                        (precomputed ln(cos(x)) and sec(x) are used)
             jval:       j values (dependent variable in parameterisation)
 
         internal:
@@ -38,36 +153,228 @@ def phot(p,x):
         called from:    photMCM (main)
         """
     l,m,n=p
-    import numpy as np
+    if (isinstance(x,Context)):
+        return l*np.exp(m*x.lnc - n*x.sec)
     jval = l*((np.cos(x))**m)*np.exp(-n/np.cos(x))
     return jval
 #______________________________________________________________________________________________
 
 
-def residuals(p,xdata,jval):
+def residuals(p,xdata,jval,w=None):
     """
         Function residuals
         ==================
 
         Purpose:
-            =
+            (Weighted) residuals of the parameterisation.
 
         Variables:
         I/O:
             p(l,m,n):   fit paramters l (in s-1), m, n
-            xdata:      sza (values of independent variable)
+            xdata:      sza (values of independent variable) or Context
             jval:       j values (values of dependent variable)
+            w:          weights of each data point (None: absolute residuals)
 
         Dependencies:
         uses:           fitfcn.phot
         called from:    fitfcn.fitStat, scipy.optimize.leastsq in fitfcn.fitTUV
     """
 
-    return jval - phot(p,xdata)
+    if (w is None):
+        return jval - phot(p,xdata)
+    return w*(jval - phot(p,xdata))
 #______________________________________________________________________________________________
 
 
-def fitTUV(xdata,ydata):
+def jacobian(p,xdata,jval,w=None):
+    """
+        Function jacobian
+        =================
+
+        Purpose:
+            Analytic Jacobian of the residuals with respect to the parameters l, m, n
+            (derivatives in columns):
+                d/dl = -(cos(x))^m*exp(-n*sec(x))
+                d/dm = -j*ln(cos(x))
+                d/dn = j*sec(x)
+
+        Variables:
+        I/O:
+            p(l,m,n):   fit paramters l (in s-1), m, n
+            xdata:      sza (values of independent variable) or Context
+            jval:       j values (not used, same arguments as residuals)
+            w:          weights of each data point (None: absolute residuals)
+            jac:        Jacobian matrix of shape (len(xdata), 3)
+
+        internal:
+            c,lnc,sec:  cos(x), ln(cos(x)), sec(x)
+            b:          parameterisation without parameter l
+
+        Dependencies:
+        uses:           numpy, trig
+        called from:    scipy.optimize.leastsq in fitfcn.fitTUV
+    """
+
+    l,m,n = p
+    x, c, lnc, sec = trig(xdata)
+    b = np.exp(m*lnc - n*sec)
+    jac = np.column_stack([-b,-l*b*lnc,l*b*sec])
+    if (w is not None):
+        jac = jac*w[:,None]
+    return jac
+#______________________________________________________________________________________________
+
+
+def weights(xdata,ydata,scheme='abs'):
+    """
+    Function weights
+    ================
+
+    Purpose:
+        Weights of the residuals of all data points for a weighting scheme:
+            - abs:      absolute residuals (no weights)
+            - rel:      relative residuals, weights 1/j (0 for j <= 0)
+            - cos:      weights cos(x)
+            - user:     sequence with weights for each sza in xdata
+        Several columns of y data are treated at once.
+
+    Variables:
+    I/O:
+        xdata:          data of independent variable (sza) or Context
+        ydata:          j values (vector or matrix with reactions in columns)
+        scheme:         weighting scheme ('abs', 'rel', 'cos' or sequence of weights)
+        w:              weights with the shape of ydata (None for 'abs')
+
+    internal:
+        Y:              j values as array
+        pos:            mask of positive j values
+
+    Dependencies:
+        uses:           numpy, trig
+        called from:    datfcn.xydat
+    """
+
+    Y = np.asarray(ydata,dtype=float)
+    if (isinstance(scheme,str)):
+        if (scheme == 'abs'):
+            return None
+        elif (scheme == 'rel'):
+            pos = Y > 0.
+            w = np.zeros_like(Y)
+            w[pos] = 1./Y[pos]
+            return w
+        elif (scheme == 'cos'):
+            w = trig(xdata)[1]
+        else:
+            raise ValueError("Unknown weighting '%s', use 'abs', 'rel', 'cos' or user weights." % scheme)
+    else:
+        w = np.asarray(scheme,dtype=float)
+        if (w.shape != np.shape(trig(xdata)[0])):
+            raise ValueError("User weights and sza data differ in length.")
+    if (Y.ndim == 2):
+        w = np.repeat(w[:,None],Y.shape[1],axis=1)
+    return w
+#______________________________________________________________________________________________
+
+
+def guess(xdata,ydata,init='fixed',w=None):
+    """
+    Function guess
+    ==============
+
+    Purpose:
+        Initial parameters for curve fits.
+            - fixed:    l = j(x0)*exp(-0.8), m = 0.8, n = 0.25
+            - loglin:   closed-form linear least square fit of
+                        ln j = ln l + m*ln(cos(x)) - n*sec(x)
+                        over all points with j > 0 (fixed guess for less than 3 points)
+            - grid:     global search on the coarse grid mgrid x ngrid of m, n with the
+                        closed-form (weighted) linear least square solution for l at each
+                        grid point, the grid point with the smallest sum of squared
+                        residuals and l > 0 is chosen (fixed guess if none)
+        Several columns of y data are treated at once.
+
+    Variables:
+    I/O:
+        xdata:          data of independent variable (sza) or Context
+        ydata:          j values (vector or matrix with reactions in columns)
+        init:           type of initial guess ('fixed', 'loglin' or 'grid')
+        w:              weights of each data point with the shape of ydata for 'grid'
+                        (None: absolute residuals)
+        p0:             initial parameters (Param for vector, matrix (l,m,n in columns)
+                        for matrix ydata)
+
+    internal:
+        Y:              j values as matrix
+        w:              mask of positive j values
+        A:              design matrix of log-linear fit
+        AtA,Aty:        normal equations of log-linear fit for each column
+        ok:             columns with enough points for the log-linear fit
+                        or with a grid point with l > 0
+        W2:             squared weights
+        B:              parameterisation without l for one m and all n on the grid
+        BtY,BtB:        normal equations of l for each n on the grid and each column
+        gain:           reduction of sum of squared residuals by the optimal l
+        best,ibest:     largest gain of each column and index of the grid point
+
+    Dependencies:
+        uses:           numpy, trig, Param
+        called from:    fitfcn.fitTUV, fitfcn.fitBatch
+    """
+
+    Y = np.asarray(ydata,dtype=float)
+    vec = (Y.ndim == 1)
+    if (vec):
+        Y = Y[:,None]
+    K = Y.shape[1]
+    p0 = np.column_stack([Y[0]*np.exp(-0.8),np.full(K,0.8),np.full(K,0.25)])
+
+    if (init == 'loglin'):
+        x, c, lnc, sec = trig(xdata)
+        A = np.column_stack([np.ones_like(c),lnc,-sec])
+        w = (Y > 0.).astype(float)
+        with np.errstate(divide='ignore'):
+            lny = np.where(w > 0.,np.log(np.where(w > 0.,Y,1.)),0.)
+        AtA = np.einsum('ni,nk,nj->kij',A,w,A)
+        Aty = np.einsum('ni,nk->ki',A,w*lny)
+        ok = (w.sum(0) >= 3) & (np.abs(np.linalg.det(AtA)) > 0.)
+        if (ok.any()):
+            q = np.linalg.solve(AtA[ok],Aty[ok][:,:,None])[:,:,0]
+            p0[ok] = np.column_stack([np.exp(q[:,0]),q[:,1],q[:,2]])
+    elif (init == 'grid'):
+        x, c, lnc, sec = trig(xdata)
+        if (w is None):
+            W2 = None
+        else:
+            W2 = np.asarray(w,dtype=float).reshape(Y.shape)**2
+        best = np.zeros(K)
+        ibest = np.zeros((K,3))
+        for m in mgrid:
+            B = np.exp(m*lnc[:,None] - np.outer(sec,ngrid))
+            if (W2 is None):
+                BtY = np.dot(B.T,Y)
+                BtB = (B**2).sum(0)[:,None]
+            else:
+                BtY = np.dot(B.T,W2*Y)
+                BtB = np.dot((B**2).T,W2)
+            with np.errstate(divide='ignore',invalid='ignore'):
+                gain = np.where((BtY > 0.) & (BtB > 0.),BtY**2/BtB,0.)
+            g = gain.argmax(0)
+            k = np.flatnonzero(gain[g,np.arange(K)] > best)
+            best[k] = gain[g[k],k]
+            ibest[k] = np.column_stack([(BtY/BtB)[g[k],k],np.full(k.size,m),ngrid[g[k]]])
+        ok = best > 0.
+        p0[ok] = ibest[ok]
+    elif (init != 'fixed'):
+        raise ValueError("Unknown initial guess '%s', use 'fixed', 'loglin' or 'grid'." % init)
+
+    if (vec):
+        p0 = Param(*p0[0])
+    return p0
+#______________________________________________________________________________________________
+
+
+def fitTUV(xdata,ydata,init='fixed',loss='linear',fscale=0.01,w=None):
     """
     Function fitTUV
     ===============
@@ -75,33 +382,81 @@ def fitTUV(xdata,ydata):
     Purpose:
         Curve fit of TUV data to parameterisation for photolysis in MCM.8///////////////////8=74
         j = l*(cos(x))^m*exp(-n*sec(x))
+        The analytic Jacobian is used, the number of iterations (Jacobian evaluations)
+        and function evaluations are returned in infodict ('njev', 'nfev').
+        The convergence flag and message of the solver are returned in infodict
+        ('ier', 'mesg', 'converged').
+        Robust loss functions ('huber', 'soft_l1') down-weight outliers (e.g. in noisy
+        high-sza tails) using scipy.optimize.least_squares.
+        Residuals are weighted with w, if given (see function weights).
 
     Variables:
     I/O:
-        xdata,ydata:    x-,y-data for curve fit (sza and j values)
+        xdata,ydata:    x-,y-data for curve fit (sza or Context and j values)
+        init:           initial guess ('fixed', 'loglin' or 'grid', see function guess,
+                        or sequence with initial parameters l, m, n)
+        loss:           loss function ('linear' for scipy.optimize.leastsq,
+                        'huber' or 'soft_l1' for scipy.optimize.least_squares)
+        fscale:         soft margin between inlier and outlier residuals of robust loss
+                        functions relative to the maximum (weighted) j value
+        w:              weights of each data point (None: absolute residuals)
         p:              optimised parameters from least square fit
         cov:            covariance matrix from least square fit
         infodict:       further statistical data from least square fit
-        mesg, ier:      not used (see description of leastsq function)
+        mesg, ier:      message and flag of the solver (see description of leastsq function)
 
     internal:
         Param           list with parameters for curve fitting
         p_guess:        initial parameters for curve fit
+        sol:            solution of least_squares
+        ymax,scale:     normalisation of j values and parameters for least_squares
+        rmax,wn:        normalisation of residuals and normalised weights for least_squares
+        jac:            Jacobian at optimised parameters
 
     Dependencies:
-        uses:           residuals,numpy,scipy.optimize.leastsq, collections.namedtuple
-        called from:    datfcn.xydat
+        uses:           residuals,jacobian,guess,scipy.optimize.leastsq,
+                        scipy.optimize.least_squares, Param
+        called from:    fitfcn.fitRobust, fitfcn.fitRxn
     """
     # load functions
-    import numpy as np
-    import collections #
     from scipy.optimize import leastsq # for curve fit
-    from datfcn import order
 
     # curve fitting
-    Param=collections.namedtuple('Param','l m n')
-    p_guess=Param(l=ydata[0]*np.exp(-0.8),m=0.8,n=0.25)
-    p,cov,infodict,mesg,ier = leastsq(residuals,p_guess,args=(xdata,ydata),full_output=True)
+    if (isinstance(init,str)):
+        p_guess=guess(xdata,ydata,init,w)
+    else:
+        p_guess=np.asarray(init,dtype=float)
+    if (loss == 'linear'):
+        if (w is None):
+            args = (xdata,ydata)
+        else:
+            args = (xdata,ydata,w)
+        p,cov,infodict,mesg,ier = leastsq(residuals,p_guess,args=args,Dfun=jacobian,
+                                          full_output=True)
+        converged = ier in [1,2,3,4] and cov is not None
+    elif (loss in ['huber','soft_l1']):
+        from scipy.optimize import least_squares
+        # fit of j values normalised to their maximum
+        ymax = np.abs(ydata).max() or 1.
+        scale = np.array([ymax,1.,1.])
+        rmax, wn = ymax, None
+        if (w is not None):
+            rmax = np.abs(w*ydata).max() or 1.
+            wn = w*ymax/rmax
+        sol = least_squares(residuals,p_guess/scale,jac=jacobian,args=(xdata,ydata/ymax,wn),loss=loss,
+                            f_scale=fscale,x_scale='jac',method='trf')
+        p = sol.x*scale
+        jac = jacobian(p,xdata,ydata,w)
+        try:
+            cov = np.linalg.inv(np.dot(jac.T,jac))
+        except np.linalg.LinAlgError:
+            cov = None
+        mesg, ier = sol.message, sol.status
+        infodict = {'fvec': sol.fun*rmax, 'nfev': sol.nfev, 'njev': sol.njev or 0}
+        converged = ier > 0 and cov is not None
+    else:
+        raise ValueError("Unknown loss function '%s', use 'linear', 'huber' or 'soft_l1'." % loss)
+    infodict.update({'ier': ier, 'mesg': mesg, 'converged': converged and np.all(np.isfinite(p))})
     p=Param(*p)
     l = p[0]
     ol, ml = order(l)
@@ -112,53 +467,72 @@ def fitTUV(xdata,ydata):
 #______________________________________________________________________________________________
 
 
-def fitStat(xdata,ydata,p,cov,infodict):
+def fitStat(xdata,ydata,p,cov,infodict,w=None):
     """
     Function fitStat
     ================
 
     Purpose:
         Derive statistical data from least square fit of TUV data for MCM parameterisations.
+        For weighted fits, R2 and RMSE of the absolute residuals and of the weighted residuals
+        (with the weighted mean of the j values) are derived, confidences refer to the
+        weighted residuals.
 
     Variables:
     I/O:
-        xdata,ydata:    x-,y-data for curve fit (sza and j values)
+        xdata,ydata:    x-,y-data for curve fit (sza or Context and j values)
         p:              optimised parameters from least square fit
         cov:            covariance matrix from least square fit
         infodict:       further statistical data from least square fit
+        w:              weights of each data point (None: absolute residuals)
         rsquared:       correlation coefficient
         ss_tot:         standard deviation
         rmse:           root mean square error
         el,em,en:       confidence of parameters
+        wrsquared:      correlation coefficient of weighted residuals
+        wrmse:          root mean square error of weighted residuals
 
     internal:
         ss_err:         for calculation of R2 and RMSE
         dof:            degrees of freedom for calculation of RMSE
         s_sq:           for calculation of confidences of parameters
         err:            list of all confidences
+        w2:             squared weights
+        wss_err,wss_tot:for calculation of weighted R2 and RMSE
 
     Dependencies:
         uses:           residuals,datfcn.order,numpy
-        called from:    datfcn.xydat
+        called from:    fitfcn.fitRxn
     """
     # load functions
-    import numpy as np
-    from datfcn import order
 
 
     # R2:
-    ss_err=(infodict['fvec']**2).sum()
+    if (w is None):
+        ss_err=(infodict['fvec']**2).sum()
+    else:
+        ss_err=(residuals(p,xdata,ydata)**2).sum()
     ss_tot=((ydata-ydata.mean())**2).sum()
     rsquared=1-(ss_err/ss_tot)
 
     # RMSE:
-    dof=len(xdata)-len(p)
+    dof=len(ydata)-len(p)
     rmse=np.sqrt(ss_err/dof)
 
+    # weighted R2 and RMSE:
+    if (w is None):
+        wrsquared, wrmse = rsquared, rmse
+    else:
+        w2 = w**2
+        wss_err = (infodict['fvec']**2).sum()
+        wss_tot = (w2*(ydata-(w2*ydata).sum()/w2.sum())**2).sum()
+        wrsquared = 1-(wss_err/wss_tot)
+        wrmse = np.sqrt(wss_err/dof)
+
     # Confidence:
 
     if (len(ydata) > len(p)) and cov is not None:
-        s_sq = (residuals(p, xdata, ydata)**2).sum()/(len(ydata)-len(p))
+        s_sq = (residuals(p, xdata, ydata, w)**2).sum()/(len(ydata)-len(p))
         cov = cov * s_sq
     else:
         cov = float("inf")
@@ -174,5 +548,428 @@ def fitStat(xdata,ydata,p,cov,infodict):
         en  = float("inf")
 
 
-    return rsquared,ss_tot,rmse,el,em,en
+    return rsquared,ss_tot,rmse,el,em,en,wrsquared,wrmse
+#______________________________________________________________________________________________
+
+
+def fitRobust(xdata,ydata,init='fixed',loss='linear',cutoffs=(85.,80.),w=None):
+    """
+    Function fitRobust
+    ==================
+
+    Purpose:
+        Curve fit with convergence check and automatic retries. If the fit does not
+        converge, it is repeated with the alternative initial guess and afterwards with
+        reduced sza windows. The first converged fit is returned, otherwise the fit
+        with the smallest mean squared residual (comparable between sza windows).
+        If all attempts fail, no fit is returned (status 4).
+
+    Variables:
+    I/O:
+        xdata,ydata:    x-,y-data for curve fit (sza or Context and j values)
+        init:           initial guess of the first attempt ('fixed', 'loglin', 'grid' or
+                        sequence with initial parameters), the alternative initial guess
+                        is 'loglin' for 'fixed' and 'fixed' otherwise
+        loss:           loss function (see fitTUV)
+        cutoffs:        reduced sza cut-offs in deg. for retries
+        w:              weights of each data point (None: absolute residuals)
+        fit:            output of fitTUV of returned fit (None: all attempts failed)
+        xfit,yfit,wfit: x-,y-data and weights of returned fit
+        status:         status code of the fit (see fitstatus)
+        co:             reduced sza cut-off of returned fit in deg. (nan for full window)
+
+    internal:
+        attempts:       initial guesses, cut-offs and status codes of all attempts
+        best:           attempt with smallest mean squared residual
+        ss:             mean squared residual
+        mask:           mask of data in reduced sza window
+
+    Dependencies:
+        uses:           numpy, fitTUV, subcontext
+        called from:    fitfcn.fitRxn
+    """
+
+    if (isinstance(init,str) and init == 'fixed'):
+        alt = 'loglin'
+    else:
+        alt = 'fixed'
+    attempts = [(init,float('nan'),0),(alt,float('nan'),1)]
+    attempts += [(i,co,2) for co in cutoffs for i in [init,alt]]
+    best = None
+    for i, co, status in attempts:
+        if (np.isfinite(co)):
+            if (isinstance(xdata,Context)):
+                mask = xdata.x < np.deg2rad(co)
+                xfit = subcontext(xdata,mask)
+            else:
+                mask = xdata < np.deg2rad(co)
+                xfit = xdata[mask]
+            if (mask.sum() <= 3 or mask.all()):
+                continue
+            yfit = ydata[mask]
+            wfit = None if w is None else w[mask]
+        else:
+            xfit, yfit, wfit = xdata, ydata, w
+        try:
+            fit = fitTUV(xfit,yfit,i,loss,w=wfit)
+        except (ValueError, np.linalg.LinAlgError):
+            continue
+        if (fit[-1]['converged']):
+            return fit, xfit, yfit, wfit, status, co
+        ss = (fit[-1]['fvec']**2).sum()/len(yfit)
+        if (np.isfinite(ss) and (best is None or ss < best[0])):
+            best = (ss,fit,xfit,yfit,wfit,co)
+
+    if (best is None):
+        return None, xdata, ydata, w, 4, float('nan')
+    ss, fit, xfit, yfit, wfit, co = best
+    return fit, xfit, yfit, wfit, 3, co
+#______________________________________________________________________________________________
+
+
+def fitRxn(args):
+    """
+    Function fitRxn
+    ===============
+
+    Purpose:
+        Least square fit and statistical data for a single photoreaction.
+        Takes a single argument tuple to be mapped over worker pools.
+        In robust mode, fits are retried if not converged (see fitRobust) and
+        statistical data refer to the sza window of the returned fit.
+
+    Variables:
+    I/O:
+        args:           tuple with x-,y-data for curve fit (sza or Context and j values),
+                        type of initial guess and optionally loss function,
+                        switch for retries and weights (default: 'linear', False, None)
+        res:            Result with optimised parameters, statistical data,
+                        number of iterations and function evaluations,
+                        wall times of the fit and the statistical data,
+                        status code and reduced sza cut-off (nan for full window),
+                        R2 and RMSE of weighted residuals (nan parameters and
+                        statistical data for failed fits, status 4)
+
+    internal:
+        xdata,ydata:    x-,y-data for curve fit (sza or Context and j values)
+        init:           type of initial guess
+        loss:           loss function (see fitTUV)
+        retry:          switch for retries of fits without convergence
+        w:              weights of each data point (None: absolute residuals)
+        xfit,yfit,wfit: x-,y-data and weights of returned fit
+        infodict:       further statistical data from least square fit
+        status,co:      status code and reduced sza cut-off
+        t0,t1:          start times of fit and statistical data
+
+    Dependencies:
+        uses:           time, fitTUV, fitRobust, fitStat, Param, Result
+        called from:    parfcn.fitAll
+    """
+
+    xdata, ydata, init, loss, retry, w = tuple(args) + ('linear',False,None)[len(args)-3:]
+    t0 = time.time()
+    if (retry):
+        fit, xfit, yfit, wfit, status, co = fitRobust(xdata,ydata,init,loss,w=w)
+        if (fit is None):
+            # all attempts failed: no parameters and statistical data
+            nan = float('nan')
+            return Result(Param(nan,nan,nan),nan,0,nan,nan,None,nan,nan,nan,nan,nan,nan,0,0,
+                          time.time()-t0,0.,status,co,nan,nan)
+    else:
+        fit = fitTUV(xdata,ydata,init,loss,w=w)
+        xfit, yfit, wfit, co = xdata, ydata, w, float('nan')
+        status = 0 if fit[-1]['converged'] else 3
+    p,l,ol,m,n,cov,infodict = fit
+    t1 = time.time()
+    rsquared,ss_tot,rmse,el,em,en,wrsquared,wrmse = fitStat(xfit,yfit,p,cov,infodict,wfit)
+    res = Result(p,l,ol,m,n,cov,rsquared,ss_tot,rmse,el,em,en,infodict['njev'],infodict['nfev'],
+                 t1-t0,time.time()-t1,status,co,wrsquared,wrmse)
+    return res
+#______________________________________________________________________________________________
+
+
+def fitBatch(xdata,ydata,init='fixed',maxiter=200,ftol=1.49012e-08,xtol=1.49012e-08,w=None):
+    """
+    Function fitBatch
+    =================
+
+    Purpose:
+        Levenberg-Marquardt curve fit of all photoreactions with the same x data at once.
+        Parameters l, m, n of all reactions are stacked to one array, residuals and
+        analytic Jacobians of j = l*(cos(x))^m*exp(-n*sec(x)) are derived for all
+        columns in single numpy operations. Iterations continue until each column has
+        converged (per-column convergence masks). Statistical data are derived as in fitStat.
+        Residuals are weighted with w, if given (see function weights).
+
+    Variables:
+    I/O:
+        xdata:          data of independent variable (sza) for curve fitting or Context
+        ydata:          matrix with j values of shape (number of sza, number of reactions)
+        init:           initial guess ('fixed', 'loglin' or 'grid', see function guess,
+                        or sequence with initial parameters l, m, n for all columns
+                        or matrix with initial parameters of each column in rows)
+        maxiter:        maximum number of iterations
+        ftol,xtol:      relative tolerances of sum of squares and parameters
+                        (defaults as in scipy.optimize.leastsq)
+        w:              matrix with weights of each data point (None: absolute residuals)
+        res:            list of Results for each column in ydata (status 3 for columns
+                        not converged within maxiter or stalled, 4 for failed fits)
+
+    internal:
+        c,lnc,sec:      cos(x), ln(cos(x)), sec(x)
+        P:              matrix with parameters l, m, n of all columns
+        lam:            damping parameters of all columns
+        act:            mask of columns still iterating
+        stall:          mask of columns stopped without convergence (no improvement
+                        possible with maximum damping)
+        sse:            sums of squared residuals at current parameters
+        A,g,D:          approximated Hessians, gradients, scaling factors of current parameters
+        dp:             parameter steps
+        acc:            mask of accepted steps
+        cov:            covariance matrices (inverse of J^T J)
+        stats:          parameters and statistical data of each column
+        OL,ML:          orders of magnitude of l of all columns and factors 10^(order)
+        W:              weights as matrix (None: absolute residuals)
+        ss_err,wss_err: sums of squared absolute and weighted residuals
+        niter,nfev:     number of iterations (Jacobian evaluations) and function evaluations
+        t0,t1:          start times of fit and statistical data (wall times of all
+                        columns are shared equally in the Results)
+
+    Dependencies:
+        uses:           time, numpy, trig, guess, datfcn.order, Param, Result
+        called from:    parfcn.fitAll
+    """
+
+    def model(P,idx):
+        # j values and Jacobian (last axis: l, m, n) of selected columns
+        with np.errstate(over='ignore',invalid='ignore'):
+            b = np.exp(np.outer(lnc,P[:,1]) - np.outer(sec,P[:,2]))
+            f = b*P[:,0]
+            J = np.stack([b,f*lnc[:,None],-f*sec[:,None]],axis=-1)
+        r = Y[:,idx] - f
+        if (W is not None):
+            r = W[:,idx]*r
+            J = W[:,idx,None]*J
+        return r, J
+
+    def normal(r,J):
+        # Jacobi scaled normal equations (symmetric J^T J from the products of pairs of columns)
+        A = np.empty((J.shape[1],npar,npar))
+        for i in range(npar):
+            for j in range(i,npar):
+                A[:,i,j] = A[:,j,i] = np.einsum('nk,nk->k',J[:,:,i],J[:,:,j])
+        g = np.einsum('nki,nk->ki',J,r)
+        D = np.sqrt(np.einsum('kii->ki',A))
+        D[D == 0.] = 1.
+        return A/(D[:,:,None]*D[:,None,:]), g/D, D
+
+    Y = np.asarray(ydata,dtype=float)
+    if (Y.ndim == 1):
+        Y = Y[:,None]
+    W = None
+    if (w is not None):
+        W = np.asarray(w,dtype=float).reshape(Y.shape)
+    x, c, lnc, sec = trig(xdata)
+    N, K = Y.shape
+    npar = 3
+
+    t0 = time.time()
+    if (isinstance(init,str)):
+        P = guess(xdata,Y,init,W)
+    else:
+        P = np.asarray(init,dtype=float)
+        if (P.ndim == 1):
+            P = np.tile(P,(K,1))
+        else:
+            P = P.reshape(K,npar).copy()
+    niter = np.ones(K,dtype=int)
+    nfev = np.ones(K,dtype=int)
+    lam = np.full(K,1.e-3)
+    act = np.ones(K,dtype=bool)
+    stall = np.zeros(K,dtype=bool)
+    iall = np.arange(K)
+    r, J = model(P,iall)
+    sse = (r**2).sum(0)
+    A, g, D = normal(r,J)
+    eye = np.eye(npar)
+
+    for it in range(maxiter):
+        idx = np.flatnonzero(act)
+        if (idx.size == 0):
+            break
+        # damped step in scaled parameters
+        Ak = A[idx] + lam[idx,None,None]*eye
+        try:
+            dp = np.linalg.solve(Ak,g[idx][:,:,None])[:,:,0]/D[idx]
+        except np.linalg.LinAlgError:
+            # least square steps of singular systems, no steps for non-finite systems
+            dp = np.full((idx.size,npar),np.nan)
+            ok = np.isfinite(Ak).all(axis=(1,2)) & np.isfinite(g[idx]).all(axis=1)
+            for i in np.flatnonzero(ok):
+                dp[i] = np.linalg.lstsq(Ak[i],g[idx[i]],rcond=None)[0]/D[idx[i]]
+        Pt = P[idx] + dp
+        rt, Jt = model(Pt,idx)
+        with np.errstate(over='ignore',invalid='ignore'):
+            sset = (rt**2).sum(0)
+        nfev[idx] += 1
+        acc = np.isfinite(sset) & (sset <= sse[idx])
+
+        # update accepted columns
+        ia = idx[acc]
+        conv = np.zeros(idx.size,dtype=bool)
+        if (ia.size > 0):
+            dsse = sse[ia] - sset[acc]
+            conv[acc] = (dsse <= ftol*sse[ia]) | np.all(np.abs(dp[acc]) <= xtol*(np.abs(P[ia])+xtol),axis=1)
+            P[ia] = Pt[acc]
+            niter[ia] += 1
+            sse[ia] = sset[acc]
+            A[ia], g[ia], D[ia] = normal(rt[:,acc],Jt[:,acc])
+            lam[ia] = lam[ia]/10.
+        # increase damping for rejected steps, stop if no further improvement possible
+        ir = idx[~acc]
+        lam[ir] = lam[ir]*10.
+        stop = lam[ir] > 1.e16
+        stall[ir[stop]] = True
+        conv[~acc] = stop
+        act[idx[conv]] = False
+
+    # covariance matrices and statistical data
+    t1 = time.time()
+    r, J = model(P,iall)
+    A, g, D = normal(r,J)
+    dof = N - npar
+    wss_err = (r**2).sum(0)
+    ss_tot = ((Y-Y.mean(0))**2).sum(0)
+    if (W is None):
+        ss_err = wss_err
+        wss_tot = ss_tot
+    else:
+        with np.errstate(over='ignore',invalid='ignore'):
+            ss_err = ((Y - P[:,0]*np.exp(np.outer(lnc,P[:,1]) - np.outer(sec,P[:,2])))**2).sum(0)
+        W2 = W**2
+        wss_tot = (W2*(Y-(W2*Y).sum(0)/W2.sum(0))**2).sum(0)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        rsquared = 1 - ss_err/ss_tot
+        rmse = np.sqrt(ss_err/dof)
+        wrsquared = 1 - wss_err/wss_tot
+        wrmse = np.sqrt(wss_err/dof)
+    stats = []
+    OL, ML = order(P[:,0])
+    for k in range(K):
+        p = Param(*P[k])
+        try:
+            cov = np.linalg.inv(A[k])/np.outer(D[k],D[k])
+        except np.linalg.LinAlgError:
+            cov = None
+        if (N > npar) and cov is not None:
+            err = np.sqrt(np.diag(cov*wss_err[k]/dof))
+            el = err[0] / ML[k]
+            em = err[1]
+            en = err[2]
+        else:
+            el = em = en = float("inf")
+        ol, ml = OL[k], ML[k]
+        if (cov is None or not np.all(np.isfinite(P[k]))):
+            status = 4
+        elif (act[k] or stall[k]):
+            status = 3
+        else:
+            status = 0
+        stats.append((p,p[0]/ml,ol,p[1],p[2],cov,rsquared[k],ss_tot[k],rmse[k],el,em,en,
+                      niter[k],nfev[k],status,wrsquared[k],wrmse[k]))
+    tfit = (t1-t0)/max(K,1)
+    tstat = (time.time()-t1)/max(K,1)
+    res = [Result(*(st[:-3] + (tfit,tstat,st[-3],float('nan')) + st[-2:])) for st in stats]
+    return res
+#______________________________________________________________________________________________
+
+def bootRxn(args):
+    """
+    Function bootRxn
+    ================
+
+    Purpose:
+        Bootstrap confidence intervals of the parameters of a single photoreaction.
+        For unweighted fits, residuals of the fit are resampled with replacement and
+        added to the fitted j values. For weighted fits, data points are resampled
+        (weights depend on the data, e.g. 1/j): each resample is the original data with
+        the weights multiplied by the square root of the number of draws of each point.
+        All resamples are refitted at once with the batched solver starting from the
+        fitted parameters (linear loss only, see datfcn.xydat). In robust mode (retry),
+        refits without convergence are retried from the alternative initial guesses
+        (as in fitRobust), reduced sza windows of the fit are kept.
+        Percentile intervals are derived from all converged refits. The resampling is
+        determined by the seed only, independent of the number of workers.
+        Takes a single argument tuple to be mapped over worker pools.
+
+    Variables:
+    I/O:
+        args:           tuple with x-,y-data of the fit (sza or Context and j values),
+                        Result of the fit, number of resamples, seed and optionally
+                        switch for retries, weights and confidence level
+                        (default: False, None, 0.95)
+        ci:             matrix with lower and upper bounds (columns) of l (in s-1), m, n
+                        (rows), nan if less than half of the refits converged
+
+    internal:
+        xdata,ydata:    x-,y-data for curve fit (sza or Context and j values)
+        res:            Result of the fit
+        nboot,seed:     number of resamples and seed of the random number generator
+        retry:          switch for retries of refits without convergence
+        w:              weights of each data point (None: absolute residuals)
+        level:          confidence level
+        rng:            random number generator
+        f,e:            fitted j values and residuals
+        idx:            indices of resampled residuals or data points
+        C:              number of draws of each data point (resamples in columns)
+        Y,W:            resampled j values and weights (resamples in columns)
+        boot:           Results of all refits
+        fit:            individual refit from alternative initial guess
+        P:              parameters of converged refits
+
+    Dependencies:
+        uses:           numpy, phot, subcontext, fitBatch, fitTUV
+        called from:    parfcn.bootAll
+    """
+
+    xdata, ydata, res, nboot, seed, retry, w, level = tuple(args) + (False,None,0.95)[len(args)-5:]
+    ci = np.full((3,2),np.nan)
+    # data of reduced sza window of robust fits
+    if (np.isfinite(res.co)):
+        if (isinstance(xdata,Context)):
+            mask = xdata.x < np.deg2rad(res.co)
+            xdata = subcontext(xdata,mask)
+        else:
+            mask = xdata < np.deg2rad(res.co)
+            xdata = xdata[mask]
+        ydata = ydata[mask]
+        if (w is not None):
+            w = w[mask]
+    if (res.status == 4 or not np.all(np.isfinite(res.p))):
+        return ci
+
+    rng = np.random.RandomState(seed)
+    idx = rng.randint(0,len(ydata),(len(ydata),nboot))
+    W = None
+    if (w is None):
+        f = phot(res.p,xdata)
+        e = ydata - f
+        Y = f[:,None] + e[idx]
+    else:
+        C = np.zeros((len(ydata),nboot))
+        np.add.at(C,(idx,np.arange(nboot)),1.)
+        Y = np.repeat(np.asarray(ydata,dtype=float)[:,None],nboot,axis=1)
+        W = w[:,None]*np.sqrt(C)
+    boot = fitBatch(xdata,Y,res.p,w=W)
+    if (retry):
+        for k in [k for k in range(nboot) if boot[k].status != 0]:
+            for init in ['fixed','loglin']:
+                fit = fitTUV(xdata,Y[:,k],init,w=None if W is None else W[:,k])
+                if (fit[-1]['converged']):
+                    boot[k] = boot[k]._replace(p=fit[0],status=1)
+                    break
+    P = np.array([b.p for b in boot if b.status in [0,1]])
+    if (2*len(P) >= nboot):
+        ci = np.percentile(P,[50.*(1.-level),50.*(1.+level)],axis=0).T
+    return ci
 #______________________________________________________________________________________________
@@ -0,0 +1,218 @@
+"""
+Module iofcn
+============
+version 1.1
+-------------
+
+List of function focused on binary input/output of fit results.
+Results are stored as columnar numpy structured arrays in uncompressed .npy files,
+which can be memory-mapped when loaded.
+contains:
+    - pardtype
+    - parrec
+    - parcat
+    - savepar
+    - loadpar
+    - loadpars
+"""
+
+import sys
+import numpy as np
+
+# columns of binary output (l in s-1, el absolute confidence of l in s-1,
+# status code of fit and reduced sza cut-off in deg., see fitfcn.fitstatus,
+# R^2 and RMSE of weighted residuals, equal to rsquared and rmse for unweighted fits,
+# lower and upper bounds of bootstrap confidence intervals, nan if not derived;
+# scen and label are minimum widths, widened for longer values, see pardtype)
+partype = [('scen','S128'),('z','f8'),('rxn','i4'),('label','S64'),
+           ('l','f8'),('m','f8'),('n','f8'),('el','f8'),('em','f8'),('en','f8'),
+           ('rmse','f8'),('rsquared','f8'),('status','i4'),('co','f8'),
+           ('wrmse','f8'),('wrsquared','f8'),
+           ('l_lo','f8'),('l_hi','f8'),('m_lo','f8'),('m_hi','f8'),('n_lo','f8'),('n_hi','f8')]
+#______________________________________________________________________________________________
+
+def pardtype(wscen=0,wlabel=0):
+    """
+    Function pardtype
+    =================
+
+    Purpose:
+        Columns of the binary output as in partype with the string columns scen
+        and label widened to hold values of the given lengths, so that long scenario
+        names and reaction labels are not truncated.
+
+    Variables:
+    I/O:
+        wscen:          length of the longest scenario name
+        wlabel:         length of the longest reaction label
+        dtype:          list with column names and types
+
+    Dependencies:
+        uses:           partype
+        called from:    parrec, parcat
+    """
+
+    width = {'scen': wscen, 'label': wlabel}
+    dtype = []
+    for f, t in partype:
+        if (f in width):
+            t = 'S%i' % max(int(t[1:]),width[f])
+        dtype.append((f,t))
+    return dtype
+#______________________________________________________________________________________________
+
+def parrec(scen,z,rxn,out):
+    """
+    Function parrec
+    ===============
+
+    Purpose:
+        Collect results of all fitted photoreactions of a scenario and altitude
+        in a structured array with columns as defined in partype (string columns
+        widened to the longest values, see pardtype).
+
+    Variables:
+    I/O:
+        scen:           scenario name
+        z:              altitude in km (nan if unknown)
+        rxn:            matrix with indices and labels of available photoreactions
+        out:            list with reaction indices and Results of all fits
+        rec:            structured array with one row per fitted reaction
+
+    internal:
+        y:              index (for addressing positions in rxn-matrix)
+        r:              Result of current fit
+
+    Dependencies:
+        uses:           numpy, pardtype
+        called from:    batchMCM (main), watchMCM (main), sinkfcn.NpySink, sinkfcn.CsvSink
+    """
+
+    rec = np.zeros(len(out),dtype=pardtype(len(scen),max([len(rxn[y][1]) for y, r in out]+[0])))
+    rec['scen'] = scen
+    rec['z'] = z
+    rec['rxn'] = [rxn[y][0] for y, r in out]
+    rec['label'] = [rxn[y][1] for y, r in out]
+    for f in ['m','n','em','en','rmse','rsquared','status','co','wrmse','wrsquared']:
+        rec[f] = [getattr(r,f) for y, r in out]
+    rec['l'] = [r.p[0] for y, r in out]
+    rec['el'] = [r.el*10.**r.ol for y, r in out]
+    for k, f in enumerate(['l','m','n']):
+        rec[f+'_lo'] = [np.nan if r.ci is None else r.ci[k][0] for y, r in out]
+        rec[f+'_hi'] = [np.nan if r.ci is None else r.ci[k][1] for y, r in out]
+    return rec
+#______________________________________________________________________________________________
+
+def parcat(recs):
+    """
+    Function parcat
+    ===============
+
+    Purpose:
+        Concatenate structured arrays with fit results, string columns of the
+        combined array are as wide as the widest column of all arrays.
+
+    Variables:
+    I/O:
+        recs:           list with structured arrays with fit results (see parrec)
+        rec:            structured array with fit results of all arrays
+
+    internal:
+        i:              row index in combined array
+
+    Dependencies:
+        uses:           numpy, pardtype
+        called from:    batchMCM (main), loadpars
+    """
+
+    rec = np.empty(sum(len(r) for r in recs),
+                   dtype=pardtype(max([r.dtype['scen'].itemsize for r in recs]+[0]),
+                                  max([r.dtype['label'].itemsize for r in recs]+[0])))
+    i = 0
+    for r in recs:
+        rec[i:i+len(r)] = r
+        i += len(r)
+    return rec
+#______________________________________________________________________________________________
+
+def savepar(file,rec):
+    """
+    Function savepar
+    ================
+
+    Purpose:
+        Save structured array with fit results to an uncompressed .npy file at once.
+
+    Variables:
+    I/O:
+        file:           file name (ending .npy) or object with write method
+                        (e.g. sinkfcn.AtomicFile)
+        rec:            structured array with fit results
+
+    Dependencies:
+        uses:           numpy
+        called from:    batchMCM (main), sinkfcn.NpySink
+    """
+
+    if (hasattr(file,'write')):
+        np.lib.format.write_array(file,np.asanyarray(rec),allow_pickle=False)
+    else:
+        np.save(file,rec)
+    return None
+#______________________________________________________________________________________________
+
+def loadpar(file,mmap=True):
+    """
+    Function loadpar
+    ================
+
+    Purpose:
+        Load fit results from a .npy file written by savepar.
+        Columns are accessed by name, e.g. rec['l'], rec['label'].
+
+    Variables:
+    I/O:
+        file:           file name
+        mmap:           switch for memory-mapping the file (read-only)
+        rec:            structured array with fit results
+
+    Dependencies:
+        uses:           numpy
+        called from:    loadpars, post-processing scripts
+    """
+
+    if (mmap):
+        rec = np.load(file,mmap_mode='r')
+    else:
+        rec = np.load(file)
+    return rec
+#______________________________________________________________________________________________
+
+def loadpars(files):
+    """
+    Function loadpars
+    =================
+
+    Purpose:
+        Load fit results of many scenarios into a single structured array.
+        Files are memory-mapped and copied once into the combined array.
+
+    Variables:
+    I/O:
+        files:          list of file names or glob pattern
+        rec:            structured array with fit results of all files
+
+    internal:
+        recs:           memory-mapped arrays of each file
+
+    Dependencies:
+        uses:           glob, loadpar, parcat
+        called from:    post-processing scripts
+    """
+    import glob
+
+    if (isinstance(files,str)):
+        files = sorted(glob.glob(files))
+    recs = [loadpar(f) for f in files]
+    return parcat(recs)
+#______________________________________________________________________________________________
@@ -0,0 +1,356 @@
+"""
+Module parfcn
+=============
+version 1.1
+-------------
+
+List of function focused on parallel processing of photoreactions.
+contains:
+    - njobs
+    - mkpool
+    - shareblock
+    - mapShared
+    - mapRxn
+    - fitAll
+    - bootAll
+"""
+
+import sys
+import os
+import numpy as np
+#______________________________________________________________________________________________
+
+def njobs(jobs):
+    """
+    Function njobs
+    ==============
+
+    Purpose:
+        Resolve the number of workers (0 for the number of available cpus).
+
+    Variables:
+    I/O:
+        jobs:   requested number of workers
+        n:      number of workers
+
+    Dependencies:
+        uses:           multiprocessing
+        called from:    parfcn.mkpool
+    """
+    import multiprocessing as mp
+
+    if (jobs < 1):
+        n = mp.cpu_count()
+    else:
+        n = jobs
+    return n
+#______________________________________________________________________________________________
+
+def mkpool(jobs,kind='process'):
+    """
+    Function mkpool
+    ===============
+
+    Purpose:
+        Create a worker pool with the given number of workers.
+        No pool is created for serial runs.
+
+    Variables:
+    I/O:
+        jobs:   number of workers (1 for serial processing, 0 for number of cpus)
+        kind:   'process' for a pool of processes, 'thread' for a pool of threads
+        pool:   worker pool (None for serial runs)
+
+    Dependencies:
+        uses:           njobs, multiprocessing
+        called from:    parfcn.mapRxn
+    """
+    import multiprocessing as mp
+    from multiprocessing.pool import ThreadPool
+
+    jobs = njobs(jobs)
+    if (jobs == 1):
+        pool = None
+    elif (kind == 'thread'):
+        pool = ThreadPool(jobs)
+    elif (kind == 'process'):
+        pool = mp.Pool(jobs)
+    else:
+        raise ValueError("Unknown pool type '%s', use 'process' or 'thread'." % kind)
+    return pool
+#______________________________________________________________________________________________
+
+def shareblock(xdata,ydata,w=None):
+    """
+    Function shareblock
+    ===================
+
+    Purpose:
+        Write x data (sza or the rows of a fit context), y data and weights of all
+        reactions once to a temporary .npy file (in /dev/shm, if available) to be
+        memory-mapped by the workers of a process pool instead of pickling the data
+        of each reaction to the workers. Each row holds the data of one reaction.
+
+    Variables:
+    I/O:
+        xdata:  data of independent variable (sza) or fit context (see fitfcn.mkcontext)
+        ydata:  list with data of dependent variable (j values) for each reaction
+        w:      list with weights of each reaction (None: absolute residuals)
+        file:   name of temporary file (to be removed by the caller)
+        nx:     number of rows with x data (1 for sza, 4 for a fit context)
+
+    internal:
+        rows:   x data, y data and weights (if given)
+        fd:     file descriptor of temporary file
+
+    Dependencies:
+        uses:           os, tempfile, numpy, fitfcn.Context
+        called from:    parfcn.mapRxn
+    """
+    import tempfile
+    from fitfcn import Context
+
+    if (isinstance(xdata,Context)):
+        rows = [xdata.x,xdata.c,xdata.lnc,xdata.sec]
+    else:
+        rows = [xdata]
+    nx = len(rows)
+    rows = rows + list(ydata)
+    if (w is not None):
+        rows = rows + list(w)
+    fd, file = tempfile.mkstemp(suffix='.npy',prefix='photMCM',
+                                dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    try:
+        with os.fdopen(fd,'wb') as f:
+            np.save(f,np.vstack(rows).astype(float))
+    except:
+        os.remove(file)
+        raise
+    return file, nx
+#______________________________________________________________________________________________
+
+def mapShared(args):
+    """
+    Function mapShared
+    ==================
+
+    Purpose:
+        Apply a fit function (fitfcn.fitRxn or fitfcn.bootRxn) to a range of reactions
+        in a data block written by shareblock. The block is memory-mapped, only the
+        data of the current reaction is copied, so the memory of each worker does not
+        grow with the number of reactions. Only the (small) results are returned.
+
+    Variables:
+    I/O:
+        args:   tuple with fit function, file name of the data block, number of rows
+                with x data, number of reactions in the block, switch for weights,
+                first reaction of the range and list with the further arguments
+                of the fit function for each reaction of the range
+        res:    list with results of the fit function for each reaction of the range
+
+    internal:
+        fcn:    fit function called with (xdata,ydata,a0,...,w)
+        block:  memory-mapped data block
+        xdata:  sza or fit context
+        k:      row of current reaction
+
+    Dependencies:
+        uses:           numpy, fitfcn.Context
+        called from:    parfcn.mapRxn (workers)
+    """
+    from fitfcn import Context
+
+    fcn, file, nx, ny, weighted, lo, extras = args
+    block = np.load(file,mmap_mode='r')
+    if (nx == 4):
+        xdata = Context(*[np.array(block[i]) for i in range(4)])
+    else:
+        xdata = np.array(block[0])
+    res = []
+    for k, a in enumerate(extras,nx+lo):
+        w = np.array(block[k+ny]) if weighted else None
+        res.append(fcn((xdata,np.array(block[k])) + tuple(a) + (w,)))
+    del block
+    return res
+#______________________________________________________________________________________________
+
+def mapRxn(fcn,xdata,ydata,extras,w=None,jobs=1,kind='process',pool=None,share=True):
+    """
+    Function mapRxn
+    ===============
+
+    Purpose:
+        Apply a fit function (fitfcn.fitRxn or fitfcn.bootRxn) to several photoreactions
+        with the same x data, in parallel for more than one job. Results are returned in
+        the order of the reactions. For process pools (share), the data is handed to the
+        workers once in a memory-mapped block (see shareblock) and workers process ranges
+        of reactions, otherwise the data of each reaction is sent to the workers.
+
+    Variables:
+    I/O:
+        fcn:    fit function called with (xdata,ydata,a0,...,w)
+        xdata:  data of independent variable (sza) for curve fitting or fit context
+        ydata:  list with data of dependent variable (j values) for each reaction
+        extras: list with further arguments (a0,...) of the fit function for each reaction
+        w:      list with weights of each reaction (None: absolute residuals)
+        jobs:   number of workers (1 for serial processing, 0 for number of cpus)
+        kind:   'process' for a pool of processes, 'thread' for a pool of threads
+        pool:   existing worker pool shared between calls (None: pool is created
+                from jobs and kind and closed afterwards)
+        share:  switch for the memory-mapped data block with process pools
+        res:    list with results of the fit function for each reaction
+
+    internal:
+        close:  switch to close the pool created here
+        args:   argument tuples for each reaction or range of reactions
+                (about 4*jobs ranges)
+        step:   number of reactions per range
+        file,nx:file name of data block and number of rows with x data
+
+    Dependencies:
+        uses:           os, mkpool, njobs, shareblock, mapShared, multiprocessing.pool.ThreadPool
+        called from:    parfcn.fitAll, parfcn.bootAll
+    """
+    from multiprocessing.pool import ThreadPool
+
+    if (w is None):
+        wy = [None]*len(ydata)
+    else:
+        wy = w
+    close = pool is None
+    if (close):
+        pool = mkpool(jobs,kind)
+    if (pool is None):
+        return [fcn((xdata,y) + tuple(a) + (wi,)) for y,a,wi in zip(ydata,extras,wy)]
+    try:
+        if (not share or isinstance(pool,ThreadPool) or len(ydata) == 0):
+            res = pool.map(fcn,[(xdata,y) + tuple(a) + (wi,) for y,a,wi in zip(ydata,extras,wy)])
+        else:
+            step = max(1,-(-len(ydata)//(4*njobs(jobs))))
+            file, nx = shareblock(xdata,ydata,w)
+            try:
+                args = [(fcn,file,nx,len(ydata),w is not None,lo,extras[lo:lo+step])
+                        for lo in range(0,len(ydata),step)]
+                res = [r for rs in pool.map(mapShared,args) for r in rs]
+            finally:
+                os.remove(file)
+    finally:
+        if (close):
+            pool.close()
+            pool.join()
+    return res
+#______________________________________________________________________________________________
+
+def fitAll(xdata,ydata,jobs=1,kind='process',method='leastsq',init='fixed',pool=None,
+           loss='linear',retry=False,w=None,share=True):
+    """
+    Function fitAll
+    ===============
+
+    Purpose:
+        Least square fits for several photoreactions with the same x data.
+        Fits are distributed over a pool of workers, results are returned
+        in the order of the reactions to keep output identical to serial runs.
+        With process pools, the data is handed to the workers once in a memory-mapped
+        block (see mapRxn). Alternatively, all reactions are fitted at once with the batched solver.
+        In robust mode (retry), fits without convergence are retried (see fitfcn.fitRobust),
+        for the batched solver these reactions are refitted individually.
+
+    Variables:
+    I/O:
+        xdata:  data of independent variable (sza) for curve fitting or fit context
+                (see fitfcn.mkcontext)
+        ydata:  list with data of dependent variable (j values) for each reaction
+        jobs:   number of workers (1 for serial processing, 0 for number of cpus)
+        kind:   'process' for a pool of processes, 'thread' for a pool of threads
+        method: 'leastsq' for individual fits with scipy.optimize.leastsq,
+                'batch' for the batched solver fitfcn.fitBatch (no worker pool)
+        init:   initial guess ('fixed', 'loglin' or 'grid', see fitfcn.guess; grid
+                searches of all reactions are done at once before the individual fits)
+                or list with initial parameters l, m, n of each reaction
+        pool:   existing worker pool shared between calls (None: pool is created
+                from jobs and kind and closed afterwards)
+        loss:   loss function ('linear', 'huber' or 'soft_l1', see fitfcn.fitTUV,
+                only 'linear' for the batched solver)
+        retry:  switch for retries of fits without convergence
+        w:      list with weights of each reaction (None: absolute residuals,
+                see fitfcn.weights)
+        share:  switch for the memory-mapped data block with process pools (see mapRxn)
+        res:    list of Results with parameters and statistical data for each reaction
+
+    internal:
+        k:      index of reaction refitted after batched fit
+        inits:  initial guesses of each reaction
+
+    Dependencies:
+        uses:           mapRxn, fitfcn.fitRxn, fitfcn.fitBatch, fitfcn.guess, numpy
+        called from:    datfcn.xydat
+    """
+    from fitfcn import fitRxn, fitBatch, guess
+
+    if (method == 'batch'):
+        if (loss != 'linear'):
+            raise ValueError("Loss function '%s' requires solver 'leastsq'." % loss)
+        if (len(ydata) == 0):
+            return []
+        if (w is None):
+            res = fitBatch(xdata,np.column_stack(ydata),init)
+        else:
+            res = fitBatch(xdata,np.column_stack(ydata),init,w=np.column_stack(w))
+        if (retry):
+            for k in range(len(res)):
+                if (res[k].status > 2):
+                    res[k] = fitRxn((xdata,ydata[k],init if isinstance(init,str) else init[k],
+                                     loss,retry,None if w is None else w[k]))
+        return res
+    elif (method != 'leastsq'):
+        raise ValueError("Unknown solver '%s', use 'leastsq' or 'batch'." % method)
+
+    if (not isinstance(init,str)):
+        inits = list(init)
+    elif (init == 'grid' and len(ydata) > 0):
+        inits = guess(xdata,np.column_stack(ydata),init,None if w is None else np.column_stack(w))
+    else:
+        inits = [init]*len(ydata)
+    res = mapRxn(fitRxn,xdata,ydata,[(i,loss,retry) for i in inits],w,jobs,kind,pool,share)
+    return res
+#______________________________________________________________________________________________
+
+def bootAll(xdata,ydata,res,nboot,seeds,jobs=1,kind='process',pool=None,w=None,share=True,
+            retry=False):
+    """
+    Function bootAll
+    ================
+
+    Purpose:
+        Bootstrap confidence intervals of the parameters of several photoreactions
+        (see fitfcn.bootRxn). Reactions are distributed over a pool of workers,
+        each reaction has its own seed, so results do not depend on the number
+        of workers. With process pools, the data is handed to the workers once
+        in a memory-mapped block (see mapRxn).
+
+    Variables:
+    I/O:
+        xdata:  data of independent variable (sza) for curve fitting or fit context
+        ydata:  list with data of dependent variable (j values) for each reaction
+        res:    list of Results of the fits of each reaction
+        nboot:  number of resamples
+        seeds:  list with seeds of each reaction
+        jobs:   number of workers (1 for serial processing, 0 for number of cpus)
+        kind:   'process' for a pool of processes, 'thread' for a pool of threads
+        pool:   existing worker pool shared between calls (None: pool is created
+                from jobs and kind and closed afterwards)
+        w:      list with weights of each reaction (None: absolute residuals)
+        share:  switch for the memory-mapped data block with process pools (see mapRxn)
+        retry:  switch for retries of refits without convergence (robust fits)
+        ci:     list with confidence intervals of l, m, n of each reaction
+
+    Dependencies:
+        uses:           mapRxn, fitfcn.bootRxn
+        called from:    datfcn.xydat
+    """
+    from fitfcn import bootRxn
+
+    ci = mapRxn(bootRxn,xdata,ydata,[(r,nboot,s,retry) for r,s in zip(res,seeds)],w,jobs,kind,pool,share)
+    return ci
+#______________________________________________________________________________________________
@@ -0,0 +1,154 @@
+"""
+Module pipefcn
+==============
+version 1.1
+-------------
+
+List of function focused on pipelined processing of many TUV output files:
+files are parsed ahead in a reader thread, while the current scenario is fitted,
+and outputs are written by a dedicated writer thread. Stages are connected by
+bounded queues, the order of all outputs is kept. Outputs are buffered in
+result sinks (see sinkfcn) until they are written by the writer thread.
+contains:
+    - readahead
+    - Writer
+"""
+
+import sys
+import threading
+import Queue
+#______________________________________________________________________________________________
+
+def readahead(files,load,depth=2):
+    """
+    Function readahead
+    ==================
+
+    Purpose:
+        Generator loading files in a reader thread ahead of their processing.
+        At most depth loaded files are kept in the bounded queue. Files are
+        returned in the given order, errors of the reader thread are raised
+        in the calling thread.
+
+    Variables:
+    I/O:
+        files:      list of file names
+        load:       function loading a single file
+        depth:      maximum number of files loaded ahead
+        ifile,res:  file name and result of load (yielded)
+
+    internal:
+        q:          bounded queue between reader and calling thread
+        item:       file name and result or exception info of reader thread
+
+    Dependencies:
+        uses:           threading, Queue
+        called from:    batchMCM (main)
+    """
+
+    def reader():
+        try:
+            for ifile in files:
+                q.put((ifile,load(ifile),None))
+        except:
+            q.put((None,None,sys.exc_info()))
+        q.put(None)
+
+    q = Queue.Queue(max(depth,1))
+    t = threading.Thread(target=reader,name='reader')
+    t.daemon = True
+    t.start()
+    while True:
+        item = q.get()
+        if (item is None):
+            break
+        ifile, res, err = item
+        if (err is not None):
+            raise err[0], err[1], err[2]
+        yield ifile, res
+    t.join()
+#______________________________________________________________________________________________
+
+class Writer(object):
+    """
+    Class Writer
+    ============
+
+    Purpose:
+        Dedicated writer thread executing output tasks in the order they are
+        submitted. At most depth tasks are queued, further submissions wait
+        for the writer. Errors of the writer are raised in the calling thread
+        with the next submission or on close. Tasks after an error of the writer
+        and queued tasks on abort (errors of the calling thread) are not executed,
+        but passed to drop (e.g. to discard their outputs).
+
+    Variables:
+        q:          bounded queue with tasks (function and arguments)
+        drop:       function called with the arguments of tasks not executed
+                    (None: tasks are discarded)
+        err:        exception info of a failed task (None: no error)
+        stop:       switch for aborted writer
+        thread:     writer thread
+    """
+
+    def __init__(self,depth=2,drop=None):
+        self.q = Queue.Queue(max(depth,1))
+        self.drop = drop
+        self.err = None
+        self.stop = False
+        self.thread = threading.Thread(target=self.run,name='writer')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        # execute tasks until close, drop remaining tasks after errors or abort
+        while True:
+            task = self.q.get()
+            if (task is None):
+                break
+            if (self.err is None and not self.stop):
+                try:
+                    task[0](*task[1])
+                except:
+                    self.err = sys.exc_info()
+            else:
+                self.discard(task)
+
+    def discard(self,task):
+        # pass task to drop, errors are ignored (raised after another error)
+        if (self.drop is not None):
+            try:
+                self.drop(*task[1])
+            except Exception:
+                pass
+
+    def check(self):
+        if (self.err is not None):
+            err, self.err = self.err, None
+            raise err[0], err[1], err[2]
+
+    def put(self,fcn,*args):
+        # submit task fcn(*args)
+        self.check()
+        self.q.put((fcn,args))
+
+    def close(self):
+        # wait for all submitted tasks
+        self.q.put(None)
+        self.thread.join()
+        self.check()
+
+    def abort(self):
+        # drop queued tasks and stop the writer after the current task (no effect after close)
+        self.stop = True
+        while True:
+            try:
+                task = self.q.get_nowait()
+            except Queue.Empty:
+                break
+            if (task is not None):
+                self.discard(task)
+        if (self.thread.is_alive()):
+            self.q.put(None)
+            self.thread.join()
+#______________________________________________________________________________________________
@@ -7,11 +7,19 @@ version 1.1
 List of function focused on plotting and writing file output.
 contains:
     - scatdat
+    - phead
     - pfit
+    - ptab
+    - psweep
+    - pfig
+    - pplot
+    - plotall
     - texstr
 """
 
 import sys
+import numpy as np
+from datfcn import order
 #______________________________________________________________________________________________
 
 def scatdat(rxn,data):
@@ -21,107 +29,421 @@ def scatdat(rxn,data):
 
         Purpose:
             Derive matrix with plot data and vector with associated photoreactions.
+            sza are converted to rad in a copy of the data matrix (data of the
+            caller are not changed).
 
         Variables:
         I/O
             rxn:        matrix with indices and labels of available photoreactions
             data:       matrix with sza-dependent j values from TUV model
+                        (returned as copy with sza in rad)
             om:         matrix with all orders of magnitudes (for sza column 0 dummy inserted)
 
-        internal:
-            h,x,y:      counters/indices
-            o1,o2:      order of magnitude of maximum value in each j data column
-
         Dependencies:
         uses:           numpy, datfcn.order
-        called from:    photMCM (main)
+        called from:    photMCM (main), batchMCM (main), watchMCM (main)
         """
 
-    # initilise data
-    import numpy as np
-    from datfcn import order
-    om    = []
-
-    # determine order of magnitude from maximum (first) value for nicer output
-    for y in range(len(rxn)):
-        o1, o2 = order(data[0][y+1])
-        om = np.append(om,o2)
-    om = np.insert(om,0,1.)
-        # write data matrix
-    for x in range(len(data)):
-        for y in range(len(rxn)+1):
-            if (y == 0):
-                data[x][0] = np.deg2rad(data[x][0])
+    # copy of data with sza in rad
+    data = np.array(data,dtype=float)
+    data[:,0] = np.deg2rad(data[:,0])
+    # order of magnitude from maximum (first) value of each reaction for nicer output
+    om = np.concatenate(([1.],order(data[0,1:len(rxn)+1])[1]))
     return rxn, data, om
 #______________________________________________________________________________________________
 
-def pfit(fout,fpar,pp,rxn,xdata,ydata,y,p,om,l,m,n,ol,el,em,en,rsquared,ss_tot,rmse,scen):
+def phead(fout,weight='abs',nboot=0,robust=False):
+    """
+    Function phead
+    ==============
+
+    Purpose:
+        Write header of data file with optimised parameters and statistical data.
+        For weighted fits, columns with RMSE and R^2 of the weighted residuals are added,
+        for bootstrap runs, columns with 95% confidence intervals of the parameters,
+        for robust runs, a column with the reduced sza cut-off of fits retried in a
+        reduced sza window.
+
+    Variables:
+    I/O:
+        fout:           identifier for output file
+        weight:         weighting of residuals ('abs', 'rel', 'cos' or 'user')
+        nboot:          number of bootstrap resamples (0: no confidence intervals)
+        robust:         switch for column with reduced sza cut-offs
+
+    internal:
+        now:            variable for present time
+
+    Dependencies:
+        uses:           datetime
+        called from:    photMCM (main), batchMCM (main)
+    """
+
+    from datetime import datetime as dt
+
+    now = dt.now()
+    fout.write("Parameters and statistical data for parameterisation of photolysis processes in MCMv4.0.\n")
+    fout.write("j / s-1 = l%s(cos(x))^m%sexp(-n%ssec(x))\n\n" % (u"\u00B7",u"\u00B7",u"\u00B7"))
+    fout.write("created %s.%s.%s, %s:%s\n\n\n" % (now.day,now.month,now.year,now.hour,now.minute))
+    if (weight != 'abs'):
+        fout.write("weighting of residuals: %s\n" % weight)
+    if (nboot > 0):
+        fout.write("95%% confidence intervals from %i bootstrap resamples\n" % nboot)
+    fout.write("               P a r a m e t e r s        \t\t\t  S t a t i s t i c s\n")
+    head = "    l / s-1     \t      m      \t      n      \t RMSE / s-1 \t   R^2  \t"
+    if (weight != 'abs'):
+        head += "   wRMSE    \t  wR^2  \t"
+    if (nboot > 0):
+        head += "   l 95% CI / s-1   \t    m 95% CI     \t    n 95% CI     \t"
+    if (robust):
+        head += "co / deg\t"
+    fout.write(head + "Reaction\n")
+
+    return None
+
+#______________________________________________________________________________________________
+
+def pfit(fout,fpar,rxn,y,p,l,m,n,ol,el,em,en,rsquared,rmse,wrsquared=None,wrmse=None,ci=None,
+         co=None):
     """
     Function pfit
     =============
 
     Purpose:
-        Produce output:
+        Produce text output:
             - Data file with optimised parameters and statistical data
             - Matrix with parameters for further processing
-            - Plots with TUV data and fitted functions
+        Plots are produced separately by function plotall.
 
     Variables:
     I/O:
-        fout,fpar:      identifiers for output files
+        fout,fpar:      identifiers for output files (None: file is not written)
         rxn:            matrix with indices and labels of available photoreactions
         p:              matrix with all optimised paramters from least square fit
         l,m,n:          optimised paramters from least square fit
         el,em,en:       confidence of parameters
         ol:             order of magnitude of parameter l
-        om:             matrix with all orders of magnitudes (for sza column 0 dummy inserted)
         rsquared:       correlation coefficient
-        ss_tot:         standard deviation
         rmse:           root mean square error
+        wrsquared:      correlation coefficient of weighted residuals (None: unweighted fit)
+        wrmse:          root mean square error of weighted residuals (None: unweighted fit)
+        ci:             bootstrap confidence intervals of l (in s-1), m, n (None: not derived)
+        co:             reduced sza cut-off in deg. (nan: full sza window, written as '-',
+                        None: no column)
         y:              index (for addressing positions in rxn-matrix)
+
+    internal:
+        line:           line of data file
+
+    Dependencies:
+        called from:    sinkfcn.DatSink, sinkfcn.ParSink
+    """
+
+    # write data in table in file <scen>.dat
+    if (fout is not None):
+        line = "(%.3f%s%.3f)E%i\t %.3f%s%.3f \t %.3f%s%.3f \t  %.3e \t %.4f \t" \
+               %(l,u"\u00B1",el,ol,m,u"\u00B1",em,n,u"\u00B1",en,rmse,rsquared)
+        if (wrmse is not None):
+            line += "  %.3e \t %.4f \t" % (wrmse,wrsquared)
+        if (ci is not None):
+            line += " [%.3f,%.3f]E%i \t [%7.3f,%7.3f] \t [%7.3f,%7.3f] \t" \
+                    % (ci[0][0]/10.**ol,ci[0][1]/10.**ol,ol,ci[1][0],ci[1][1],ci[2][0],ci[2][1])
+        if (co is not None):
+            line += "  %5.1f \t" % co if np.isfinite(co) else "    -   \t"
+        fout.write(line + "%s\n" % rxn[y][1])
+
+    # write file with parameter matrix for further processing
+    if (fpar is not None):
+        fpar.write("j%i\t%.3e\t%.3f\t%.3f\n" % (rxn[y][0],p[0],m,n,))
+
+    return None
+
+#______________________________________________________________________________________________
+
+def ptab(ftab,scen,z,rxn,out):
+    """
+    Function ptab
+    =============
+
+    Purpose:
+        Write results of all fitted photoreactions of a scenario and altitude
+        to the combined result table of a batch run (tab separated, indexed by
+        scenario, altitude and reaction number).
+
+    Variables:
+    I/O:
+        ftab:           identifier for output file
         scen:           scenario name
+        z:              altitude in km
+        rxn:            matrix with indices and labels of available photoreactions
+        out:            list with reaction indices and Results of all fits
+
+    internal:
+        y:              index (for addressing positions in rxn-matrix)
+        r:              Result of current fit
+        ml:             factor 10^(order) of parameter l
+
+    Dependencies:
+        called from:    batchMCM (main)
+    """
+
+    for y, r in out:
+        ml = 10.**r.ol
+        ftab.write("%s\t%.3f\t%i\t%.4e\t%.4e\t%.4f\t%.4f\t%.4f\t%.4f\t%.4e\t%.6f\t%s\n"
+                   % (scen,z,rxn[y][0],r.p[0],r.el*ml,r.m,r.em,r.n,r.en,r.rmse,r.rsquared,rxn[y][1]))
+
+    return None
+
+#______________________________________________________________________________________________
+
+def psweep(fout,rxn,ifit,cos,res,best,tol=1.e-3,weight='abs'):
+    """
+    Function psweep
+    ===============
+
+    Purpose:
+        Write the table of a cut-off sweep with parameters, RMSE, R^2 and status code
+        of the fits of each reaction and sza cut-off (recommended cut-offs marked with *)
+        followed by the recommended cut-off of each reaction.
+
+    Variables:
+    I/O:
+        fout:           identifier for output file
+        rxn:            matrix with indices and labels of available photoreactions
+        ifit:           indices of fitted reactions
+        cos:            cut-offs in descending order
+        res:            list with Results of all fitted reactions for each cut-off
+        best:           recommended cut-off of each fitted reaction (nan: none)
+        tol:            tolerance of R^2 for the recommendation (see sweepfcn.recommend)
+        weight:         weighting of residuals ('abs', 'rel', 'cos' or 'user')
+
+    internal:
+        now:            variable for present time
+        k,y:            index of fitted reaction and index in rxn-matrix
+        r:              Result of current fit
+
+    Dependencies:
+        uses:           datetime, numpy
+        called from:    photMCM (main)
+    """
+
+    from datetime import datetime as dt
+
+    now = dt.now()
+    fout.write("Sensitivity of parameterisations of photolysis processes in MCMv4.0 to the sza cut-off.\n")
+    fout.write("j / s-1 = l%s(cos(x))^m%sexp(-n%ssec(x)) for sza x < cut-off\n\n" % (u"\u00B7",u"\u00B7",u"\u00B7"))
+    fout.write("created %s.%s.%s, %s:%s\n\n\n" % (now.day,now.month,now.year,now.hour,now.minute))
+    if (weight != 'abs'):
+        fout.write("weighting of residuals: %s\n" % weight)
+    fout.write("recommended cut-off (*): largest cut-off with converged fit and R^2 within %g of the best R^2\n"
+               % tol)
+    fout.write("  co / deg  \t   l / s-1   \t    m    \t    n    \t RMSE / s-1 \t   R^2  \tstatus\tReaction\n")
+    for k, y in enumerate(ifit):
+        for co, fits in zip(cos,res):
+            r = fits[k]
+            fout.write("  %5.1f %s   \t %.4e \t %7.4f \t %7.4f \t  %.3e \t %.4f \t  %i  \t%s\n"
+                       % (co,"*" if co == best[k] else " ",r.p[0],r.m,r.n,r.rmse,r.rsquared,r.status,
+                          rxn[y][1]))
+    fout.write("\n\nRecommended cut-offs:\n")
+    for k, y in enumerate(ifit):
+        if (np.isfinite(best[k])):
+            fout.write("  %5.1f deg.\t%s\n" % (best[k],rxn[y][1]))
+        else:
+            fout.write("  no fit converged\t%s\n" % rxn[y][1])
+
+    return None
+
+#______________________________________________________________________________________________
+
+def pfig(label,xdata,ydata,p,om):
+    """
+    Function pfig
+    =============
+
+    Purpose:
+        Create figure with TUV data and fitted function of a single photoreaction.
+        Figures are created without pyplot to be safe in threads.
+
+    Variables:
+    I/O:
+        label:          label of photoreaction
+        xdata,ydata:    x-,y-data of the fit (sza and j values)
+        p:              optimised paramters from least square fit
+        om:             order of magnitude for plot of the j values
+        fig:            figure
 
     internal:
         now:            variable for present time
         x:              x data for function plotting
-        fig,axes,
+        axes,
         ymax,ymin:      variables used for plotting/formatting plots
 
     Dependencies:
-        uses:           datetime, numpy, matplotlib.pyplot, texstr
-        called from:    datfcn.xydat
+        uses:           datetime, numpy, matplotlib, texstr
+        called from:    pltfcn.pplot, pltfcn.plotall
     """
 
-    import numpy as np
     from datetime import datetime as dt
-    import matplotlib.pyplot as plt
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_pdf import FigureCanvasPdf
+
     x = np.linspace(0.,np.pi/2,100) # define x-data for function plotting
     now = dt.now() # set timestamp
 
-    # write data in table in file <scen>.dat
-    fout.write("(%.3f%s%.3f)E%i\t %.3f%s%.3f \t %.3f%s%.3f \t  %.3e \t %.4f \t%s\n"
-               %(l,u"\u00B1",el,ol,m,u"\u00B1",em,n,u"\u00B1",en,rmse,rsquared,rxn[y][1]))
-
-    # write file with parameter matrix for further processing
-    fpar.write("j%i\t%.3e\t%.3f\t%.3f\n" % (rxn[y][0],p[0],m,n,))
-
     # create plots with TUV data and fitted functions
-    fig = plt.figure(y)
-    fig.set_size_inches(6.,4.)
-    axes = plt.gca()
-    plt.xlabel('sza')
-    tex = texstr(rxn[y][1])
-
-    plt.ylabel('$j\mathrm{[%s]\ /\ 10^{%i}\,s^{-1}}$' % (tex, int(np.log10(om[y+1]))), fontsize=10)
-    plt.xticks([0.,0.1*np.pi,0.2*np.pi,0.3*np.pi,0.4*np.pi,0.5*np.pi],
-               [r'$0$',r'$\frac{1}{10}\pi$',r'$\frac{1}{5}\pi$',r'$\frac{3}{10}\pi$',r'$\frac{2}{5}\pi$',r'$\frac{1}{2}\pi$'])
-    plt.plot(xdata,ydata/om[y+1],'ks')
-    plt.plot(x,p[0]/om[y+1]*np.cos(x)**m*np.exp(-n/np.cos(x)),'r-', linewidth=2.0)
+    fig = Figure(figsize=(6.,4.))
+    FigureCanvasPdf(fig)
+    axes = fig.add_subplot(111)
+    axes.set_xlabel('sza')
+    tex = texstr(label)
+
+    axes.set_ylabel('$j\mathrm{[%s]\ /\ 10^{%i}\,s^{-1}}$' % (tex, int(np.log10(om))), fontsize=10)
+    axes.set_xticks([0.,0.1*np.pi,0.2*np.pi,0.3*np.pi,0.4*np.pi,0.5*np.pi])
+    axes.set_xticklabels([r'$0$',r'$\frac{1}{10}\pi$',r'$\frac{1}{5}\pi$',r'$\frac{3}{10}\pi$',
+                          r'$\frac{2}{5}\pi$',r'$\frac{1}{2}\pi$'])
+    axes.plot(xdata,ydata/om,'ks')
+    axes.plot(x,p[0]/om*np.cos(x)**p[1]*np.exp(-p[2]/np.cos(x)),'r-', linewidth=2.0)
     ymin,ymax = axes.get_ylim()
-    plt.text(0.03*np.pi,0.1*ymax,'created: %s.%s.%s, %s:%02d' % (now.day,now.month,now.year,now.hour,now.minute), fontsize=9)
-    pp.savefig(fig)
-    plt.close(fig)
+    axes.text(0.03*np.pi,0.1*ymax,'created: %s.%s.%s, %s:%02d' % (now.day,now.month,now.year,now.hour,now.minute), fontsize=9)
+
+    return fig
+
+#______________________________________________________________________________________________
+
+def pplot(args):
+    """
+    Function pplot
+    ==============
+
+    Purpose:
+        Render the plot of a single photoreaction to a pdf page.
+        Takes a single argument tuple to be mapped over pools of processes
+        (matplotlib settings are changed for the whole worker process).
+
+    Variables:
+    I/O:
+        args:           tuple with label of the photoreaction, x-,y-data of the fit,
+                        optimised parameters, order of magnitude for the plot and
+                        matplotlib settings
+        page:           pdf page as string
+
+    internal:
+        fig:            figure
+        buf:            buffer for pdf output
+
+    Dependencies:
+        uses:           io, matplotlib, pfig
+        called from:    pltfcn.plotall
+    """
+
+    import io
+    import matplotlib as mpl
+
+    mpl.rcParams.update(args[-1])
+    fig = pfig(*args[:-1])
+    buf = io.BytesIO()
+    fig.savefig(buf,format='pdf')
+    page = buf.getvalue()
+
+    return page
+
+#______________________________________________________________________________________________
+
+def plotall(scen,pages,mode='tex',jobs=1,pool=None):
+    """
+    Function plotall
+    ================
+
+    Purpose:
+        Separate plotting stage: render plots of all fitted photoreactions and
+        save them to <scen>.pdf in the order of the reactions. Pages are written
+        to a temporary file, which replaces <scen>.pdf when complete.
+        Pages are rendered in a pool of processes for more than one job and merged
+        with PyPDF2 (optional, serial rendering if it is not available).
+        (Matplotlib rendering is not thread-safe, no thread pools are used.)
+
+    Variables:
+    I/O:
+        scen:           scenario name
+        pages:          list of tuples with arguments for pfig in the order of the reactions
+        mode:           'none' (no plots), 'fast' (matplotlib mathtext),
+                        'tex' (LaTeX rendering of labels)
+        jobs:           number of workers for rendering (1: serial, 0: number of cpus)
+        pool:           existing pool of processes shared between calls (None: pool is
+                        created from jobs and closed afterwards)
+
+    internal:
+        rc:             matplotlib settings for rendering
+        merger:         object to merge pdf pages
+        shared:         switch for shared pool
+        pdfs:           rendered pdf pages
+        pp:             pdf output for serial rendering
+        tmp:            name of temporary pdf file
+
+    Dependencies:
+        uses:           io, os, matplotlib/PdfPages, pfig, pplot, parfcn.mkpool,
+                        PyPDF2.PdfFileMerger (optional)
+        called from:    datfcn.xydat
+    """
+
+    if (mode == 'none' or len(pages) == 0):
+        return None
+    elif (mode not in ['fast','tex']):
+        raise ValueError("Unknown plot mode '%s', use 'none', 'fast' or 'tex'." % mode)
+
+    # matplotlib is only loaded, if plots are produced
+    import io
+    import os
+    import matplotlib as mpl
+    from matplotlib.backends.backend_pdf import PdfPages
+    from parfcn import mkpool
+
+    #set output for plotting
+    rc = {'text.usetex': mode == 'tex', 'figure.autolayout': True}
+#    rc.update({'font.family': 'sans-serif', 'font.sans-serif': ['Helvetica']})
+
+    # define merger for pdf pages
+    try:
+        from PyPDF2 import PdfFileMerger as merger
+    except ImportError:
+        merger = None
+    tmp = '%s.pdf.tmp' % scen
+    with mpl.rc_context(rc):
+        shared = pool is not None
+        if (merger is None or len(pages) == 1):
+            pool = None
+        elif (not shared):
+            pool = mkpool(jobs,'process')
+
+        if (pool is None):
+            # serial rendering
+            pp = PdfPages(tmp)
+            try:
+                for a in pages:
+                    pp.savefig(pfig(*a))
+                pp.close()
+            except:
+                # incomplete file is removed, previous plots are kept
+                os.remove(tmp)
+                raise
+            os.rename(tmp,'%s.pdf' % scen)
+            return None
+
+        # parallel rendering
+        try:
+            pdfs = pool.map(pplot,[a + (rc,) for a in pages],1)
+        finally:
+            if (not shared):
+                pool.close()
+                pool.join()
 
+    # merge pages
+    pdf = merger()
+    for page in pdfs:
+        pdf.append(io.BytesIO(page))
+    with open(tmp,'wb') as fpdf:
+        pdf.write(fpdf)
+    os.rename(tmp,'%s.pdf' % scen)
     return None
 
 #______________________________________________________________________________________________
@@ -147,7 +469,7 @@ def texstr(orig):
 
         Dependencies:
         uses:           re
-        called from:    pltfcn.pfit
+        called from:    pltfcn.pfig
         """
 
     import re
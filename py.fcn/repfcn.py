@@ -0,0 +1,218 @@
+"""
+Module repfcn
+=============
+version 1.1
+-------------
+
+List of function focused on run reports with timings of each stage and
+reaction, numbers of function evaluations and peak memory, as well as
+optional profiling with cProfile.
+contains:
+    - newrep
+    - stage
+    - rxnrep
+    - peakmem
+    - wreport
+    - profiled
+"""
+
+import sys
+import time
+import contextlib
+import numpy as np
+#______________________________________________________________________________________________
+
+def newrep(scen,ifiles,opts):
+    """
+    Function newrep
+    ===============
+
+    Purpose:
+        Initialise the run report of a scenario (or batch run).
+
+    Variables:
+    I/O:
+        scen:       scenario name (or name of batch output)
+        ifiles:     list of input files
+        opts:       dictionary with command line options
+        rep:        dictionary with run report
+
+    Dependencies:
+        uses:           time, datetime
+        called from:    photMCM (main), batchMCM (main)
+    """
+    from datetime import datetime as dt
+
+    rep = {'scen': scen, 'ifiles': list(ifiles), 'options': dict(opts),
+           'date': dt.now().isoformat(), 'start': time.time(),
+           'stages': {}, 'reactions': []}
+    return rep
+#______________________________________________________________________________________________
+
+@contextlib.contextmanager
+def stage(rep,name):
+    """
+    Function stage
+    ==============
+
+    Purpose:
+        Context manager adding the wall time of the enclosed block to the
+        stage 'name' of the run report (times of repeated stages are summed up).
+        Nothing is recorded, if no report is given.
+
+    Variables:
+    I/O:
+        rep:        dictionary with run report (or None)
+        name:       name of the stage
+
+    internal:
+        t0:         start time
+
+    Dependencies:
+        uses:           time
+        called from:    photMCM (main), batchMCM (main), datfcn.xydat
+    """
+
+    t0 = time.time()
+    try:
+        yield
+    finally:
+        if (rep is not None):
+            rep['stages'][name] = rep['stages'].get(name,0.) + time.time() - t0
+#______________________________________________________________________________________________
+
+def rxnrep(rep,scen,rxn,out,cached=()):
+    """
+    Function rxnrep
+    ===============
+
+    Purpose:
+        Add timings, numbers of iterations and function evaluations and status
+        codes of each fitted reaction to the run report.
+
+    Variables:
+    I/O:
+        rep:        dictionary with run report
+        scen:       scenario name
+        rxn:        matrix with indices and labels of available photoreactions
+        out:        list with reaction indices and Results of all fits
+        cached:     indices of reactions with results taken from the cache
+                    (timings and evaluations refer to the original fit)
+
+    Dependencies:
+        called from:    datfcn.xydat
+    """
+
+    for y, r in out:
+        rep['reactions'].append({'scen': scen, 'rxn': int(rxn[y][0]), 'label': rxn[y][1].strip(),
+                                 'tfit': float(r.tfit), 'tstat': float(r.tstat),
+                                 'niter': int(r.niter), 'nfev': int(r.nfev),
+                                 'status': int(r.status),
+                                 'cached': y in cached})
+    return None
+#______________________________________________________________________________________________
+
+def peakmem():
+    """
+    Function peakmem
+    ================
+
+    Purpose:
+        Peak resident memory of the current process and of all finished
+        child processes (workers) in MB.
+
+    Variables:
+    I/O:
+        mem:        tuple with peak memory of the process and its children in MB
+
+    internal:
+        unit:       unit of ru_maxrss in bytes (kB on Linux, bytes on Mac OS)
+
+    Dependencies:
+        uses:           resource
+        called from:    wreport
+    """
+    import resource
+
+    if (sys.platform == 'darwin'):
+        unit = 1.
+    else:
+        unit = 1024.
+    mem = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*unit/2.**20,
+           resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss*unit/2.**20)
+    return mem
+#______________________________________________________________________________________________
+
+def wreport(file,rep):
+    """
+    Function wreport
+    ================
+
+    Purpose:
+        Complete the run report with total wall time, totals of all reactions and
+        peak memory and save it as json file.
+
+    Variables:
+    I/O:
+        file:       file name of the report (<scenario>.run.json)
+        rep:        dictionary with run report
+
+    internal:
+        rr:         reports of each reaction
+        f:          variable for opening output file
+
+    Dependencies:
+        uses:           json, time, peakmem
+        called from:    photMCM (main), batchMCM (main)
+    """
+    import json
+
+    rr = rep['reactions']
+    rep['wall'] = time.time() - rep['start']
+    rep['totals'] = {'nfit': len(rr), 'ncached': sum(r['cached'] for r in rr),
+                     'niter': sum(r['niter'] for r in rr), 'nfev': sum(r['nfev'] for r in rr),
+                     'nstatus': dict((str(c),sum(r['status'] == c for r in rr))
+                                     for c in set(r['status'] for r in rr)),
+                     'tfit': sum(r['tfit'] for r in rr), 'tstat': sum(r['tstat'] for r in rr)}
+    rep['peak_mem_mb'], rep['peak_mem_children_mb'] = peakmem()
+    with open(file,'w') as f:
+        json.dump(rep,f,indent=2,sort_keys=True)
+    return None
+#______________________________________________________________________________________________
+
+@contextlib.contextmanager
+def profiled(file):
+    """
+    Function profiled
+    =================
+
+    Purpose:
+        Context manager profiling the enclosed block with cProfile and dumping the
+        statistics to file (readable with pstats). Nothing is profiled, if no file
+        is given. Only the main process is profiled, not the workers.
+
+    Variables:
+    I/O:
+        file:       file name of the profile (None: no profiling)
+
+    internal:
+        prof:       profiler
+
+    Dependencies:
+        uses:           cProfile
+        called from:    photMCM (main), batchMCM (main)
+    """
+
+    if (file is None):
+        yield
+        return
+    import cProfile
+
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        prof.dump_stats(file)
+#______________________________________________________________________________________________
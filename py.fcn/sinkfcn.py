@@ -0,0 +1,359 @@
+"""
+Module sinkfcn
+==============
+version 1.1
+-------------
+
+List of function focused on writing the results of all fits to several output
+files in one pass. The fitting functions emit a record (reaction index and Result)
+for each fitted reaction to a result sink. Sinks buffer their output, write it in
+large blocks to temporary files <file>.tmp and replace the output files only when
+all results are written (atomic on POSIX file systems), outputs of failed runs
+are removed.
+contains:
+    - AtomicFile
+    - Sink
+    - DatSink
+    - ParSink
+    - NpySink
+    - CsvSink
+    - Sinks
+    - mksinks
+"""
+
+import sys
+import os
+#______________________________________________________________________________________________
+
+class AtomicFile(object):
+    """
+    Class AtomicFile
+    ================
+
+    Purpose:
+        Buffered output file written to the temporary file <file>.tmp in blocks of
+        at least bufsize bytes. The output file is replaced by the complete temporary
+        file on commit, the temporary file is removed on abort. Used as context
+        manager, the file is committed at the end of the block and aborted on errors.
+        Committed or aborted files cannot be written any more (ValueError as for
+        closed files).
+
+    Variables:
+        file,tmp:   names of output file and temporary file
+        bufsize:    minimum size of written blocks in bytes
+        chunks:     buffered strings (unicode strings are encoded in UTF-8)
+        size:       size of buffered strings in bytes
+        f:          file identifier of temporary file (None: not opened yet)
+        closed:     switch for committed or aborted files
+    """
+
+    def __init__(self,file,bufsize=1<<20):
+        self.file = file
+        self.tmp = "%s.tmp" % file
+        self.bufsize = bufsize
+        self.chunks = []
+        self.size = 0
+        self.f = None
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,etype,value,tb):
+        if (etype is None):
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+    def check(self):
+        if (self.closed):
+            raise ValueError("I/O operation on closed file '%s'." % self.file)
+
+    def write(self,s):
+        self.check()
+        if (isinstance(s,unicode)):
+            s = s.encode('utf-8')
+        self.chunks.append(s)
+        self.size += len(s)
+        if (self.size >= self.bufsize):
+            self.flush()
+
+    def flush(self):
+        # write buffer to temporary file in one block
+        self.check()
+        if (self.f is None):
+            self.f = open(self.tmp,'wb')
+        self.f.write(b''.join(self.chunks))
+        self.chunks = []
+        self.size = 0
+
+    def commit(self):
+        # write remaining buffer and replace output file
+        if (self.closed):
+            return None
+        self.flush()
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+        os.rename(self.tmp,self.file)
+        self.closed = True
+        return None
+
+    def abort(self):
+        # discard buffer and temporary file, the previous output file is kept
+        if (self.closed):
+            return None
+        self.chunks = []
+        if (self.f is not None):
+            self.f.close()
+            os.remove(self.tmp)
+        self.closed = True
+        return None
+#______________________________________________________________________________________________
+
+class Sink(object):
+    """
+    Class Sink
+    ==========
+
+    Purpose:
+        Result sink writing the records of all fitted reactions of a scenario and
+        altitude to an AtomicFile. Derived classes format the records in write
+        and write output depending on all records in finish.
+
+        sink.write(rxn,y,r)     # for each fitted reaction (see datfcn.xydat)
+        sink.close()            # finish and replace output file after the last record
+        sink.abort()            # discard output after errors
+
+    Variables:
+        out:        AtomicFile of the output file
+    """
+
+    def __init__(self,file,bufsize=1<<20):
+        self.out = AtomicFile(file,bufsize)
+
+    def write(self,rxn,y,r):
+        # record with matrix of photoreactions, reaction index and Result of the fit
+        pass
+
+    def finish(self):
+        # output after the last record
+        pass
+
+    def close(self):
+        self.finish()
+        self.out.commit()
+
+    def abort(self):
+        self.out.abort()
+#______________________________________________________________________________________________
+
+class DatSink(Sink):
+    """
+    Class DatSink
+    =============
+
+    Purpose:
+        Data file <scen>.dat with optimised parameters and statistical data
+        (see pltfcn.phead and pltfcn.pfit).
+
+    Variables:
+        out:        AtomicFile of the output file
+        weighted:   switch for columns with RMSE and R^2 of weighted residuals
+        robust:     switch for column with reduced sza cut-offs of retried fits
+    """
+
+    def __init__(self,file,weight='abs',nboot=0,robust=False,bufsize=1<<20):
+        from pltfcn import phead
+
+        Sink.__init__(self,file,bufsize)
+        self.weighted = weight != 'abs'
+        self.robust = robust
+        phead(self.out,weight,nboot,robust)
+
+    def write(self,rxn,y,r):
+        from pltfcn import pfit
+
+        co = r.co if self.robust else None
+        if (self.weighted):
+            pfit(self.out,None,rxn,y,r.p,r.l,r.m,r.n,r.ol,r.el,r.em,r.en,r.rsquared,r.rmse,
+                 r.wrsquared,r.wrmse,r.ci,co)
+        else:
+            pfit(self.out,None,rxn,y,r.p,r.l,r.m,r.n,r.ol,r.el,r.em,r.en,r.rsquared,r.rmse,ci=r.ci,
+                 co=co)
+#______________________________________________________________________________________________
+
+class ParSink(Sink):
+    """
+    Class ParSink
+    =============
+
+    Purpose:
+        Parameter file <scen>.par with lines 'j<rxn> l m n' for further processing
+        (see pltfcn.pfit).
+
+    Variables:
+        out:        AtomicFile of the output file
+    """
+
+    def write(self,rxn,y,r):
+        from pltfcn import pfit
+
+        pfit(None,self.out,rxn,y,r.p,r.l,r.m,r.n,r.ol,r.el,r.em,r.en,r.rsquared,r.rmse)
+#______________________________________________________________________________________________
+
+class NpySink(Sink):
+    """
+    Class NpySink
+    =============
+
+    Purpose:
+        Binary output <scen>.npy with the structured array of all results (see
+        iofcn.parrec), written when the sink is closed.
+
+    Variables:
+        out:        AtomicFile of the output file
+        scen,z:     scenario name and altitude in km
+        rxn:        matrix with indices and labels of available photoreactions
+        recs:       list with reaction indices and Results of all records
+    """
+
+    def __init__(self,file,scen,z,bufsize=1<<20):
+        Sink.__init__(self,file,bufsize)
+        self.scen = scen
+        self.z = z
+        self.rxn = None
+        self.recs = []
+
+    def write(self,rxn,y,r):
+        self.rxn = rxn
+        self.recs.append((y,r))
+
+    def finish(self):
+        from iofcn import parrec, savepar
+
+        savepar(self.out,parrec(self.scen,self.z,self.rxn,self.recs))
+#______________________________________________________________________________________________
+
+class CsvSink(Sink):
+    """
+    Class CsvSink
+    =============
+
+    Purpose:
+        Comma separated output <scen>.csv with all results, one line per reaction
+        with the columns of the binary output (see iofcn.partype).
+
+    Variables:
+        out:        AtomicFile of the output file
+        scen,z:     scenario name and altitude in km
+        csv:        csv writer
+    """
+
+    def __init__(self,file,scen,z,bufsize=1<<20):
+        import csv
+        from iofcn import partype
+
+        Sink.__init__(self,file,bufsize)
+        self.scen = scen
+        self.z = z
+        self.csv = csv.writer(self.out,lineterminator='\n')
+        self.csv.writerow([f for f, t in partype])
+
+    def write(self,rxn,y,r):
+        from iofcn import parrec
+
+        self.csv.writerow(parrec(self.scen,self.z,rxn,[(y,r)])[0].tolist())
+#______________________________________________________________________________________________
+
+class Sinks(list):
+    """
+    Class Sinks
+    ===========
+
+    Purpose:
+        List of result sinks receiving the same records. All sinks are closed (or
+        aborted) together: output files are only replaced, when all sinks are finished.
+        Used as context manager, sinks are closed at the end of the block and aborted
+        on errors.
+
+    Variables:
+        list items: result sinks
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,etype,value,tb):
+        if (etype is None):
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def write(self,rxn,y,r):
+        for s in self:
+            s.write(rxn,y,r)
+
+    def close(self):
+        try:
+            for s in self:
+                s.finish()
+                s.out.flush()
+        except:
+            self.abort()
+            raise
+        for s in self:
+            s.out.commit()
+
+    def abort(self):
+        for s in self:
+            s.abort()
+#______________________________________________________________________________________________
+
+def mksinks(scen,z,weight='abs',nboot=0,robust=False,kinds=('dat','par','npy'),bufsize=1<<20):
+    """
+    Function mksinks
+    ================
+
+    Purpose:
+        Result sinks of a scenario and altitude for the output files <scen>.<kind>.
+
+    Variables:
+    I/O:
+        scen:       scenario name
+        z:          altitude in km (nan if unknown)
+        weight:     weighting of residuals ('abs', 'rel', 'cos' or 'user', see pltfcn.phead)
+        nboot:      number of bootstrap resamples (0: no confidence intervals)
+        robust:     switch for column with reduced sza cut-offs in the data file
+                    (retried fits, see fitfcn.fitRxn)
+        kinds:      output files: 'dat' (DatSink), 'par' (ParSink), 'npy' (NpySink),
+                    'csv' (CsvSink)
+        bufsize:    minimum size of written blocks in bytes
+        sinks:      Sinks with all output files
+
+    Dependencies:
+        uses:           DatSink, ParSink, NpySink, CsvSink, Sinks
+        called from:    photMCM (main), batchMCM (main), watchMCM (main)
+    """
+
+    sinks = Sinks()
+    try:
+        for kind in kinds:
+            file = "%s.%s" % (scen,kind)
+            if (kind == 'dat'):
+                sinks.append(DatSink(file,weight,nboot,robust,bufsize))
+            elif (kind == 'par'):
+                sinks.append(ParSink(file,bufsize))
+            elif (kind == 'npy'):
+                sinks.append(NpySink(file,scen,z,bufsize))
+            elif (kind == 'csv'):
+                sinks.append(CsvSink(file,scen,z,bufsize))
+            else:
+                raise ValueError("Unknown output '%s', use 'dat', 'par', 'npy' or 'csv'." % kind)
+    except:
+        sinks.abort()
+        raise
+    return sinks
+#______________________________________________________________________________________________
@@ -0,0 +1,153 @@
+"""
+Module sweepfcn
+===============
+version 1.1
+-------------
+
+List of function focused on the sensitivity of the fits to the sza cut-off:
+all photoreactions are fitted for a list of cut-offs in one pass over the parsed
+data and the fit context, and a cut-off is recommended for each reaction.
+contains:
+    - sweep
+    - recommend
+"""
+
+import sys
+import numpy as np
+#______________________________________________________________________________________________
+
+def sweep(data,cutoffs,jobs=1,kind='process',method='leastsq',init='fixed',pool=None,
+          loss='linear',weight='abs',rep=None):
+    """
+    Function sweep
+    ==============
+
+    Purpose:
+        Fit all photoreactions for several sza cut-offs. The fit window and the fit
+        context (see fitfcn.mkcontext) are derived once for the largest cut-off and
+        sliced for the smaller ones. Cut-offs are processed in descending order, fits
+        are started from the parameters of the neighbouring (next larger) cut-off,
+        fits without convergence there are started from the initial guess init.
+
+    Variables:
+    I/O:
+        data:       matrix with TUV data (sza in rad in column 0, j values in following columns)
+        cutoffs:    list with sza cut-offs in deg.
+        jobs:       number of workers for curve fitting (1: serial, 0: number of cpus)
+        kind:       type of worker pool ('process' or 'thread')
+        method:     solver for curve fitting ('leastsq' or 'batch')
+        init:       initial guess of the fits at the largest cut-off ('fixed', 'loglin' or 'grid')
+        pool:       existing worker pool (None: a pool is created from jobs and kind
+                    for all cut-offs and closed afterwards)
+        loss:       loss function ('linear', 'huber' or 'soft_l1', see fitfcn.fitTUV)
+        weight:     weighting of residuals ('abs', 'rel', 'cos' or tuple with arrays of
+                    sza in deg. and user weights, see datfcn.xydat)
+        rep:        run report (see repfcn, None: no report)
+        cos:        cut-offs in descending order
+        ifit:       indices of reactions with non-zero j values
+        res:        list with Results of all fitted reactions for each cut-off in cos
+
+    internal:
+        xdata:      sza in the fit window of the largest cut-off
+        ctx,sub:    fit context of the largest and the current cut-off
+        yblock:     j values of all reactions in the fit window of the largest cut-off
+        wblock:     weights of all reactions (None for absolute residuals)
+        mask:       mask of the current fit window in xdata
+        yfit,wfit:  j values and weights of fitted reactions in the current fit window
+        inits:      initial guesses of all reactions for the current cut-off
+        fits:       Results of all reactions for the current cut-off
+        bad:        reactions without converged fit at the neighbouring cut-off
+        p0:         initial guesses in the current fit window
+        close:      switch to close the pool created here
+
+    Dependencies:
+        uses:           numpy, datfcn.select_fit_window, fitfcn.mkcontext, fitfcn.subcontext,
+                        fitfcn.weights, fitfcn.guess, parfcn.fitAll, parfcn.mkpool,
+                        repfcn.stage
+        called from:    photMCM (main)
+    """
+    from datfcn import select_fit_window
+    from fitfcn import mkcontext, subcontext, weights, guess
+    from parfcn import fitAll, mkpool
+    from repfcn import stage
+
+    cos = sorted(set(float(co) for co in cutoffs),reverse=True)
+    with stage(rep,'select'):
+        xdata, yblock = select_fit_window(data,cos[0])
+        ctx = mkcontext(data[:,0],cos[0])
+        ifit = np.flatnonzero(yblock.sum(axis=0) != 0.)
+        yblock = yblock[:,ifit]
+        if (isinstance(weight,str)):
+            wblock = weights(ctx,yblock,weight)
+        else:
+            wblock = weights(ctx,yblock,np.interp(np.rad2deg(xdata),*weight))
+
+    res = []
+    inits = init
+    close = pool is None
+    if (close):
+        pool = mkpool(jobs,kind)
+    try:
+        for co in cos:
+            mask = ctx.x < np.deg2rad(co)
+            if (mask.sum() < 3):
+                raise ValueError("Less than 3 sza values below the cut-off of %.1f deg." % co)
+            sub = subcontext(ctx,mask)
+            yfit = [yblock[mask,k] for k in range(len(ifit))]
+            wfit = None if wblock is None else [wblock[mask,k] for k in range(len(ifit))]
+            with stage(rep,'fit'):
+                fits = fitAll(sub,yfit,jobs,kind,method,inits,pool,loss,False,wfit)
+            res.append(fits)
+
+            # warm start of the next cut-off from the current parameters
+            bad = [k for k,r in enumerate(fits) if r.status != 0 or not np.all(np.isfinite(r.p))]
+            inits = [np.asarray(r.p,dtype=float) for r in fits]
+            if (len(bad) > 0):
+                p0 = guess(sub,np.column_stack([yfit[k] for k in bad]),init,
+                           None if wfit is None else np.column_stack([wfit[k] for k in bad]))
+                for k, p in zip(bad,p0):
+                    inits[k] = p
+    finally:
+        if (close and pool is not None):
+            pool.close()
+            pool.join()
+    return cos, ifit, res
+#______________________________________________________________________________________________
+
+def recommend(cos,res,tol=1.e-3):
+    """
+    Function recommend
+    ==================
+
+    Purpose:
+        Recommend an sza cut-off for each reaction: the largest cut-off (widest fit
+        window) with a converged fit and R^2 within tol of the best R^2 of all converged
+        fits of the reaction.
+
+    Variables:
+    I/O:
+        cos:        cut-offs in descending order (see sweep)
+        res:        list with Results of all fitted reactions for each cut-off (see sweep)
+        tol:        tolerance of R^2
+        best:       array with recommended cut-off of each reaction (nan without converged fit)
+
+    internal:
+        r2:         R^2 of all fits, shape (number of cut-offs, number of reactions)
+        conv:       converged fits
+        ok:         fits with R^2 within tol of the best R^2 of the reaction
+
+    Dependencies:
+        uses:           numpy
+        called from:    photMCM (main)
+    """
+
+    r2 = np.array([[r.rsquared if r.status == 0 else np.nan for r in fits] for fits in res],
+                  dtype=float).reshape(len(cos),-1)
+    conv = np.isfinite(r2)
+    r2 = np.where(conv,r2,-np.inf)
+    ok = conv & (r2 >= r2.max(axis=0) - tol)
+    best = np.full(r2.shape[1],np.nan)
+    for k in np.flatnonzero(ok.any(axis=0)):
+        best[k] = cos[np.flatnonzero(ok[:,k])[0]]
+    return best
+#______________________________________________________________________________________________
@@ -0,0 +1,62 @@
+"""
+Module watchfcn
+===============
+version 1.1
+-------------
+
+List of function focused on watching directories for new or modified TUV
+output files.
+contains:
+    - poll
+"""
+
+import sys
+import os
+import glob
+#______________________________________________________________________________________________
+
+def poll(patterns,seen,pending):
+    """
+    Function poll
+    =============
+
+    Purpose:
+        Find new or modified TUV output files. A file is ready, when its
+        modification time and size are unchanged since the previous poll
+        (files still written by TUV are skipped until complete) and differ
+        from the version processed last.
+
+    Variables:
+    I/O:
+        patterns:   list of glob patterns of TUV output files
+        seen:       dictionary with files and (modification time, size) of the
+                    versions processed last (updated for ready files)
+        pending:    dictionary with files and (modification time, size) at the
+                    previous poll (updated)
+        ready:      list of files to be processed
+
+    internal:
+        sig:        modification time and size of a file
+
+    Dependencies:
+        uses:           os, glob
+        called from:    watchMCM (main)
+    """
+
+    ready = []
+    for f in sorted(set(f for p in patterns for f in glob.glob(p))):
+        try:
+            st = os.stat(f)
+        except OSError:
+            continue
+        sig = (st.st_mtime,st.st_size)
+        if (seen.get(f) == sig):
+            pending.pop(f,None)
+        elif (pending.get(f) == sig):
+            pending.pop(f)
+            seen[f] = sig
+            ready.append(f)
+        else:
+            pending[f] = sig
+    return ready
+#______________________________________________________________________________________________
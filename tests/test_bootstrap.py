@@ -0,0 +1,56 @@
+"""
+Module test_bootstrap
+=====================
+version 1.1
+-------------
+
+Tests of the bootstrap confidence intervals of fitted parameters (see fitfcn.bootRxn).
+Run with 'python -m unittest discover tests' from the repository folder.
+"""
+
+import sys
+import os
+import unittest
+import numpy as np
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"py.fcn"))
+from fitfcn import mkcontext, fitRxn, bootRxn, weights, phot
+#______________________________________________________________________________________________
+
+class TestBootstrap(unittest.TestCase):
+
+    def setUp(self):
+        # synthetic j values with relative noise
+        self.ctx = mkcontext(np.deg2rad(np.arange(0.,90.,1.)))
+        self.ytrue = phot((2.e-7,1.2,0.3),self.ctx)
+
+    def test_interval_brackets_fit(self):
+        rng = np.random.RandomState(0)
+        y = np.abs(self.ytrue*(1.+0.05*rng.randn(len(self.ytrue))))
+        res = fitRxn((self.ctx,y,'fixed','linear',False,None))
+        ci = bootRxn((self.ctx,y,res,400,0))
+        for k in range(3):
+            self.assertTrue(ci[k][0] <= res.p[k] <= ci[k][1],
+                            "p[%i] = %g outside %s" % (k,res.p[k],ci[k]))
+
+    def check(self,noise,seed):
+        rng = np.random.RandomState(seed)
+        y = np.abs(self.ytrue*(1.+noise*rng.randn(len(self.ytrue))))
+        for scheme in ['rel','cos']:
+            w = weights(self.ctx,y,scheme)
+            res = fitRxn((self.ctx,y,'fixed','linear',False,w))
+            ci = bootRxn((self.ctx,y,res,400,0,False,w))
+            for k in range(3):
+                self.assertTrue(ci[k][0] <= res.p[k] <= ci[k][1],
+                                "%s weights, noise %.2f, seed %i: p[%i] = %g outside %s"
+                                % (scheme,noise,seed,k,res.p[k],ci[k]))
+
+    def test_weighted_interval_brackets_fit(self):
+        self.check(0.05,0)
+
+    def test_weighted_interval_brackets_fit_noisy(self):
+        for seed in range(3):
+            self.check(0.5,seed)
+#______________________________________________________________________________________________
+
+if __name__ == '__main__':
+    unittest.main()
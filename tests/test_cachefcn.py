@@ -0,0 +1,44 @@
+"""
+Module test_cachefcn
+====================
+version 1.1
+-------------
+
+Tests of the cache of fit results (see cachefcn).
+Run with 'python -m unittest discover tests' from the repository folder.
+"""
+
+import sys
+import os
+import unittest
+import numpy as np
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"py.fcn"))
+import cachefcn
+from cachefcn import cachekey
+#______________________________________________________________________________________________
+
+class TestCacheKey(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.deg2rad(np.arange(0.,90.,1.))
+        self.y = np.cos(self.x)
+        self.version = cachefcn.cacheversion
+
+    def tearDown(self):
+        cachefcn.cacheversion = self.version
+
+    def test_key_depends_on_data_and_options(self):
+        key = cachekey(self.x,self.y,90.,('leastsq','fixed'))
+        self.assertEqual(key,cachekey(self.x,self.y.copy(),90.,('leastsq','fixed')))
+        self.assertNotEqual(key,cachekey(self.x,2.*self.y,90.,('leastsq','fixed')))
+        self.assertNotEqual(key,cachekey(self.x,self.y,90.,('batch','fixed')))
+        self.assertNotEqual(key,cachekey(self.x,self.y,90.,('leastsq','fixed'),self.y))
+
+    def test_key_depends_on_version(self):
+        key = cachekey(self.x,self.y,90.,('leastsq','fixed'))
+        cachefcn.cacheversion += 1
+        self.assertNotEqual(key,cachekey(self.x,self.y,90.,('leastsq','fixed')))
+#______________________________________________________________________________________________
+
+if __name__ == '__main__':
+    unittest.main()
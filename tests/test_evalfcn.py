@@ -0,0 +1,43 @@
+"""
+Module test_evalfcn
+===================
+version 1.1
+-------------
+
+Tests of the batched evaluation of fitted parameterisations (see evalfcn.Evaluator).
+Run with 'python -m unittest discover tests' from the repository folder.
+"""
+
+import sys
+import os
+import unittest
+import numpy as np
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"py.fcn"))
+from evalfcn import Evaluator
+#______________________________________________________________________________________________
+
+class TestEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.ev = Evaluator([1,2],[2.e-5,1.e-4],[1.2,0.5],[0.3,0.2])
+
+    def test_evaluate(self):
+        sza = np.array([[0.,30.],[60.,95.]])
+        j = self.ev(sza)
+        self.assertEqual(j.shape,(2,2,2))
+        c = np.cos(np.deg2rad(60.))
+        self.assertAlmostEqual(j[1,0,1],1.e-4*c**0.5*np.exp(-0.2/c))
+        self.assertTrue(np.all(j[1,1] == 0.))
+
+    def test_lookup(self):
+        self.ev.mklut(np.arange(0.,90.1,0.5))
+        sza = np.linspace(0.,80.,50)
+        self.assertTrue(np.allclose(self.ev.lookup(sza),self.ev(sza),rtol=1.e-3,atol=1.e-12))
+
+    def test_invalid_grid(self):
+        for grid in [[45.],[],[0.,30.,30.,60.],[60.,30.,0.]]:
+            self.assertRaises(ValueError,self.ev.mklut,grid)
+#______________________________________________________________________________________________
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Module test_fitfcn
+==================
+version 1.1
+-------------
+
+Tests of the curve fits of photoreactions (see fitfcn).
+Run with 'python -m unittest discover tests' from the repository folder.
+"""
+
+import sys
+import os
+import unittest
+import numpy as np
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"py.fcn"))
+import fitfcn
+from fitfcn import mkcontext, fitRxn, fitRobust, fitBatch, phot
+#______________________________________________________________________________________________
+
+class TestFitRobust(unittest.TestCase):
+
+    def setUp(self):
+        self.ctx = mkcontext(np.deg2rad(np.arange(0.,90.,1.)))
+        self.ydata = phot((2.e-5,1.2,0.3),self.ctx)
+        self.fitTUV = fitfcn.fitTUV
+
+    def tearDown(self):
+        fitfcn.fitTUV = self.fitTUV
+
+    def test_converged(self):
+        res = fitRxn((self.ctx,self.ydata,'fixed','linear',True))
+        self.assertEqual(res.status,0)
+        self.assertTrue(np.isnan(res.co))
+
+    def test_all_attempts_failed(self):
+        def fail(*args,**kwargs):
+            raise ValueError("fit failed")
+        fitfcn.fitTUV = fail
+        res = fitRxn((self.ctx,self.ydata,'fixed','linear',True))
+        self.assertEqual(res.status,4)
+        self.assertTrue(np.all(np.isnan(res.p)))
+        self.assertIsNone(res.cov)
+
+    def test_best_attempt_by_mean_squared_residual(self):
+        # no attempt converges, residuals per point are smallest in the full window
+        def stalled(xdata,ydata,init,loss='linear',w=None):
+            full = len(ydata) == len(self.ydata)
+            fvec = np.full(len(ydata),1. if full else 1.01)
+            return (None,)*6 + ({'converged': False, 'fvec': fvec},)
+        fitfcn.fitTUV = stalled
+        fit, xfit, yfit, wfit, status, co = fitRobust(self.ctx,self.ydata)
+        self.assertEqual(status,3)
+        self.assertTrue(np.isnan(co))
+        self.assertEqual(len(yfit),len(self.ydata))
+#______________________________________________________________________________________________
+
+class TestFitBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.ctx = mkcontext(np.deg2rad(np.arange(0.,90.,1.)))
+        self.ydata = phot((2.e-5,1.2,0.3),self.ctx)
+
+    def test_converged(self):
+        res = fitBatch(self.ctx,np.column_stack([self.ydata,2.*self.ydata]))
+        self.assertEqual([r.status for r in res],[0,0])
+        self.assertTrue(np.allclose(res[1].p,(4.e-5,1.2,0.3),rtol=1.e-6))
+
+    def test_stalled_not_converged(self):
+        # no step is accepted for a column with a missing j value (maximum damping reached)
+        Y = np.column_stack([self.ydata,self.ydata])
+        Y[10,1] = np.nan
+        with np.errstate(invalid='ignore'):
+            res = fitBatch(self.ctx,Y)
+        self.assertEqual([r.status for r in res],[0,3])
+#______________________________________________________________________________________________
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Module test_iofcn
+================
+version 1.1
+-------------
+
+Tests of the binary output of fit results: long scenario names and reaction labels
+are stored without truncation (see iofcn.parrec, iofcn.parcat, iofcn.loadpars).
+Run with 'python -m unittest discover tests' from the repository folder.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"py.fcn"))
+from iofcn import parrec, parcat, savepar, loadpars
+from fitfcn import Result
+#______________________________________________________________________________________________
+
+def result():
+    # Result of a converged fit with all fields set
+    values = dict([(f,1.) for f in Result._fields],p=(1.,1.,1.),ci=None)
+    return Result(*[values[f] for f in Result._fields])
+#______________________________________________________________________________________________
+
+class TestParrec(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.long = "s" * 200
+        self.rxn = [(1,"short"),(2,"l" * 100)]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_save_and_load(self):
+        for k, out in enumerate([[(0,result())],[(1,result())]]):
+            savepar(os.path.join(self.dir,"%i.npy" % k),parrec("s%i" % k,float(k),self.rxn,out))
+        rec = loadpars(os.path.join(self.dir,"*.npy"))
+        self.assertEqual(list(rec['scen']),["s0","s1"])
+        self.assertEqual(list(rec['label']),["short",self.rxn[1][1]])
+        self.assertEqual(list(rec['rxn']),[1,2])
+        self.assertTrue(np.allclose(rec['l'],1.))
+
+    def test_long_values_not_truncated(self):
+        rec = parrec(self.long,0.,self.rxn,[(0,result()),(1,result())])
+        self.assertEqual(rec['scen'][0],self.long)
+        self.assertEqual(list(rec['label']),[label for i, label in self.rxn])
+
+    def test_concatenate_and_load(self):
+        recs = [parrec("a",0.,self.rxn[:1],[(0,result())]),
+                parrec(self.long,1.,self.rxn,[(1,result())])]
+        rec = parcat(recs)
+        self.assertEqual(list(rec['scen']),["a",self.long])
+        self.assertEqual(list(rec['label']),[label for i, label in self.rxn])
+        for k, r in enumerate(recs):
+            savepar(os.path.join(self.dir,"%i.npy" % k),r)
+        rec = loadpars(os.path.join(self.dir,"*.npy"))
+        self.assertEqual(list(rec['scen']),["a",self.long])
+        self.assertEqual(len(parcat([])),0)
+#______________________________________________________________________________________________
+
+if __name__ == '__main__':
+    unittest.main()
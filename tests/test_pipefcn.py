@@ -0,0 +1,69 @@
+"""
+Module test_pipefcn
+===================
+version 1.1
+-------------
+
+Tests of the writer thread of pipelined batch runs (see pipefcn.Writer).
+Run with 'python -m unittest discover tests' from the repository folder.
+"""
+
+import sys
+import os
+import threading
+import unittest
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"py.fcn"))
+from pipefcn import Writer
+#______________________________________________________________________________________________
+
+class TestWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.done, self.dropped = [], []
+        self.started, self.release = threading.Event(), threading.Event()
+
+    def task(self,k):
+        # first task waits until released
+        if (k == 0):
+            self.started.set()
+            self.release.wait()
+        self.done.append(k)
+
+    def fail(self,k):
+        raise IOError("task %i failed" % k)
+
+    def test_close_in_order(self):
+        writer = Writer(2,self.dropped.append)
+        self.release.set()
+        for k in range(5):
+            writer.put(self.task,k)
+        writer.close()
+        self.assertEqual(self.done,range(5))
+        self.assertEqual(self.dropped,[])
+
+    def test_abort_drops_queued_tasks(self):
+        writer = Writer(2,self.dropped.append)
+        writer.put(self.task,0)
+        self.started.wait()
+        writer.put(self.task,1)
+        writer.put(self.task,2)
+        threading.Timer(0.1,self.release.set).start()
+        writer.abort()
+        self.assertFalse(writer.thread.is_alive())
+        self.assertEqual(self.done,[0])
+        self.assertEqual(sorted(self.dropped),[1,2])
+
+    def test_tasks_after_error_dropped(self):
+        writer = Writer(4,self.dropped.append)
+        self.release.set()
+        writer.put(self.task,0)
+        writer.put(self.fail,1)
+        writer.put(self.task,2)
+        self.assertRaises(IOError,writer.close)
+        self.assertEqual(self.done,[0])
+        self.assertEqual(self.dropped,[2])
+        writer.abort()
+#______________________________________________________________________________________________
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Module test_plotall
+===================
+version 1.1
+-------------
+
+Tests of the plotting stage: pages rendered in a pool of processes are merged to
+<scen>.pdf in the order of the reactions (see pltfcn.plotall).
+Run with 'python -m unittest discover tests' from the repository folder.
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+import numpy as np
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"py.fcn"))
+import matplotlib
+matplotlib.use('Agg')
+from pltfcn import plotall
+from parfcn import mkpool
+from fitfcn import phot
+try:
+    from PyPDF2 import PdfFileReader
+except ImportError:
+    PdfFileReader = None
+#______________________________________________________________________________________________
+
+@unittest.skipIf(PdfFileReader is None, "PyPDF2 is not installed")
+class TestPlotall(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        x = np.deg2rad(np.arange(0.,90.,5.))
+        p = np.array((2.e-5,1.,0.3))
+        self.labels = ["reaction%s" % c for c in "ABCDEF"]
+        self.pages = [(label,x,phot(p,x),p,1.e-5) for label in self.labels]
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def order(self,file):
+        # labels of the reactions in the order of the pages
+        with open(file,'rb') as f, warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            pdf = PdfFileReader(f)
+            text = [pdf.getPage(i).extractText().replace('\n','')
+                    for i in range(pdf.getNumPages())]
+        return [[label for label in self.labels if label in t] for t in text]
+
+    def test_pool_pages_in_order(self):
+        plotall('test',self.pages,'fast',jobs=2)
+        self.assertEqual(self.order('test.pdf'),[[label] for label in self.labels])
+        self.assertFalse(os.path.exists('test.pdf.tmp'))
+
+    def test_shared_pool_pages_in_order(self):
+        pool = mkpool(2,'process')
+        try:
+            plotall('test',self.pages,'fast',pool=pool)
+        finally:
+            pool.close()
+            pool.join()
+        self.assertEqual(self.order('test.pdf'),[[label] for label in self.labels])
+#______________________________________________________________________________________________
+
+if __name__ == '__main__':
+    unittest.main()
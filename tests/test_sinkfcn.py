@@ -0,0 +1,103 @@
+"""
+Module test_sinkfcn
+===================
+version 1.1
+-------------
+
+Tests of the result sinks (see sinkfcn).
+Run with 'python -m unittest discover tests' from the repository folder.
+"""
+
+import sys
+import os
+import io
+import shutil
+import tempfile
+import unittest
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"py.fcn"))
+from sinkfcn import AtomicFile, mksinks
+from fitfcn import Result
+#______________________________________________________________________________________________
+
+def result(co):
+    # Result of a converged fit with all fields set and sza cut-off co
+    values = dict([(f,1.) for f in Result._fields],p=(1.,1.,1.),ci=None,co=co)
+    return Result(*[values[f] for f in Result._fields])
+#______________________________________________________________________________________________
+
+class TestDatSink(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        self.rxn = [(1,"full window"),(2,"reduced window")]
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def lines(self,robust):
+        with mksinks("test",0.,'abs',0,robust,['dat']) as sink:
+            sink.write(self.rxn,0,result(float('nan')))
+            sink.write(self.rxn,1,result(80.))
+        with io.open("test.dat",encoding='utf-8') as f:
+            return [line.rstrip('\n').split('\t') for line in f if '\t' in line]
+
+    def test_reduced_cutoff_column(self):
+        head, full, reduced = self.lines(True)[-3:]
+        self.assertEqual(head[-2].strip(),"co / deg")
+        self.assertEqual(full[-2].strip(),"-")
+        self.assertEqual(float(reduced[-2]),80.)
+
+    def test_no_column_without_robust(self):
+        head, full, reduced = self.lines(False)[-3:]
+        self.assertEqual(len(head),len(full))
+        self.assertNotIn("co / deg",head)
+#______________________________________________________________________________________________
+
+class TestAtomicFile(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def test_commit(self):
+        with AtomicFile("test.txt",bufsize=4) as f:
+            f.write("abc")
+            f.write(u"d\u00B1")
+            self.assertFalse(os.path.exists("test.txt"))
+        with open("test.txt",'rb') as f:
+            self.assertEqual(f.read(),u"abcd\u00B1".encode('utf-8'))
+        self.assertFalse(os.path.exists("test.txt.tmp"))
+
+    def test_abort(self):
+        with open("test.txt",'w') as f:
+            f.write("old")
+        try:
+            with AtomicFile("test.txt",bufsize=1) as f:
+                f.write("new")
+                raise RuntimeError("fit failed")
+        except RuntimeError:
+            pass
+        with open("test.txt") as f:
+            self.assertEqual(f.read(),"old")
+        self.assertFalse(os.path.exists("test.txt.tmp"))
+
+    def test_write_after_close(self):
+        for close in ['commit','abort']:
+            f = AtomicFile("test.txt",bufsize=1)
+            f.write("abc")
+            getattr(f,close)()
+            self.assertRaises(ValueError,f.write,"abc")
+            self.assertRaises(ValueError,f.flush)
+            self.assertFalse(os.path.exists("test.txt.tmp"))
+#______________________________________________________________________________________________
+
+if __name__ == '__main__':
+    unittest.main()
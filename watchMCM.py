@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+
+"""
+####################
+#                  #
+#  photMCM (watch) #
+#  version 1.1     #
+#                  #
+####################
+
+Purpose:
+    Long-running script to derive parameterisations for photolysis reactions in
+    MCMv4.0 whenever TUV output files in a directory are written or modified.
+
+Instructions:
+    Run script with command:
+
+        python watchMCM.py [directory] [options]
+
+    The directory (default: current folder) is polled for TUV output files
+    (default pattern: *.txt). Files are processed, once they are unchanged for one
+    polling interval, and again after each modification. Outputs are named as in
+    batchMCM (<scen>.dat, <scen>.par, <scen>.pdf, <scen>.npy for each altitude block).
+    numpy, scipy and matplotlib stay loaded between files. Results of the previous
+    run of each scenario are kept in memory and only reactions with changed
+    j values are refitted. Output files are written to temporary files first and
+    replace the previous outputs, when complete. Files, which cannot be parsed, fitted
+    or saved, are skipped (previous outputs of all altitudes are kept) until they are
+    modified again.
+    Stop with Ctrl-C.
+
+    Options:
+        -p/--pattern P: glob pattern of TUV output files in the directory (default: *.txt)
+        --interval S:   polling interval in seconds (default: 5)
+        --once:         process all current files once and exit
+        -j/--jobs N:    number of workers for the curve fitting (default: 1, 0 for all cpus)
+        --pool TYPE:    type of worker pool, 'process' (default) or 'thread'
+        --solver S:     'leastsq' (default) or 'batch'
+        --init I:       initial guess of the fits, 'fixed' (default), 'loglin' or 'grid'
+        --robust:       retry fits without convergence with the alternative initial guess
+                        and reduced sza windows (85, 80 deg.), reduced sza cut-offs
+                        in an additional column of <scen>.dat
+        --loss L:       loss function, 'linear' (default), 'huber' or 'soft_l1' (solver 'leastsq')
+        --weight W:     weighting of the residuals, 'abs' (default), 'rel', 'cos' or file
+                        with sza in deg. and weights in two columns
+        --bootstrap N:  number of bootstrap resamples for confidence intervals (default: 0,
+                        loss function 'linear' only)
+        --seed S:       seed of the bootstrap (default: 0)
+        --plots MODE:   'tex' (default), 'fast' or 'none'
+        --no-plots:     fitting only, same as '--plots none' (matplotlib is not loaded)
+        --mmap:         read TUV files memory-mapped with matrices parsed in chunks
+        --csv:          write all results additionally to <scen>.csv
+
+    A run report <file>.run.json (without ending '.txt') is saved for each processed file.
+    Worker pools are created once and shared between all files and altitudes.
+    Files without TUV matrices are skipped until modified.
+
+Variables:
+    args:           command line arguments
+    patterns:       glob patterns of watched files
+    seen,pending:   signatures of processed files and of files at the previous poll
+    state:          in-memory caches with results of the previous run of each scenario
+    pool,ppool:     worker pools for curve fitting and plotting
+    ifile:          current input file
+    rxn:            matrix with available photoreactions and indices
+    alt:            list with altitudes of all blocks in the input file
+    mats:           list with matrices with sza-dependent j values from TUV for each altitude
+    z,data:         current altitude and matrix
+    om:             list of maximum order of magnitudes for l-parameters in MCM parameterisation
+    base,scen:      file name without ending and scenario name for output files
+    sink:           result sinks of all output files of a scenario (see sinkfcn)
+    sinks:          result sinks of all scenarios (altitudes) of the file, closed together
+    out:            reaction indices and Results of all fits
+    pages,plots:    plot arguments of a scenario and scenario names and plot arguments of the file
+    rep:            run report with timings and statistics of the current file
+    weight,wlabel:  weighting of residuals (scheme or user weights) and its label
+
+Dependencies:
+    uses:           sys,os,time,argparse,datfcn,parfcn.mkpool,pltfcn.scatdat,
+                    repfcn,cachefcn.MemCache,watchfcn.poll,sinkfcn.Sinks,sinkfcn.mksinks
+
+This script may be used, redistributed and/or altered for non-commercial purposes
+under the GNU COMMON USER licence.
+"""
+
+
+# Load system functions
+import sys
+reload(sys)
+sys.setdefaultencoding('UTF8') # output of UNICODE characters
+import os
+import time
+import argparse
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),"py.fcn"))
+
+#load own functions
+from datfcn import parseall, mmapall, readweights, xydat, plotdat
+from parfcn import mkpool
+from pltfcn import scatdat
+from repfcn import newrep, stage, wreport
+from cachefcn import MemCache
+from watchfcn import poll
+from sinkfcn import Sinks, mksinks
+
+
+# Read command line arguments
+parser = argparse.ArgumentParser(description="Derive MCM parameterisations of photolysis processes "
+                                 "whenever TUV output files in a directory change.")
+parser.add_argument('directory',nargs='?',default='.',help="watched directory")
+parser.add_argument('-p','--pattern',default='*.txt',help="glob pattern of TUV output files")
+parser.add_argument('--interval',type=float,default=5.,help="polling interval in seconds")
+parser.add_argument('--once',action='store_true',help="process all current files once and exit")
+parser.add_argument('-j','--jobs',type=int,default=1,help="number of workers for curve fitting (0: all cpus)")
+parser.add_argument('--pool',choices=['process','thread'],default='process',help="type of worker pool")
+parser.add_argument('--solver',choices=['leastsq','batch'],default='leastsq',help="curve fitting method")
+parser.add_argument('--init',choices=['fixed','loglin','grid'],default='fixed',help="initial guess for curve fitting")
+parser.add_argument('--robust',action='store_true',
+                    help="retry fits without convergence with alternative initial guess and reduced sza window")
+parser.add_argument('--loss',choices=['linear','huber','soft_l1'],default='linear',
+                    help="loss function of the fits (robust losses down-weight outliers)")
+parser.add_argument('--weight',default='abs',
+                    help="weighting of residuals: abs, rel (1/j), cos or file with sza/deg. and weights")
+parser.add_argument('--bootstrap',type=int,default=0,metavar='N',
+                    help="number of bootstrap resamples for confidence intervals (0: none)")
+parser.add_argument('--seed',type=int,default=0,help="seed of the bootstrap")
+parser.add_argument('--plots',choices=['none','fast','tex'],default='tex',help="plot mode")
+parser.add_argument('--no-plots',dest='plots',action='store_const',const='none',
+                    help="fitting only, same as --plots none (matplotlib is not loaded)")
+parser.add_argument('--mmap',action='store_true',help="read TUV files memory-mapped (large files)")
+parser.add_argument('--csv',action='store_true',help="write all results additionally to <scen>.csv")
+args = parser.parse_args()
+if (args.bootstrap > 0 and args.loss != 'linear'):
+    parser.error("--bootstrap requires --loss linear")
+if (args.solver == 'batch' and args.loss != 'linear'):
+    parser.error("--loss %s requires --solver leastsq" % args.loss)
+if (args.weight in ['abs','rel','cos']):
+    weight, wlabel = args.weight, args.weight
+else:
+    weight, wlabel = readweights(args.weight), "user (%s)" % args.weight
+
+# shared worker pools
+pool = mkpool(args.jobs,args.pool)
+if (args.plots == 'none'):
+    ppool = None
+elif (args.pool == 'process'):
+    ppool = pool
+else:
+    ppool = mkpool(args.jobs,'process')
+
+# keep fitting and plotting libraries loaded for all files (after forking the workers)
+import scipy.optimize
+if (args.plots != 'none'):
+    import matplotlib.backends.backend_pdf
+
+patterns = [os.path.join(args.directory,args.pattern)]
+seen, pending, state = {}, {}, {}
+if (args.once):
+    poll(patterns,seen,pending)
+print "Watching '%s' (stop with Ctrl-C)." % patterns[0]
+try:
+    while True:
+        for ifile in poll(patterns,seen,pending):
+            if (ifile[-4:]=='.txt'):
+                base = ifile[:-4]
+            else:
+                base = ifile
+            rep = newrep(base,[ifile],vars(args))
+            try:
+                with stage(rep,'parse'):
+                    if (args.mmap):
+                        rxn, alt, mats = mmapall(ifile)
+                    else:
+                        rxn, alt, mats = parseall(ifile)
+            except ValueError as err:
+                print "\n\n%s\nSkipping file until modified." % err
+                continue
+            # result sinks of all altitudes, replacing the previous outputs of the file together
+            sinks = Sinks()
+            plots = []
+            try:
+                try:
+                    for z, data in zip(alt,mats):
+                        scen = base
+                        if (len(mats) > 1):
+                            scen = "%s_z%.3fkm" % (base,z)
+
+                        # info on screen
+                        print "\n\n%s: scenario %s (z = %.3f km)\n" % (time.strftime("%H:%M:%S"),scen,z)
+                        print "Working on:\n"
+
+                        # result sinks and curve fitting with results of the previous run
+                        sink = mksinks(scen,z,wlabel,args.bootstrap,args.robust,
+                                       ['dat','par','npy'] + ['csv']*args.csv)
+                        sinks.extend(sink)
+                        with stage(rep,'scatdat'):
+                            rxn, data, om = scatdat(rxn,data)
+                        out, pages = xydat(data,rxn,90.,om,sink,scen,args.jobs,args.pool,
+                                           args.solver,args.init,cache=state.setdefault(scen,MemCache()),
+                                           pool=pool,rep=rep,loss=args.loss,retry=args.robust,
+                                           weight=weight,nboot=args.bootstrap,seed=args.seed)
+                        plots.append((scen,pages))
+                    with stage(rep,'save'):
+                        sinks.close()
+                except:
+                    # previous outputs of all altitudes are kept
+                    sinks.abort()
+                    raise
+            except Exception as err:
+                # failed fits or outputs do not stop the watcher, the file is
+                # processed again after the next modification
+                print "\n\n%s\nSkipping file until modified." % err
+                continue
+
+            # plots (outputs are kept after plot errors)
+            for scen, pages in plots:
+                plotdat(scen,pages,args.plots,args.jobs,ppool,rep)
+            wreport("%s.run.json" % base,rep)
+            print "\nOutput of '%s' updated." % ifile
+        if (args.once):
+            break
+        time.sleep(args.interval)
+except KeyboardInterrupt:
+    print "\n\nStopped watching '%s'." % patterns[0]
+finally:
+    for p in set([pool,ppool]):
+        if (p is not None):
+            p.close()
+            p.join()